@@ -1 +1,5 @@
 """Adapters - implementations of port interfaces."""
+
+from .ollama_llm import OllamaLlmAdapter
+
+__all__ = ["OllamaLlmAdapter"]
@@ -0,0 +1,119 @@
+"""Ollama LLM adapter - async streaming over a shared, pooled httpx client."""
+
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+
+from backend.domain.ports.llm_port import LlmError, LlmPort
+
+
+class OllamaLlmAdapter(LlmPort):
+    """LlmPort implementation backed by the Ollama HTTP API.
+
+    A single AsyncClient is shared by every request so connections to Ollama
+    are pooled and kept alive; tokens are read without blocking the event loop.
+    Generation goes through /api/chat with the system prompt as its own leading
+    message, so Ollama can reuse the prefill of that stable prefix; keep_alive
+    keeps the model loaded between requests.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        timeout: float = 120.0,
+        max_connections: int = 10,
+        options: dict | None = None,
+        keep_alive: str | int = "30m",
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.model = model
+        self.options = options or {}
+        self.keep_alive = keep_alive
+        self._client = client or httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    def _options(self, num_ctx: int | None) -> dict:
+        return {**self.options, "num_ctx": num_ctx} if num_ctx else self.options
+
+    def _payload(
+        self, prompt: str, system_prompt: str | None, model: str | None, num_ctx: int | None, stream: bool
+    ) -> dict:
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": self._options(num_ctx),
+        }
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        model: str | None = None,
+        num_ctx: int | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream tokens from /api/chat."""
+        payload = self._payload(prompt, system_prompt, model, num_ctx, stream=True)
+        try:
+            async with self._client.stream("POST", "/api/chat", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    token = data.get("message", {}).get("content", "")
+                    if token:
+                        yield token
+                    if data.get("done", False):
+                        break
+        except httpx.ConnectError as e:
+            raise LlmError("Cannot reach Ollama. Check that it is running.") from e
+        except httpx.TimeoutException as e:
+            raise LlmError("Ollama did not respond in time.") from e
+        except httpx.HTTPStatusError as e:
+            raise LlmError(f"Ollama error: {e.response.status_code}") from e
+
+    async def warm_up(self, num_ctx: int | None = None) -> None:
+        """Load the model into memory with an empty chat request."""
+        payload = {
+            "model": self.model,
+            "messages": [],
+            "keep_alive": self.keep_alive,
+            "options": self._options(num_ctx),
+        }
+        try:
+            response = await self._client.post("/api/chat", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise LlmError(f"Could not load model {self.model}: {e}") from e
+
+    async def check_health(self) -> dict:
+        """Check that Ollama answers on /api/tags."""
+        try:
+            response = await self._client.get("/api/tags", timeout=5.0)
+            status = "ok" if response.status_code == 200 else "unavailable"
+        except httpx.HTTPError:
+            status = "unavailable"
+        return {"status": status, "model": self.model}
+
+    async def list_models(self) -> list[str]:
+        """List models pulled on the Ollama server."""
+        response = await self._client.get("/api/tags", timeout=5.0)
+        response.raise_for_status()
+        return [m["name"] for m in response.json().get("models", [])]
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        await self._client.aclose()
@@ -2,7 +2,10 @@
 
 from functools import lru_cache
 
+from backend.adapters import OllamaLlmAdapter
 from backend.config.settings import Settings
+from backend.domain.ports import LlmPort
+from backend.domain.services import AdmissionController, SingleFlight
 
 
 @lru_cache
@@ -11,8 +14,47 @@ def get_settings() -> Settings:
     return Settings()
 
 
-# Port implementations will be registered here as adapters are implemented
-# Example:
-# def get_llm_port() -> LlmPort:
-#     settings = get_settings()
-#     return OllamaAdapter(settings.ollama_url)
+@lru_cache
+def get_llm_port() -> LlmPort:
+    """Get the shared LLM adapter (one pooled HTTP client per process)."""
+    from core.embeddings import keep_alive_ollama
+    from core.paliers import LLM_NUM_PREDICT
+
+    settings = get_settings()
+    return OllamaLlmAdapter(
+        settings.ollama_url,
+        settings.ollama_model,
+        timeout=settings.ollama_timeout,
+        max_connections=settings.ollama_max_connections,
+        options={
+            "temperature": settings.llm_temperature,
+            "num_ctx": settings.llm_num_ctx,
+            # Same value core's bucket choice reserves for the answer
+            "num_predict": LLM_NUM_PREDICT,
+        },
+        keep_alive=keep_alive_ollama(settings.ollama_keep_alive),
+    )
+
+
+@lru_cache
+def get_generation_admission() -> AdmissionController:
+    """Get the process-wide limiter for LLM generations."""
+    settings = get_settings()
+    return AdmissionController(
+        "generation", settings.generation_max_concurrent, settings.generation_max_queue
+    )
+
+
+@lru_cache
+def get_embedding_admission() -> AdmissionController:
+    """Get the process-wide limiter for retrievals (query embedding and search)."""
+    settings = get_settings()
+    return AdmissionController(
+        "embedding", settings.embedding_max_concurrent, settings.embedding_max_queue
+    )
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide registry of shared chat streams."""
+    return SingleFlight()
@@ -4,5 +4,14 @@ from .chat import router as chat_router
 from .collections import router as collections_router
 from .documents import router as documents_router
 from .health import router as health_router
+from .jobs import router as jobs_router
+from .metrics import router as metrics_router
 
-__all__ = ["health_router", "chat_router", "collections_router", "documents_router"]
+__all__ = [
+    "health_router",
+    "chat_router",
+    "collections_router",
+    "documents_router",
+    "jobs_router",
+    "metrics_router",
+]
@@ -1,12 +1,30 @@
 """Chat API routes with SSE streaming."""
 
+import asyncio
 import json
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
+from functools import partial
 
-from fastapi import APIRouter, HTTPException
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
+from backend.api.dependencies import (
+    get_embedding_admission,
+    get_generation_admission,
+    get_llm_port,
+    get_single_flight,
+)
 from backend.domain.models.chat import ChatRequest, ChatResponse
+from backend.domain.ports import LlmError, LlmPort
+from backend.domain.services import (
+    AdmissionController,
+    AdmissionRejected,
+    AdmissionTicket,
+    SingleFlight,
+)
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
@@ -30,81 +48,305 @@ def _format_history(history: list) -> str:
     return "\n".join(formatted)
 
 
-async def _stream_rag_response(
-    message: str, collection_name: str, prompt_name: str, history: list
-) -> AsyncGenerator[str, None]:
-    """Stream RAG response as SSE events."""
+def _prepare_generation(
+    message: str,
+    collection_name: str,
+    prompt_name: str,
+    history: list,
+    mmr_lambda: float | None = None,
+    fetch_k: int | None = None,
+) -> dict:
+    """Resolve the engine, check the answer cache, then run retrieval.
+
+    Blocking: call from a threadpool. Returns a dict with "rag" and either
+    "cached" (a cached answer) or "system" and "prompt" (the two chat
+    messages), "sources", "tokens" (estimated prompt tokens), "num_ctx"
+    (the context bucket to generate in) and "version".
+    """
     from core.collection_manager import CollectionManager
-    from core.search import RAGEngine
+    from core.paliers import PALIERS_CONTEXTE
+    from core.search import get_engine
+
+    cm = CollectionManager()
+    if not cm.collection_existe(collection_name):
+        raise LookupError(f"Collection '{collection_name}' not found")
+
+    rag = get_engine(collection_name, prompt_name=prompt_name, collection_manager=cm)
+    # Read before retrieval so an answer built on stale chunks is never cached as fresh
+    version = cm.version_collection(collection_name)
+
+    if not history:
+        cached = rag.reponse_en_cache(message, mmr_lambda, fetch_k)
+        if cached:
+            return {"rag": rag, "cached": cached}
+
+    prompt, sources, tokens = rag.preparer_prompt(
+        message, history=_format_history(history), mmr_lambda=mmr_lambda, fetch_k=fetch_k
+    )
+    return {
+        "rag": rag,
+        "cached": None,
+        "system": rag.prompt_systeme,
+        "prompt": prompt,
+        "sources": sources,
+        "tokens": tokens,
+        "num_ctx": PALIERS_CONTEXTE.choisir(tokens["total"]),
+        "version": version,
+    }
+
+
+def _too_many_requests(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)}
+    )
+
 
+def _enter(*admissions: AdmissionController) -> list[AdmissionTicket]:
+    """Take a place in each admission queue, or answer 429 if any of them is full."""
+    tickets = []
     try:
-        cm = CollectionManager()
-        if not cm.collection_existe(collection_name):
-            yield f"data: {json.dumps({'error': f'Collection {collection_name} not found'})}\n\n"
-            return
+        for admission in admissions:
+            tickets.append(admission.enter())
+    except AdmissionRejected as e:
+        _release(*tickets)
+        raise _too_many_requests(e)
+    return tickets
+
 
-        rag = RAGEngine(collection_name, prompt_name=prompt_name, collection_manager=cm)
+def _release(*tickets: AdmissionTicket) -> None:
+    for ticket in tickets:
+        ticket.release()
 
-        # Format history for context
-        history_text = _format_history(history)
 
-        result = rag.generer_avec_sources(message, stream=True, history=history_text)
+async def _rag_events(
+    request: ChatRequest,
+    llm: LlmPort,
+    ticket: AdmissionTicket,
+    embedding_ticket: AdmissionTicket,
+) -> AsyncGenerator[dict, None]:
+    """RAG answer as events: "queue_position", "token", then the final or "error" event.
+
+    Retrieval runs once `embedding_ticket` is admitted, while `ticket` waits
+    for a generation slot; until it is admitted, "queue_position" events
+    report its place in the queue.
+    Closing this generator mid-answer closes the upstream generation at once,
+    so Ollama stops generating and frees its slot.
+    """
+    from core.answer_cache import rejouer_reponse
+    from core.search import GENERATIONS_ANNULEES
+
+    message, history = request.message, request.history
+    try:
+        await embedding_ticket.wait()
+        try:
+            generation = await run_in_threadpool(
+                _prepare_generation,
+                message,
+                request.collection_name,
+                request.prompt_name,
+                history,
+                request.mmr_lambda,
+                request.fetch_k,
+            )
+        finally:
+            embedding_ticket.release()
+
+        cached = generation["cached"]
+        if cached:
+            # No generation needed: give the slot to the next request
+            ticket.release()
+            # Replay the cached answer through the same token stream
+            for token in rejouer_reponse(cached["reponse"]):
+                yield {"token": token}
+            yield {"sources": cached["sources"], "done": True, "cached": True}
+            return
+
+        async for position in ticket.positions():
+            yield {"queue_position": position}
 
         # Stream tokens
-        for token in result["reponse"]:
-            yield f"data: {json.dumps({'token': token})}\n\n"
+        tokens = []
+        cancelled = False
+        stream = llm.generate_stream(
+            generation["prompt"], system_prompt=generation["system"], num_ctx=generation["num_ctx"]
+        )
+        try:
+            async for token in stream:
+                tokens.append(token)
+                yield {"token": token}
+        except (asyncio.CancelledError, GeneratorExit):
+            # Reader gone: closed by the SSE loop or cancelled by the server
+            cancelled = True
+            raise
+        finally:
+            # Closing the stream closes the connection to Ollama, which stops generating
+            with anyio.CancelScope(shield=True):
+                await stream.aclose()
+            if cancelled:
+                GENERATIONS_ANNULEES.enregistrer(len(tokens))
+
+        if not history:
+            await run_in_threadpool(
+                generation["rag"].memoriser_reponse,
+                message,
+                "".join(tokens),
+                generation["sources"],
+                generation["version"],
+                request.mmr_lambda,
+                request.fetch_k,
+            )
 
-        # Send sources at the end
-        yield f"data: {json.dumps({'sources': result['sources'], 'done': True})}\n\n"
+        # Send sources and the packed prompt size at the end
+        yield {"sources": generation["sources"], "prompt_tokens": generation["tokens"], "done": True}
 
-    except ValueError as e:
-        yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    except (LookupError, ValueError, LlmError) as e:
+        yield {"error": str(e)}
     except Exception as e:
-        yield f"data: {json.dumps({'error': f'Internal error: {str(e)}'})}\n\n"
+        yield {"error": f"Internal error: {str(e)}"}
+    finally:
+        _release(ticket, embedding_ticket)
+
+
+async def _stream_rag_response(
+    events: AsyncIterator[dict], http_request: Request
+) -> AsyncGenerator[str, None]:
+    """Stream events as SSE, stopping as soon as the client disconnects."""
+    try:
+        async for event in events:
+            if await http_request.is_disconnected():
+                break
+            yield f"data: {json.dumps(event)}\n\n"
+    finally:
+        with anyio.CancelScope(shield=True):
+            await events.aclose()
+
+
+def _flight_key(request: ChatRequest) -> tuple | None:
+    """Requests sharing this key can share one answer; None when there is history."""
+    from core.query_cache import normaliser_question
+
+    if request.history:
+        return None
+    return (
+        request.collection_name,
+        request.prompt_name,
+        normaliser_question(request.message),
+        request.mmr_lambda,
+        request.fetch_k,
+    )
 
 
 @router.post("/chat")
-async def chat(request: ChatRequest) -> StreamingResponse:
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    llm: LlmPort = Depends(get_llm_port),
+    generation_admission: AdmissionController = Depends(get_generation_admission),
+    embedding_admission: AdmissionController = Depends(get_embedding_admission),
+    single_flight: SingleFlight = Depends(get_single_flight),
+) -> StreamingResponse:
     """
     Chat endpoint with RAG and SSE streaming.
 
     Searches the specified collection for relevant context,
     then streams the LLM response token by token.
+    A request identical to one in flight (same collection, prompt and
+    question, no history) joins it instead of generating again.
+    Answers 429 with Retry-After when the generation or retrieval queue is full.
     """
+    key = _flight_key(request)
+    if key is None:
+        tickets = _enter(generation_admission, embedding_admission)
+        events = _rag_events(request, llm, *tickets)
+        # Also frees the tickets if the stream is dropped before it starts
+        background = BackgroundTask(_release, *tickets)
+    else:
+        events = single_flight.join(key)
+        if events is None:
+            tickets = _enter(generation_admission, embedding_admission)
+            # The producer task frees the tickets when it ends, even if cancelled unstarted
+            events = single_flight.start(
+                key, _rag_events(request, llm, *tickets), on_done=partial(_release, *tickets)
+            )
+        # Leaves the flight if the response is dropped before it is read, so
+        # that an unread generation is cancelled
+        background = BackgroundTask(events.aclose)
+
     return StreamingResponse(
-        _stream_rag_response(
-            request.message,
-            request.collection_name,
-            request.prompt_name,
-            request.history
-        ),
+        _stream_rag_response(events, http_request),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
         },
+        background=background,
     )
 
 
 @router.post("/chat/sync", response_model=ChatResponse)
-async def chat_sync(request: ChatRequest) -> ChatResponse:
+async def chat_sync(
+    request: ChatRequest,
+    llm: LlmPort = Depends(get_llm_port),
+    generation_admission: AdmissionController = Depends(get_generation_admission),
+    embedding_admission: AdmissionController = Depends(get_embedding_admission),
+) -> ChatResponse:
     """
     Non-streaming chat endpoint for testing.
 
     Returns the complete response at once.
     """
-    from core.collection_manager import CollectionManager
-    from core.search import RAGEngine
+    tickets = _enter(generation_admission, embedding_admission)
+    try:
+        return await _chat_sync(request, llm, *tickets)
+    finally:
+        _release(*tickets)
 
-    cm = CollectionManager()
-    if not cm.collection_existe(request.collection_name):
-        raise HTTPException(status_code=404, detail=f"Collection '{request.collection_name}' not found")
 
+async def _chat_sync(
+    request: ChatRequest, llm: LlmPort, ticket: AdmissionTicket, embedding_ticket: AdmissionTicket
+) -> ChatResponse:
+    await embedding_ticket.wait()
     try:
-        rag = RAGEngine(request.collection_name, prompt_name=request.prompt_name, collection_manager=cm)
-        history_text = _format_history(request.history)
-        result = rag.generer_avec_sources(request.message, stream=False, history=history_text)
-        return ChatResponse(response=result["reponse"], sources=result["sources"])
+        generation = await run_in_threadpool(
+            _prepare_generation,
+            request.message,
+            request.collection_name,
+            request.prompt_name,
+            request.history,
+            request.mmr_lambda,
+            request.fetch_k,
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        embedding_ticket.release()
+
+    if generation["cached"]:
+        cached = generation["cached"]
+        return ChatResponse(response=cached["reponse"], sources=cached["sources"])
+
+    await ticket.wait()
+    try:
+        stream = llm.generate_stream(
+            generation["prompt"], system_prompt=generation["system"], num_ctx=generation["num_ctx"]
+        )
+        response = "".join([token async for token in stream])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not request.history:
+        await run_in_threadpool(
+            generation["rag"].memoriser_reponse,
+            request.message,
+            response,
+            generation["sources"],
+            generation["version"],
+            request.mmr_lambda,
+            request.fetch_k,
+        )
+    return ChatResponse(
+        response=response, sources=generation["sources"], prompt_tokens=generation["tokens"]
+    )
@@ -19,6 +19,13 @@ class CollectionInfo(BaseModel):
     document_count: int
 
 
+class CollectionSettings(BaseModel):
+    """Per-collection retrieval settings (None = global default)."""
+
+    mmr_lambda: float | None = Field(default=None, ge=0.0, le=1.0)
+    fetch_k: int | None = Field(default=None, ge=1, le=200)
+
+
 class CollectionListResponse(BaseModel):
     """Response for listing collections."""
 
@@ -76,3 +83,27 @@ async def delete_collection(name: str) -> None:
         raise HTTPException(status_code=404, detail=f"Collection '{name}' not found")
 
     cm.supprimer_collection(name)
+
+
+@router.get("/{name}/settings", response_model=CollectionSettings)
+async def get_collection_settings(name: str) -> CollectionSettings:
+    """Get the collection's retrieval settings."""
+    from core.collection_manager import CollectionManager
+
+    cm = CollectionManager()
+    if not cm.collection_existe(name):
+        raise HTTPException(status_code=404, detail=f"Collection '{name}' not found")
+
+    return CollectionSettings(**cm.config_collection(name))
+
+
+@router.put("/{name}/settings", response_model=CollectionSettings)
+async def update_collection_settings(name: str, request: CollectionSettings) -> CollectionSettings:
+    """Replace the collection's retrieval settings."""
+    from core.collection_manager import CollectionManager
+
+    cm = CollectionManager()
+    if not cm.collection_existe(name):
+        raise HTTPException(status_code=404, detail=f"Collection '{name}' not found")
+
+    return CollectionSettings(**cm.modifier_config_collection(name, **request.model_dump()))
@@ -1,8 +1,6 @@
 """Documents management API routes."""
 
-import shutil
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 
 from fastapi import APIRouter, File, HTTPException, Query, UploadFile
 from pydantic import BaseModel
@@ -27,19 +25,26 @@ class DocumentListResponse(BaseModel):
     """Response for listing documents."""
 
     documents: list[DocumentInfo]
+    total: int
+    offset: int
+    limit: int
 
 
-class IndexResult(BaseModel):
-    """Result of document indexation."""
+class IndexJobAccepted(BaseModel):
+    """Indexing job accepted by the background queue."""
 
+    job_id: str
     status: str
-    chunks: int
     message: str
 
 
 @router.get("", response_model=DocumentListResponse)
-async def list_documents(collection_name: str) -> DocumentListResponse:
-    """List all documents in a collection."""
+async def list_documents(
+    collection_name: str,
+    offset: int = Query(0, ge=0, description="Number of documents to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of documents to return"),
+) -> DocumentListResponse:
+    """List the documents of a collection, ordered by name."""
     from core.collection_manager import CollectionManager
     from core.document_manager import DocumentManager
 
@@ -48,23 +53,34 @@ async def list_documents(collection_name: str) -> DocumentListResponse:
         raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
 
     dm = DocumentManager(cm)
-    docs = dm.lister_documents(collection_name)
-    return DocumentListResponse(documents=[DocumentInfo(**d) for d in docs])
+    docs = dm.lister_documents(collection_name, offset=offset, limit=limit)
+    return DocumentListResponse(
+        documents=[DocumentInfo(**d) for d in docs],
+        total=dm.compter_documents(collection_name),
+        offset=offset,
+        limit=limit,
+    )
 
 
-@router.post("", response_model=IndexResult, status_code=201)
-async def upload_document(
+@router.post("", response_model=IndexJobAccepted, status_code=202)
+def upload_document(
     collection_name: str,
     file: UploadFile = File(...),
     force: bool = Query(False, description="Force re-indexation even if document exists"),
-) -> IndexResult:
+) -> IndexJobAccepted:
     """
-    Upload and index a document in a collection.
+    Upload a document and queue its indexation in a collection.
 
-    Supported formats: PDF, TXT, MD, DOCX
+    Returns immediately with a job ID; poll GET /api/jobs/{job_id} for progress.
+    Supported formats: PDF, TXT, MD, DOCX, CSV
     """
     from core.collection_manager import CollectionManager
-    from core.document_manager import DocumentManager
+    from core.jobs import get_file_indexation
+    from core.parsers import extensions_supportees
+
+    filename = Path(file.filename or "document").name
+    if Path(filename).suffix.lower() not in extensions_supportees():
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {filename}")
 
     cm = CollectionManager()
 
@@ -72,27 +88,40 @@ async def upload_document(
     if not cm.collection_existe(collection_name):
         cm.creer_collection(collection_name)
 
-    # Save uploaded file temporarily
-    suffix = Path(file.filename or "document").suffix
-    with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = Path(tmp.name)
-
-    try:
-        # Rename to original filename for better metadata
-        final_path = tmp_path.parent / (file.filename or "document")
-        tmp_path.rename(final_path)
-
-        dm = DocumentManager(cm)
-        result = dm.ajouter_document(collection_name, final_path, force=force)
-        return IndexResult(**result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Cleanup
-        for p in [tmp_path, final_path]:
-            if p.exists():
-                p.unlink()
+    job_id = get_file_indexation().soumettre(collection_name, filename, file.file, force=force)
+    return IndexJobAccepted(
+        job_id=job_id, status="queued", message=f"{filename} : indexation en file d'attente"
+    )
+
+
+@router.post("/archive", response_model=IndexJobAccepted, status_code=202)
+def upload_archive(
+    collection_name: str,
+    file: UploadFile = File(...),
+    force: bool = Query(False, description="Force re-indexation even if documents exist"),
+) -> IndexJobAccepted:
+    """
+    Upload a zip or tar archive and queue the indexation of all its documents.
+
+    Entries are read straight from the archive, deduplicated by hash and indexed
+    in parallel; the job result (GET /api/jobs/{job_id}) is a single report.
+    """
+    from core.archives import est_archive
+    from core.collection_manager import CollectionManager
+    from core.jobs import get_file_indexation
+
+    filename = Path(file.filename or "archive").name
+    if not est_archive(filename):
+        raise HTTPException(status_code=400, detail=f"Unsupported archive format: {filename}")
+
+    cm = CollectionManager()
+    if not cm.collection_existe(collection_name):
+        cm.creer_collection(collection_name)
+
+    job_id = get_file_indexation().soumettre(collection_name, filename, file.file, force=force)
+    return IndexJobAccepted(
+        job_id=job_id, status="queued", message=f"{filename} : indexation en file d'attente"
+    )
 
 
 @router.delete("/{document_name}", status_code=204)
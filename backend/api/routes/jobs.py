@@ -0,0 +1,75 @@
+"""Background indexing jobs API routes."""
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+class JobInfo(BaseModel):
+    """Status and progress of an indexing job."""
+
+    job_id: str
+    collection: str
+    document: str
+    status: str
+    force: bool
+    created_at: float
+    started_at: float | None
+    finished_at: float | None
+    total_pages: int | None
+    pages_parsed: int
+    chunks: int
+    chunks_embedded: int
+    eta_seconds: float | None
+    result: dict | None
+    error: str | None
+
+
+class JobListResponse(BaseModel):
+    """Response for listing jobs."""
+
+    jobs: list[JobInfo]
+
+
+def _job_info(tache: dict) -> JobInfo:
+    return JobInfo(
+        job_id=tache["id"],
+        collection=tache["collection"],
+        document=tache["nom"],
+        status=tache["statut"],
+        force=tache["force"],
+        created_at=tache["cree"],
+        started_at=tache["debut"],
+        finished_at=tache["fin"],
+        total_pages=tache["total_pages"],
+        pages_parsed=tache["pages"],
+        chunks=tache["chunks"],
+        chunks_embedded=tache["embedded"],
+        eta_seconds=tache["eta"],
+        result=tache["resultat"],
+        error=tache["erreur"],
+    )
+
+
+@router.get("", response_model=JobListResponse)
+def list_jobs(
+    collection: str | None = Query(None, description="Only jobs of this collection"),
+    limit: int = Query(50, ge=1, le=500),
+) -> JobListResponse:
+    """List the most recent indexing jobs."""
+    from core.jobs import get_file_indexation
+
+    taches = get_file_indexation().lister(collection, limit)
+    return JobListResponse(jobs=[_job_info(t) for t in taches])
+
+
+@router.get("/{job_id}", response_model=JobInfo)
+def get_job(job_id: str) -> JobInfo:
+    """Get the status, progress and ETA of an indexing job."""
+    from core.jobs import get_file_indexation
+
+    tache = get_file_indexation().tache(job_id)
+    if tache is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return _job_info(tache)
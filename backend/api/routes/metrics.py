@@ -0,0 +1,46 @@
+"""Runtime metrics endpoint."""
+
+from fastapi import APIRouter
+
+from backend.api.dependencies import (
+    get_embedding_admission,
+    get_generation_admission,
+    get_single_flight,
+)
+from backend.domain.models import ApiResponse
+
+router = APIRouter(prefix="/api/v1", tags=["metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics() -> ApiResponse:
+    """Return runtime counters for caches and pipelines."""
+    from core.answer_cache import CACHE_REPONSES
+    from core.contexte import STATS_EMBALLAGE
+    from core.embeddings import get_cache_embeddings, get_client_embeddings
+    from core.jobs import get_file_indexation
+    from core.ocr import get_cache_ocr
+    from core.paliers import PALIERS_CONTEXTE
+    from core.registry import REGISTRE
+    from core.search import CACHE_REQUETES, GENERATIONS_ANNULEES, MESURES_RECHERCHE
+
+    cache = get_cache_embeddings()
+    data = {
+        "embedding_cache": cache.stats() if cache else None,
+        "embeddings": get_client_embeddings().stats(),
+        "open_handles": REGISTRE.stats(),
+        "query_embedding_cache": CACHE_REQUETES.stats(),
+        "answer_cache": CACHE_REPONSES.stats(),
+        "retrieval_timings": MESURES_RECHERCHE.stats(),
+        "context_packing": STATS_EMBALLAGE.stats(),
+        "context_buckets": PALIERS_CONTEXTE.stats(),
+        "cancelled_generations": GENERATIONS_ANNULEES.stats(),
+        "admission": {
+            "generation": get_generation_admission().stats(),
+            "embedding": get_embedding_admission().stats(),
+        },
+        "single_flight": get_single_flight().stats(),
+        "ocr_cache": get_cache_ocr().stats(),
+        "index_jobs": get_file_indexation().stats(),
+    }
+    return ApiResponse.success(data=data)
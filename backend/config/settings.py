@@ -21,6 +21,22 @@ class Settings(BaseSettings):
     ollama_url: str = "http://ollama:11434"
     ollama_model: str = "llama3.1:8b"
     ollama_embed_model: str = "nomic-embed-text"
+    ollama_timeout: float = 120.0
+    ollama_max_connections: int = 10
+    llm_temperature: float = 0.3
+    # Context window when no bucket is given (requests use core's CONTEXT_BUCKETS)
+    llm_num_ctx: int = 4096
+    # Duration ("30m") or seconds ("-1" = forever) Ollama keeps the model loaded
+    ollama_keep_alive: str = "30m"
+    # Load the generation model in the background at startup
+    ollama_warm_up: bool = True
+
+    # Admission control: requests beyond max_concurrent wait in a bounded
+    # queue; beyond max_queue they get 429 with Retry-After
+    generation_max_concurrent: int = 2
+    generation_max_queue: int = 16
+    embedding_max_concurrent: int = 4
+    embedding_max_queue: int = 32
 
     # ChromaDB settings
     chroma_host: str = "chromadb"
@@ -17,6 +17,14 @@ class ChatRequest(BaseModel):
     collection_name: str = Field(..., min_length=1, description="ChromaDB collection to search")
     prompt_name: str = Field(default="defaut", description="Prompt template name")
     history: list[ChatMessage] = Field(default=[], description="Previous messages for context")
+    mmr_lambda: float | None = Field(
+        default=None, ge=0.0, le=1.0,
+        description="MMR relevance/diversity trade-off (1.0 disables re-ranking); collection default if omitted",
+    )
+    fetch_k: int | None = Field(
+        default=None, ge=1, le=200,
+        description="Candidates fetched before fusion and re-ranking; collection default if omitted",
+    )
 
 
 class ChatSource(BaseModel):
@@ -32,3 +40,7 @@ class ChatResponse(BaseModel):
 
     response: str
     sources: list[ChatSource]
+    prompt_tokens: dict[str, int] | None = Field(
+        default=None,
+        description="Estimated prompt tokens by part (system, history, context, question, total, budget)",
+    )
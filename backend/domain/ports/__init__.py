@@ -2,7 +2,7 @@
 
 from .document_parser_port import DocumentParserPort
 from .embedding_port import EmbeddingPort
-from .llm_port import LlmPort
+from .llm_port import LlmError, LlmPort
 from .vector_store_port import VectorStorePort
 
-__all__ = ["LlmPort", "VectorStorePort", "EmbeddingPort", "DocumentParserPort"]
+__all__ = ["LlmPort", "LlmError", "VectorStorePort", "EmbeddingPort", "DocumentParserPort"]
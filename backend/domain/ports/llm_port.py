@@ -4,6 +4,10 @@ from abc import ABC, abstractmethod
 from typing import AsyncIterator
 
 
+class LlmError(Exception):
+    """Raised when the LLM service cannot produce a response."""
+
+
 class LlmPort(ABC):
     """Port interface for LLM inference operations."""
 
@@ -13,6 +17,7 @@ class LlmPort(ABC):
         prompt: str,
         system_prompt: str | None = None,
         model: str | None = None,
+        num_ctx: int | None = None,
     ) -> AsyncIterator[str]:
         """Generate streaming response from LLM.
 
@@ -20,12 +25,16 @@ class LlmPort(ABC):
             prompt: User prompt with context
             system_prompt: Optional system prompt override
             model: Optional model name override
+            num_ctx: Optional context window override, in tokens
 
         Yields:
             Token chunks as they are generated
         """
         pass
 
+    async def warm_up(self, num_ctx: int | None = None) -> None:
+        """Load the model ahead of the first request (no-op by default)."""
+
     @abstractmethod
     async def check_health(self) -> dict:
         """Check LLM service health.
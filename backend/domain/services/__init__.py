@@ -1 +1,13 @@
 """Domain services."""
+
+from .admission import AdmissionController, AdmissionRejected, AdmissionTicket
+from .single_flight import SharedStream, SingleFlight, Subscription
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionRejected",
+    "AdmissionTicket",
+    "SharedStream",
+    "SingleFlight",
+    "Subscription",
+]
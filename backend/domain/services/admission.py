@@ -0,0 +1,144 @@
+"""Admission control - bounded concurrency and a bounded FIFO wait queue."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """Raised when the wait queue is full; retry after `retry_after` seconds."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Too many {name} requests in progress, retry in {retry_after} s")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A request's place in an AdmissionController: queued, then admitted, then released."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._changed = asyncio.Event()
+        self.queued_at = time.monotonic()
+        self.admitted_at: float | None = None
+        self.released = False
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+    @property
+    def position(self) -> int:
+        """1-based position in the wait queue, 0 once admitted."""
+        return 0 if self.admitted else self._controller._position(self)
+
+    async def positions(self) -> AsyncIterator[int]:
+        """Yield the queue position each time it changes, until admitted."""
+        while not self.admitted:
+            self._changed.clear()
+            yield self.position
+            await self._changed.wait()
+
+    async def wait(self) -> None:
+        """Wait until admitted."""
+        async for _ in self.positions():
+            pass
+
+    def release(self) -> None:
+        """Leave the queue or free the slot; safe to call more than once."""
+        if not self.released:
+            self.released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    """Admits at most `max_concurrent` requests; up to `max_queue` more wait in FIFO order.
+
+    Requests beyond that are rejected at once with AdmissionRejected, so load
+    is shed cleanly instead of slowing every admitted request down. Runs on
+    the event loop: not thread-safe.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._active = 0
+        self._queue: deque[AdmissionTicket] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_total = 0.0
+        self._held = 0
+
+    def enter(self) -> AdmissionTicket:
+        """Take a ticket, admitted at once if a slot is free.
+
+        Raises AdmissionRejected when every slot is busy and the queue is full.
+        """
+        ticket = AdmissionTicket(self)
+        if self._active < self.max_concurrent and not self._queue:
+            self._admit(ticket)
+        elif len(self._queue) < self.max_queue:
+            self._queue.append(ticket)
+        else:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after())
+        return ticket
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[AdmissionTicket]:
+        """Hold an admitted slot for the duration of the block."""
+        ticket = self.enter()
+        try:
+            await ticket.wait()
+            yield ticket
+        finally:
+            ticket.release()
+
+    def retry_after(self) -> int:
+        """Seconds until a queue place is likely to free up, from the mean slot hold time."""
+        hold = self._hold_total / self._held if self._held else 1.0
+        return max(1, math.ceil(hold * (len(self._queue) + 1) / self.max_concurrent))
+
+    def _position(self, ticket: AdmissionTicket) -> int:
+        return self._queue.index(ticket) + 1
+
+    def _admit(self, ticket: AdmissionTicket) -> None:
+        ticket.admitted_at = time.monotonic()
+        wait = ticket.admitted_at - ticket.queued_at
+        self._active += 1
+        self.admitted += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        ticket._changed.set()
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        if ticket.admitted:
+            self._active -= 1
+            self._hold_total += time.monotonic() - ticket.admitted_at
+            self._held += 1
+        else:
+            self._queue.remove(ticket)
+        while self._queue and self._active < self.max_concurrent:
+            self._admit(self._queue.popleft())
+        # Everyone still waiting moved up
+        for waiting in self._queue:
+            waiting._changed.set()
+
+    def stats(self) -> dict:
+        """Slot usage, queue depth and wait times."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queued": len(self._queue),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 2),
+        }
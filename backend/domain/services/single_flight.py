@@ -0,0 +1,163 @@
+"""Single-flight - identical concurrent requests share one upstream event stream."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Hashable
+
+import anyio
+
+
+class Subscription:
+    """One subscriber's iterator over a SharedStream.
+
+    It counts as a subscriber from creation, not from its first read, and
+    closing it leaves the stream even if it was never read: a response
+    dropped before streaming still lets the producer be cancelled.
+    """
+
+    def __init__(self, stream: "SharedStream"):
+        self._stream = stream
+        self._left = False
+        stream.subscribers += 1
+        self._events = self._follow()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> dict:
+        return await anext(self._events)
+
+    async def aclose(self) -> None:
+        await self._events.aclose()
+        self._leave()
+
+    async def _follow(self) -> AsyncIterator[dict]:
+        stream = self._stream
+        index = 0
+        try:
+            while True:
+                while index < len(stream.events):
+                    event = stream.events[index]
+                    index += 1
+                    # A replayed queue position is stale once later events exist
+                    if "queue_position" not in event or index == len(stream.events):
+                        yield event
+                if stream.finished:
+                    return
+                await stream._changed.wait()
+        finally:
+            self._leave()
+
+    def _leave(self) -> None:
+        if not self._left:
+            self._left = True
+            self._stream._leave()
+
+
+class SharedStream:
+    """Events of one producer, fanned out to every subscriber.
+
+    The producer runs in its own task so it keeps going while any subscriber
+    reads; a subscriber joining late first gets the events already produced.
+    When the last subscriber leaves before the end, the producer is cancelled.
+    `on_done` runs once the producer task is over, even if it was cancelled
+    before it started: it releases what was acquired for the producer.
+    """
+
+    def __init__(
+        self,
+        events: AsyncIterator[dict],
+        on_finished: Callable[[], None],
+        on_done: Callable[[], None] | None = None,
+    ):
+        self.events: list[dict] = []
+        self.finished = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._on_finished = on_finished
+        self._task = asyncio.create_task(self._produce(events))
+        if on_done is not None:
+            self._task.add_done_callback(lambda _: on_done())
+
+    def subscribe(self) -> Subscription:
+        """Every event from the first one, then those of the producer as they come."""
+        return Subscription(self)
+
+    def _leave(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.finished:
+            self._finish()
+            self._task.cancel()
+
+    async def _produce(self, events: AsyncIterator[dict]) -> None:
+        try:
+            async for event in events:
+                self.events.append(event)
+                self._notify()
+        except asyncio.CancelledError:
+            # A replay must never end mid-answer without saying why
+            self.events.append({"error": "Generation cancelled"})
+            self._notify()
+            raise
+        finally:
+            with anyio.CancelScope(shield=True):
+                await events.aclose()
+            self._finish()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _finish(self) -> None:
+        if not self.finished:
+            self.finished = True
+            self._on_finished()
+            self._notify()
+
+
+class SingleFlight:
+    """Registry of in-flight shared streams by request key."""
+
+    def __init__(self):
+        self._flights: dict[Hashable, SharedStream] = {}
+        self.started = 0
+        self.joined = 0
+
+    def join(self, key: Hashable) -> Subscription | None:
+        """Subscribe to the in-flight stream for `key`, if any.
+
+        A flight already finished (cancelled once its last subscriber left)
+        is never joined: the caller starts a new one.
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight.finished:
+            return None
+        self.joined += 1
+        return flight.subscribe()
+
+    def start(
+        self,
+        key: Hashable,
+        events: AsyncIterator[dict],
+        on_done: Callable[[], None] | None = None,
+    ) -> Subscription:
+        """Run `events` as the shared stream for `key` and subscribe to it.
+
+        `on_done` runs when the producer is over (see SharedStream).
+        """
+        flight = SharedStream(events, on_finished=lambda: self._forget(key, flight), on_done=on_done)
+        self._flights[key] = flight
+        self.started += 1
+        return flight.subscribe()
+
+    def _forget(self, key: Hashable, flight: SharedStream) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        """Shared streams in flight and how many requests joined one."""
+        return {
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+            "started": self.started,
+            "joined": self.joined,
+        }
@@ -1,17 +1,56 @@
 """FastAPI application entry point."""
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.api.dependencies import get_settings
-from backend.api.routes import chat_router, collections_router, documents_router, health_router
+from backend.api.dependencies import get_llm_port, get_settings
+from backend.api.routes import (
+    chat_router,
+    collections_router,
+    documents_router,
+    health_router,
+    jobs_router,
+    metrics_router,
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_llm() -> None:
+    """Load the generation model so the first question does not wait for it."""
+    from core.paliers import PALIERS_CONTEXTE
+
+    try:
+        await get_llm_port().warm_up(num_ctx=PALIERS_CONTEXTE.initial())
+    except Exception as e:
+        logger.warning("LLM warm-up failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks."""
+    from core.jobs import get_file_indexation
+
+    # Resume queued indexing jobs left over from a previous run
+    jobs = get_file_indexation()
+    warm_up = asyncio.create_task(_warm_up_llm()) if settings.ollama_warm_up else None
+    yield
+    if warm_up:
+        warm_up.cancel()
+    jobs.arreter(timeout=0)
+    await get_llm_port().aclose()
+
 
 app = FastAPI(
     title="chatbot-local",
     description="RAG chatbot for VLM Robotics product knowledge",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -28,6 +67,8 @@ app.include_router(health_router)
 app.include_router(chat_router)
 app.include_router(collections_router)
 app.include_router(documents_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
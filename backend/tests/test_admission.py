@@ -0,0 +1,56 @@
+"""Tests for admission control in front of Ollama."""
+
+import asyncio
+
+import pytest
+
+from backend.domain.services import AdmissionController, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_requests_queue_in_order_and_overflow_is_rejected():
+    """Slots are granted FIFO, queued tickets see their position move, a full queue rejects."""
+    admission = AdmissionController("generation", max_concurrent=1, max_queue=2)
+    first = admission.enter()
+    second = admission.enter()
+    third = admission.enter()
+
+    assert first.admitted and (second.position, third.position) == (1, 2)
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.enter()
+    assert rejected.value.retry_after >= 1
+
+    positions = third.positions()
+    assert await anext(positions) == 2
+    first.release()
+    assert second.admitted and await anext(positions) == 1
+
+    # A queued request that gives up leaves the queue
+    second.release()
+    await asyncio.wait_for(third.wait(), timeout=1)
+    third.release()
+    third.release()
+
+    stats = admission.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert (stats["admitted"], stats["rejected"]) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_slot_limits_concurrency():
+    """No more than max_concurrent blocks run at once."""
+    admission = AdmissionController("embedding", max_concurrent=2, max_queue=10)
+    running = peak = 0
+
+    async def task():
+        nonlocal running, peak
+        async with admission.slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(task() for _ in range(6)))
+
+    assert peak == 2
+    assert admission.stats()["admitted"] == 6
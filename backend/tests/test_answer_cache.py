@@ -0,0 +1,53 @@
+"""Tests for the semantic answer cache."""
+
+from types import SimpleNamespace
+
+from core import search
+from core.answer_cache import CacheReponses, rejouer_reponse
+
+SCOPE = ("vlm_robotics", "vlm_robotics", "llama3.1:8b", None, None)
+
+
+def test_similar_question_hits_within_scope():
+    """Test that a near-identical question reuses the answer in the same scope only."""
+    cache = CacheReponses(seuil=0.95, taille_max=10, ttl=3600)
+    cache.ajouter(SCOPE, [1.0, 0.0], "q", "réponse", [{"fichier": "a.pdf"}], version=1)
+
+    hit = cache.chercher(SCOPE, [0.99, 0.05], version=1)
+    assert hit["reponse"] == "réponse"
+    assert cache.chercher(SCOPE, [0.0, 1.0], version=1) is None
+    assert cache.chercher(("autre", "defaut", "llama3.1:8b", None, None), [1.0, 0.0], version=1) is None
+
+
+def test_collection_version_change_invalidates():
+    """Test that answers generated on an older collection version are ignored."""
+    cache = CacheReponses(seuil=0.9, taille_max=10, ttl=3600)
+    cache.ajouter(SCOPE, [1.0, 0.0], "q", "réponse", [], version=1)
+
+    assert cache.chercher(SCOPE, [1.0, 0.0], version=2) is None
+
+    cache.ajouter(SCOPE, [1.0, 0.0], "q", "réponse", [], version=2)
+    cache.invalider_collection("vlm_robotics")
+    assert cache.chercher(SCOPE, [1.0, 0.0], version=2) is None
+
+
+def test_replay_preserves_text():
+    """Test that replayed tokens rebuild the exact cached answer."""
+    texte = "Le GEMINI  mesure\n4 m."
+    assert "".join(rejouer_reponse(texte)) == texte
+
+
+def test_retrieval_overrides_are_part_of_the_scope(monkeypatch):
+    """Test that an answer is only replayed for the same per-request mmr_lambda and fetch_k."""
+    monkeypatch.setattr(search, "ANSWER_CACHE_ACTIF", True)
+    monkeypatch.setattr(search, "CACHE_REPONSES", CacheReponses(seuil=0.9, taille_max=10, ttl=3600))
+    rag = search.RAGEngine.__new__(search.RAGEngine)
+    rag.nom_collection = rag.prompt_name = "vlm_robotics"
+    rag.cm = SimpleNamespace(version_collection=lambda nom: 1)
+    rag.vecteur_question = lambda question: [1.0, 0.0]
+
+    rag.memoriser_reponse("q", "réponse", [], version=1, mmr_lambda=0.3)
+
+    assert rag.reponse_en_cache("q") is None
+    assert rag.reponse_en_cache("q", mmr_lambda=0.3, fetch_k=50) is None
+    assert rag.reponse_en_cache("q", mmr_lambda=0.3)["reponse"] == "réponse"
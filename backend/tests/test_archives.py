@@ -0,0 +1,53 @@
+"""Tests for archive ingestion without extraction."""
+
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from core import document_manager
+from core.archives import indexer_archive, rapport_archive
+from core.collection_manager import CollectionManager
+from core.document_manager import DocumentManager
+
+from .test_document_manager import FakeEmbeddings
+
+
+def _zip(chemin, fichiers):
+    with zipfile.ZipFile(chemin, "w") as archive:
+        for nom, contenu in fichiers.items():
+            archive.writestr(nom, contenu)
+
+
+def _tar(chemin, fichiers):
+    with tarfile.open(chemin, "w:gz") as archive:
+        for nom, contenu in fichiers.items():
+            info = tarfile.TarInfo(nom)
+            info.size = len(contenu)
+            archive.addfile(info, io.BytesIO(contenu))
+
+
+@pytest.mark.parametrize("nom, ecrire", [("lot.zip", _zip), ("lot.tar.gz", _tar)])
+def test_archive_entries_are_deduplicated_and_reported(tmp_path, monkeypatch, nom, ecrire):
+    """Entries are indexed from memory; duplicates and unsupported files are reported."""
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(document_manager, "get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.collection_manager.get_embeddings", lambda: fake)
+    ecrire(tmp_path / nom, {
+        "manuels/solo.txt": b"Cellule SOLO de soudage robotise",
+        "manuels/compaqt.md": b"# COMPAQT XL\nCellule compacte",
+        "copie/solo-bis.txt": b"Cellule SOLO de soudage robotise",
+        "images/photo.png": b"\x89PNG",
+        "__MACOSX/._solo.txt": b"junk",
+    })
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+
+    rapport = rapport_archive(indexer_archive(dm, "c", tmp_path / nom, workers=2))
+
+    assert (rapport["entries"], rapport["indexed"], rapport["duplicates"], rapport["skipped"]) == (5, 2, 1, 2)
+    assert rapport["errors"] == 0
+    assert [d["nom"] for d in dm.lister_documents("c")] == ["compaqt.md", "solo.txt"]
+
+    rapport = rapport_archive(indexer_archive(dm, "c", tmp_path / nom))
+    assert rapport["indexed"] == 0 and rapport["skipped"] == 4
@@ -0,0 +1,50 @@
+"""Tests for the BM25 index, rank fusion and MMR re-ranking."""
+
+import numpy as np
+import pytest
+
+from core.bm25 import IndexBM25, tokeniser
+from core.search import scores_rrf, selection_mmr
+
+
+def test_tokeniser_keeps_references_and_strips_accents():
+    """Test tokenization of product names and part numbers."""
+    assert tokeniser("Différence SOLO / COMPAQT, réf. 6ES7-315") == [
+        "difference", "solo", "compaqt", "ref", "6es7", "315",
+    ]
+
+
+def test_bm25_ranks_exact_terms_and_supports_updates(tmp_path):
+    """Test ranking, re-indexing and deletion of chunks."""
+    index = IndexBM25(tmp_path / "bm25.sqlite3")
+    index.ajouter(
+        ["a", "b", "c"],
+        ["Torche CMT Fronius sur GEMINI", "Cellule COMPAQT XL", "Usinage et fabrication additive"],
+    )
+
+    assert index.rechercher("soudage CMT Fronius", 2)[0][0] == "a"
+
+    index.ajouter(["a"], ["Cellule SOLO"])
+    assert index.rechercher("Fronius", 2) == []
+
+    index.supprimer(["b"])
+    assert index.nb_chunks() == 2
+    assert index.rechercher("COMPAQT", 2) == []
+
+
+def test_rrf_fusion_rewards_agreement():
+    """Test that items ranked by both retrievers come first."""
+    scores = scores_rrf([["x", "y", "z"], ["y", "w"]], k=60)
+
+    assert max(scores, key=scores.get) == "y"
+    assert scores["y"] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores["x"] > scores["w"] > scores["z"]
+
+
+def test_mmr_skips_near_duplicates():
+    """Test that MMR prefers a distinct chunk over a near-duplicate of the first pick."""
+    relevance = np.array([1.0, 0.95, 0.6])
+    vectors = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]], dtype=np.float32)
+
+    assert selection_mmr(relevance, vectors, k=2, lambda_=0.5) == [0, 2]
+    assert selection_mmr(relevance, vectors, k=2, lambda_=1.0) == [0, 1]
@@ -0,0 +1,77 @@
+"""Tests for the SQLite document catalog."""
+
+import json
+import os
+
+from core import document_manager
+from core.catalog import Catalogue
+from core.collection_manager import CollectionManager
+from core.document_manager import DocumentManager, calculer_hash, empreinte_fichier
+
+
+def test_register_replace_and_delete(tmp_path):
+    """Re-registering a document replaces its chunks; deletion returns them."""
+    catalogue = Catalogue(tmp_path / "catalog.sqlite3")
+    catalogue.enregistrer_document("a.pdf", "h1", 2, ["c1", "c2", "c3"])
+    catalogue.enregistrer_document("a.pdf", "h2", 2, ["c3", "c4"])
+
+    assert catalogue.chunk_ids("a.pdf") == ["c3", "c4"]
+    assert catalogue.document("a.pdf")["sha256"] == "h2"
+    assert catalogue.document("a.pdf")["nb_chunks"] == 2
+    assert catalogue.documents_par_hash("h2") == ["a.pdf"]
+
+    assert catalogue.supprimer_document("a.pdf") == ["c3", "c4"]
+    assert catalogue.supprimer_document("a.pdf") is None
+    assert catalogue.chunk_ids("a.pdf") == []
+
+
+def test_paginated_listing(tmp_path):
+    """Documents are listed by name, page by page."""
+    catalogue = Catalogue(tmp_path / "catalog.sqlite3")
+    for nom in ["c.txt", "a.txt", "b.txt"]:
+        catalogue.enregistrer_document(nom, nom, 1, [nom + "-0"])
+
+    assert catalogue.compter() == 3
+    assert [d["nom"] for d in catalogue.lister(limit=2)] == ["a.txt", "b.txt"]
+    assert [d["nom"] for d in catalogue.lister(offset=2)] == ["c.txt"]
+
+
+def test_migrates_metadata_json(tmp_path):
+    """An existing metadata.json is imported once, then renamed."""
+    (tmp_path / "metadata.json").write_text(json.dumps({"documents": {
+        "doc.md": {"sha256": "h", "date": "2024-01-01T00:00:00", "chunk_ids": ["x", "y"],
+                   "nb_chunks": 2, "nb_pages": 1},
+    }}))
+
+    catalogue = Catalogue(tmp_path / "catalog.sqlite3")
+
+    assert catalogue.chunk_ids("doc.md") == ["x", "y"]
+    assert catalogue.document("doc.md")["date"] == "2024-01-01T00:00:00"
+    assert not (tmp_path / "metadata.json").exists()
+    assert (tmp_path / "metadata.json.migrated").exists()
+
+
+def test_unchanged_files_are_skipped_without_hashing(tmp_path, monkeypatch):
+    """A matching (size, mtime, inode) skips hashing; a touched file is hashed once."""
+    fichier = tmp_path / "doc.txt"
+    fichier.write_text("contenu")
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+    dm.cm.catalogue("c").enregistrer_document(
+        "doc.txt", calculer_hash(fichier), 1, ["x"], empreinte=empreinte_fichier(fichier)
+    )
+
+    appels = []
+    monkeypatch.setattr(
+        document_manager, "calculer_hash", lambda c: appels.append(c) or calculer_hash(c)
+    )
+    assert dm.analyser_fichier("c", fichier) == (True, None)
+    assert appels == []
+
+    os.utime(fichier, ns=(0, 0))
+    assert dm.analyser_fichier("c", fichier)[0] is True
+    assert dm.analyser_fichier("c", fichier) == (True, None)
+    assert len(appels) == 1
+
+    fichier.write_text("modifié")
+    indexe, sha256 = dm.analyser_fichier("c", fichier)
+    assert not indexe and sha256 == calculer_hash(fichier)
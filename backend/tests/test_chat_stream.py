@@ -0,0 +1,87 @@
+"""Tests for the SSE chat stream."""
+
+import pytest
+from fastapi import HTTPException
+
+from backend.api.routes import chat
+from backend.domain.models.chat import ChatRequest
+from backend.domain.services import AdmissionController, SingleFlight
+from core.search import GENERATIONS_ANNULEES
+
+
+class FakeLlm:
+    """Yields tokens until closed, recording how far it got."""
+
+    def __init__(self):
+        self.sent = 0
+        self.closed = False
+
+    async def generate_stream(self, prompt, system_prompt=None, model=None, num_ctx=None):
+        try:
+            for i in range(100):
+                self.sent += 1
+                yield f"t{i} "
+        finally:
+            self.closed = True
+
+
+class FakeHttpRequest:
+    """Reports a disconnect after `after` checks."""
+
+    def __init__(self, after: int):
+        self.after = after
+
+    async def is_disconnected(self) -> bool:
+        self.after -= 1
+        return self.after < 0
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_closes_the_upstream_generation(monkeypatch):
+    """A disconnect stops reading from the LLM, closes its stream and counts the waste."""
+    generation = {
+        "rag": None, "cached": None, "system": "", "prompt": "p", "sources": [],
+        "tokens": {"total": 10}, "num_ctx": 2048, "version": 0,
+    }
+    monkeypatch.setattr(chat, "_prepare_generation", lambda *args: generation)
+    avant = GENERATIONS_ANNULEES.stats()
+    llm = FakeLlm()
+    generation_admission = AdmissionController("generation", 1, 1)
+
+    rag_events = chat._rag_events(
+        ChatRequest(message="q", collection_name="c", history=[{"role": "user", "content": "h"}]),
+        llm,
+        generation_admission.enter(),
+        AdmissionController("embedding", 1, 1).enter(),
+    )
+    events = [event async for event in chat._stream_rag_response(rag_events, FakeHttpRequest(after=3))]
+
+    assert len(events) == 3 and not any("done" in event for event in events)
+    assert llm.closed and llm.sent == 4
+    assert generation_admission.stats()["active"] == 0
+    apres = GENERATIONS_ANNULEES.stats()
+    assert apres["cancelled"] == avant["cancelled"] + 1
+    assert apres["wasted_tokens"] == avant["wasted_tokens"] + 4
+
+
+@pytest.mark.asyncio
+async def test_full_embedding_queue_answers_429_before_streaming():
+    """A full retrieval queue is a 429 response, not an error event in a 200 stream."""
+    generation_admission = AdmissionController("generation", 1, 1)
+    embedding_admission = AdmissionController("embedding", 1, 0)
+    busy = embedding_admission.enter()
+
+    with pytest.raises(HTTPException) as rejected:
+        await chat.chat(
+            ChatRequest(message="q", collection_name="c"),
+            FakeHttpRequest(after=0),
+            FakeLlm(),
+            generation_admission,
+            embedding_admission,
+            SingleFlight(),
+        )
+
+    assert rejected.value.status_code == 429
+    assert "Retry-After" in rejected.value.headers
+    assert generation_admission.stats()["active"] == 0
+    busy.release()
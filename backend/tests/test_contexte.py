@@ -0,0 +1,53 @@
+"""Tests for the token-budgeted prompt packer."""
+
+from core.contexte import emballer, estimer_tokens, fusionner_chevauchement
+
+TEMPLATE = "Consignes.\n{context}\n{history_section}\nQuestion : {question}"
+
+
+def _chunk(texte, source="doc.pdf", page=1, distance=0.1):
+    return texte, {"source": source, "page": page}, distance
+
+
+def test_overlapping_chunks_of_a_page_are_merged():
+    """The shared overlap of two consecutive chunks is sent once."""
+    debut = "Le robot GEMINI dispose de deux bras. " * 3
+    commun = "La cellule mesure vingt mètres de long. " * 2
+    fin = "Elle accueille le WAAM et l'usinage."
+
+    assert fusionner_chevauchement(debut + commun, commun + fin) == debut + commun + fin
+    assert fusionner_chevauchement(debut, fin) is None
+
+    emballe = emballer(TEMPLATE, "Taille ?", [
+        _chunk(commun + fin, distance=0.2),
+        _chunk(debut + commun, distance=0.1),
+        _chunk(debut + commun, page=2),
+    ])
+    assert emballe.prompt.count(commun) == 2
+    assert emballe.chunks == {"candidates": 3, "packed": 3, "merged": 1, "dropped": 0}
+    assert [(s["page"], s["score"]) for s in emballe.sources] == [(1, 0.1), (2, 0.1)]
+
+
+def test_chunks_fill_the_budget_by_relevance():
+    """A chunk that does not fit is dropped; smaller, less relevant ones still fill the budget."""
+    gros, moyen, petit = "a" * 700, "b" * 350, "c" * 70
+    chunks = [_chunk(moyen, page=1), _chunk(gros, page=2), _chunk(petit, page=3)]
+
+    emballe = emballer(TEMPLATE, "Q ?", chunks, budget=200)
+
+    assert moyen in emballe.prompt and petit in emballe.prompt and gros not in emballe.prompt
+    assert emballe.chunks["dropped"] == 1
+    assert emballe.tokens["total"] <= 200
+
+
+def test_history_keeps_the_most_recent_messages_within_its_share():
+    """Long history is trimmed from the oldest messages instead of crowding out the context."""
+    historique = "\n".join(f"User: question numéro {i} " + "x" * 100 for i in range(50))
+    contexte = "Contexte indispensable. " * 20
+
+    emballe = emballer(TEMPLATE, "Q ?", [_chunk(contexte)], historique=historique, budget=1000)
+
+    assert contexte in emballe.prompt
+    assert "question numéro 49" in emballe.prompt and "question numéro 0 " not in emballe.prompt
+    assert emballe.tokens["history"] <= 250 + estimer_tokens("\nHistorique de conversation:\n\n")
+    assert emballe.tokens["total"] <= 1000
@@ -0,0 +1,106 @@
+"""Tests for streaming document indexing."""
+
+import pymupdf
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from core import document_manager, parsers
+from core.collection_manager import CollectionManager
+from core.document_manager import DocumentManager
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic embeddings that record batch sizes."""
+
+    def __init__(self):
+        self.lots = []
+
+    def embed_documents(self, texts):
+        self.lots.append(len(texts))
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.0]
+
+
+def test_large_document_is_indexed_in_bounded_batches(tmp_path, monkeypatch):
+    """Chunks are embedded and written batch by batch, with progress reports."""
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(document_manager, "get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.collection_manager.get_embeddings", lambda: fake)
+    # Budget d'environ trois chunks par lot
+    monkeypatch.setattr(
+        document_manager, "INGEST_BATCH_MEMORY_MB",
+        3 * (1000 + document_manager.OCTETS_PAR_VECTEUR) / (1024 * 1024),
+    )
+
+    fichier = tmp_path / "gros.txt"
+    fichier.write_text("\n\n".join(f"Paragraphe {i} " + "mot " * 200 for i in range(10)))
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+    etats = []
+
+    resultat = dm.ajouter_document("c", fichier, progression=etats.append)
+
+    assert resultat["status"] == "indexed"
+    assert len(fake.lots) >= 3 and max(fake.lots) <= 4
+    assert sum(fake.lots) == resultat["chunks"] == resultat["embedded"]
+    assert etats[-1]["chunks"] == resultat["chunks"]
+    assert len(dm.cm.catalogue("c").chunk_ids("gros.txt")) == resultat["chunks"]
+    assert dm.cm.get_collection("c")._collection.count() == resultat["chunks"]
+
+    fake.lots.clear()
+    resultat = dm.ajouter_document("c", fichier, force=True)
+    assert resultat["deleted"] == 0 and sum(fake.lots) == resultat["chunks"]
+
+
+def test_parse_error_midway_leaves_the_indexed_document_untouched(tmp_path, monkeypatch):
+    """A failing page batch aborts re-indexing: old chunks and catalog entry are kept for a retry."""
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(document_manager, "get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.collection_manager.get_embeddings", lambda: fake)
+    monkeypatch.setattr(parsers, "PDF_PAGES_PAR_LOT", 2)
+    chemin = tmp_path / "manuel.pdf"
+    doc = pymupdf.open()
+    for i in range(6):
+        doc.new_page().insert_text((72, 72), f"Contenu de la page {i + 1}")
+    doc.save(str(chemin))
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+    avant = dm.ajouter_document("c", chemin)
+
+    convertir = parsers._convertir_pages
+
+    def _echec_second_lot(doc, numeros):
+        if numeros[0] == 2:
+            raise RuntimeError("erreur transitoire")
+        return convertir(doc, numeros)
+
+    monkeypatch.setattr(parsers, "_convertir_pages", _echec_second_lot)
+    with pytest.raises(RuntimeError):
+        dm.ajouter_document("c", chemin, force=True)
+
+    catalogue = dm.cm.catalogue("c")
+    assert len(catalogue.chunk_ids("manuel.pdf")) == avant["chunks"] == 6
+    assert dm.cm.get_collection("c")._collection.count() == 6
+    assert dm.analyser_fichier("c", chemin)[0]
+
+
+def test_blank_pages_count_as_processed(tmp_path, monkeypatch):
+    """Pages without text still count, so progress reaches the file's page count."""
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(document_manager, "get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.collection_manager.get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.ocr.ocr_disponible", lambda: False)
+    chemin = tmp_path / "annexe.pdf"
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Page de titre du manuel")
+    doc.new_page()
+    doc.new_page().insert_text((72, 72), "Conclusion du manuel")
+    doc.save(str(chemin))
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+    etats = []
+
+    resultat = dm.ajouter_document("c", chemin, progression=etats.append)
+
+    assert etats[-1]["pages"] == resultat["pages"] == parsers.compter_pages(chemin) == 3
+    assert dm.cm.catalogue("c").document("annexe.pdf")["nb_pages"] == 3
+    assert document_manager.preparer_document(chemin).nb_pages == 3
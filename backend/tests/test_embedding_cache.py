@@ -0,0 +1,52 @@
+"""Tests for the on-disk chunk embedding cache."""
+
+from core.embedding_cache import CacheEmbeddings, EmbeddingsEnCache, hash_texte
+
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def test_cache_hits_skip_model(tmp_path):
+    """Test that cached chunks are not sent back to the model."""
+    cache = CacheEmbeddings(tmp_path / "cache.sqlite3", 1024 * 1024)
+    modele = _FakeEmbeddings()
+    embeddings = EmbeddingsEnCache(modele, "fake", cache)
+
+    premiers = embeddings.embed_documents(["a", "bb", "a"])
+    seconds = embeddings.embed_documents(["bb", "ccc"])
+
+    assert premiers == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert seconds == [[2.0, 1.0], [3.0, 1.0]]
+    assert modele.calls == [["a", "bb"], ["ccc"]]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 4
+
+
+def test_cache_is_scoped_by_model(tmp_path):
+    """Test that the same text under another model is a miss."""
+    cache = CacheEmbeddings(tmp_path / "cache.sqlite3", 1024 * 1024)
+    cache.ecrire("m1", [hash_texte("x")], [[1.0]])
+
+    assert cache.lire("m2", [hash_texte("x")]) == {}
+    assert cache.lire("m1", [hash_texte("x")]) == {hash_texte("x"): [1.0]}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test size-based eviction keeps the cache under its limit."""
+    cache = CacheEmbeddings(tmp_path / "cache.sqlite3", 10 * 4 * 4)
+    for i in range(20):
+        cache.ecrire("m", [hash_texte(str(i))], [[0.0] * 4])
+
+    stats = cache.stats()
+    assert stats["size_bytes"] <= stats["max_size_bytes"]
+    assert stats["evictions"] > 0
+    assert cache.lire("m", [hash_texte("19")])
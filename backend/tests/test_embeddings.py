@@ -0,0 +1,113 @@
+"""Tests for the batched Ollama embeddings client."""
+
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from core.embeddings import OllamaBatchEmbeddings
+
+
+def _embeddings(handler, **kwargs) -> OllamaBatchEmbeddings:
+    return OllamaBatchEmbeddings(
+        modele="test-embed",
+        base_url="http://ollama",
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def _echo(request: httpx.Request) -> httpx.Response:
+    inputs = json.loads(request.content)["input"]
+    return httpx.Response(200, json={"embeddings": [[float(len(t))] for t in inputs]})
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_batches_and_keeps_order():
+    """Test that texts are split into batches and results keep input order."""
+    sizes = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sizes.append(len(json.loads(request.content)["input"]))
+        return _echo(request)
+
+    embeddings = _embeddings(handler, taille_lot=2, max_en_vol=2)
+    vectors = await embeddings.aembed_documents(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert sorted(sizes) == [1, 2, 2]
+    assert embeddings.stats()["texts"] == 5
+
+
+@pytest.mark.asyncio
+async def test_timeout_shrinks_batch_size():
+    """Test that a timed-out batch is split and the batch size shrinks."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if len(json.loads(request.content)["input"]) > 2:
+            raise httpx.ReadTimeout("too slow", request=request)
+        return _echo(request)
+
+    embeddings = _embeddings(handler, taille_lot=8)
+    vectors = await embeddings.aembed_documents(["x"] * 8)
+
+    assert vectors == [[1.0]] * 8
+    assert embeddings.taille_lot == 2
+    assert embeddings.stats()["timeouts"] > 0
+
+
+def test_sync_facade():
+    """Test that the synchronous LangChain API runs the same pipeline."""
+    assert _embeddings(_echo).embed_query("abc") == [3.0]
+
+
+def test_in_flight_limit_is_shared_across_event_loops():
+    """Test that max_en_vol bounds requests from threads running their own loops."""
+    lock = threading.Lock()
+    active = peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        with lock:
+            active -= 1
+        return _echo(request)
+
+    embeddings = _embeddings(handler, taille_lot=1, max_en_vol=2)
+    threads = [
+        threading.Thread(target=asyncio.run, args=(embeddings.aembed_documents(["x"] * 4),))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert embeddings.stats()["requests"] == 12
+    assert peak == 2
+
+
+def test_batch_size_grows_back_after_successes():
+    """Test that a shrunk batch size doubles back after full batches succeed, up to its maximum."""
+    slow = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if slow and len(json.loads(request.content)["input"]) > 2:
+            raise httpx.ReadTimeout("too slow", request=request)
+        return _echo(request)
+
+    embeddings = _embeddings(handler, taille_lot=8, max_en_vol=1, croissance_apres=8)
+    embeddings.embed_documents(["x"] * 8)
+    assert embeddings.taille_lot == 2
+
+    slow = False
+    embeddings.embed_documents(["x"] * 16)
+    assert embeddings.taille_lot == 4
+    embeddings.embed_documents(["x"] * 64)
+    assert embeddings.taille_lot == 8
+    assert embeddings.stats()["batch_grows"] == 2
@@ -0,0 +1,117 @@
+"""Tests for ingest.py: the parallel indexing pipeline and --cleanup."""
+
+import os
+import threading
+
+import ingest
+import pytest
+
+from core import document_manager
+from core.collection_manager import CollectionManager
+from core.document_manager import DocumentManager, preparer_document
+from core.jobs import FileIndexation
+from core.journal import JournalIngestion
+
+from .test_document_manager import FakeEmbeddings
+
+
+def _preparer_ou_mourir(chemin, *args):
+    """Kills the pool worker on a given file, like an OOM kill."""
+    if chemin.name == "mortel.txt":
+        os._exit(1)
+    return preparer_document(chemin, *args)
+
+
+def _indexer(tmp_path, monkeypatch, noms, contenu=None):
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(document_manager, "get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.collection_manager.get_embeddings", lambda: fake)
+    fichiers = []
+    for nom in noms:
+        fichier = tmp_path / nom
+        fichier.write_text(contenu or f"Contenu du fichier {nom}")
+        fichiers.append(fichier)
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+
+    resultats = {}
+
+    def _run():
+        for fichier, resultat in ingest.indexer_parallele(dm, "c", fichiers, False, workers=2):
+            resultats[fichier.name] = resultat["status"]
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive(), "indexer_parallele did not finish"
+    return resultats
+
+
+def test_parallel_pipeline_indexes_every_file(tmp_path, monkeypatch):
+    """Files go through parsing, embedding and writing stages and are all indexed."""
+    resultats = _indexer(tmp_path, monkeypatch, [f"doc{i}.txt" for i in range(5)])
+
+    assert resultats == {f"doc{i}.txt": "indexed" for i in range(5)}
+
+
+def test_killed_worker_reports_errors_instead_of_hanging(tmp_path, monkeypatch):
+    """A dead pool worker breaks the pool: every file still gets a result."""
+    monkeypatch.setattr(ingest, "preparer_document", _preparer_ou_mourir)
+    noms = ["mortel.txt"] + [f"doc{i}.txt" for i in range(7)]
+
+    resultats = _indexer(tmp_path, monkeypatch, noms)
+
+    assert sorted(resultats) == sorted(noms)
+    assert resultats["mortel.txt"] == "error"
+
+
+def test_parallel_pipeline_writes_large_documents_in_bounded_batches(tmp_path, monkeypatch):
+    """With --workers, a large document is embedded and written batch by batch, not at once."""
+    # Budget d'environ trois chunks par lot
+    monkeypatch.setattr(
+        document_manager, "INGEST_BATCH_MEMORY_MB",
+        3 * (1000 + document_manager.OCTETS_PAR_VECTEUR) / (1024 * 1024),
+    )
+    ecrits = []
+    ecrire_chunks = DocumentManager._ecrire_chunks
+
+    def _espionner(self, collection, nom, ids, *args):
+        ecrits.append((nom, len(ids)))
+        return ecrire_chunks(self, collection, nom, ids, *args)
+
+    monkeypatch.setattr(DocumentManager, "_ecrire_chunks", _espionner)
+    contenu = "\n\n".join(f"Paragraphe {i} " + "mot " * 200 for i in range(10))
+
+    resultats = _indexer(tmp_path, monkeypatch, ["gros.txt", "petit.txt"], contenu)
+
+    assert resultats == {"gros.txt": "indexed", "petit.txt": "indexed"}
+    lots = [taille for nom, taille in ecrits if nom == "gros.txt"]
+    assert len(lots) >= 3 and max(lots) <= 4
+
+
+def _nettoyer_sans_supprimer(tmp_path, monkeypatch, journal):
+    """Runs --cleanup on collection "c", expecting a refusal before any deletion."""
+
+    def _interdit(*args):
+        raise AssertionError("partial chunks cleaned during an indexation")
+
+    monkeypatch.setattr(DocumentManager, "nettoyer_chunks_partiels", _interdit)
+    monkeypatch.setattr(ingest, "FileIndexation", lambda: FileIndexation(tmp_path / "jobs"))
+    with pytest.raises(SystemExit):
+        ingest.nettoyer(journal, "c")
+
+
+def test_cleanup_refuses_while_a_run_is_alive(tmp_path, monkeypatch):
+    """--cleanup leaves the collection alone while another ingest.py run is indexing it."""
+    journal = JournalIngestion(tmp_path / "runs.sqlite3")
+    journal.creer_run("c", "src", False, 1, [])
+
+    _nettoyer_sans_supprimer(tmp_path, monkeypatch, journal)
+
+
+def test_cleanup_refuses_while_a_job_is_running(tmp_path, monkeypatch):
+    """--cleanup leaves the collection alone while the API job queue is indexing it."""
+    file = FileIndexation(tmp_path / "jobs")
+    file.soumettre("c", "doc.txt", b"contenu")
+    file._prendre()
+
+    _nettoyer_sans_supprimer(tmp_path, monkeypatch, JournalIngestion(tmp_path / "runs.sqlite3"))
@@ -0,0 +1,59 @@
+"""Tests for the persistent background indexing queue."""
+
+import time
+
+from core import jobs
+from core.jobs import FileIndexation
+
+
+def _attendre(file, job_id, statuts=("done", "error"), delai=10.0):
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        tache = file.tache(job_id)
+        if tache["statut"] in statuts:
+            return tache
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {tache['statut']}")
+
+
+def _indexer_factice(collection, chemin, force, progression):
+    progression({"document": chemin.name, "pages": 1, "chunks": 3, "embedded": 3})
+    return {"status": "indexed", "chunks": 3, "message": f"{chemin.name} : {chemin.read_text()}"}
+
+
+def test_job_runs_in_background_and_reports_progress(tmp_path):
+    """A submitted upload is indexed by a worker thread and its result recorded."""
+    file = FileIndexation(tmp_path, workers=2, indexer=_indexer_factice)
+    job_id = file.soumettre("c", "notes.txt", b"contenu")
+    assert file.tache(job_id)["statut"] == "queued"
+
+    file.demarrer()
+    try:
+        tache = _attendre(file, job_id)
+    finally:
+        file.arreter(timeout=5)
+
+    assert tache["statut"] == "done"
+    assert tache["nom"] == "notes.txt"
+    assert (tache["pages"], tache["embedded"]) == (1, 3)
+    assert tache["resultat"]["message"] == "notes.txt : contenu"
+    assert not (tmp_path / "files" / job_id).exists()
+
+
+def test_abandoned_running_job_is_resumed_after_restart(tmp_path, monkeypatch):
+    """A job left 'running' by a dead process goes back to the queue."""
+    monkeypatch.setattr(jobs, "JOBS_STALE", 0.1)
+    premiere = FileIndexation(tmp_path, indexer=_indexer_factice)
+    job_id = premiere.soumettre("c", "doc.txt", b"repris")
+    assert premiere._prendre()["id"] == job_id  # processus arrêté pendant l'indexation
+    time.sleep(0.2)
+
+    seconde = FileIndexation(tmp_path, indexer=_indexer_factice)
+    seconde.demarrer()
+    try:
+        tache = _attendre(seconde, job_id)
+    finally:
+        seconde.arreter(timeout=5)
+
+    assert tache["statut"] == "done"
+    assert tache["resultat"]["message"] == "doc.txt : repris"
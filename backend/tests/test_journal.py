@@ -0,0 +1,107 @@
+"""Tests for resumable ingestion: partial chunks and the run journal."""
+
+import subprocess
+import sys
+
+import pytest
+
+from core import document_manager
+from core.collection_manager import CollectionManager
+from core.document_manager import DocumentManager
+from core.journal import JournalIngestion
+
+from .test_document_manager import FakeEmbeddings
+
+
+class CrashingEmbeddings(FakeEmbeddings):
+    """Fake embeddings that fail after a given number of batches."""
+
+    def __init__(self, lots_avant_crash):
+        super().__init__()
+        self.lots_avant_crash = lots_avant_crash
+
+    def embed_documents(self, texts):
+        if len(self.lots) >= self.lots_avant_crash:
+            raise ConnectionError("Ollama redémarré")
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def gros_fichier(tmp_path, monkeypatch):
+    # Budget d'environ trois chunks par lot
+    monkeypatch.setattr(
+        document_manager, "INGEST_BATCH_MEMORY_MB",
+        3 * (1000 + document_manager.OCTETS_PAR_VECTEUR) / (1024 * 1024),
+    )
+    fichier = tmp_path / "gros.txt"
+    fichier.write_text("\n\n".join(f"Paragraphe {i} " + "mot " * 200 for i in range(10)))
+    return fichier
+
+
+def _utiliser(monkeypatch, fake):
+    monkeypatch.setattr(document_manager, "get_embeddings", lambda: fake)
+    monkeypatch.setattr("core.collection_manager.get_embeddings", lambda: fake)
+
+
+def test_interrupted_document_resumes_after_last_written_batch(tmp_path, monkeypatch, gros_fichier):
+    """Re-indexing after a crash only embeds the chunks not yet written."""
+    crash = CrashingEmbeddings(lots_avant_crash=2)
+    _utiliser(monkeypatch, crash)
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+
+    with pytest.raises(ConnectionError):
+        dm.ajouter_document("c", gros_fichier)
+    catalogue = dm.cm.catalogue("c")
+    ecrits = sum(crash.lots)
+    assert catalogue.document("gros.txt") is None
+    assert len(catalogue.chunks_en_cours("gros.txt", ecrits=True)) == ecrits
+
+    fake = FakeEmbeddings()
+    _utiliser(monkeypatch, fake)
+    resultat = dm.ajouter_document("c", gros_fichier)
+
+    assert resultat["status"] == "indexed"
+    assert sum(fake.lots) == resultat["embedded"] == resultat["chunks"] - ecrits
+    assert catalogue.chunks_en_cours("gros.txt") == []
+    assert dm.cm.get_collection("c")._collection.count() == resultat["chunks"]
+
+
+def test_cleanup_removes_partial_chunks(tmp_path, monkeypatch, gros_fichier):
+    """Chunks of an abandoned indexation are deleted; indexed documents are kept."""
+    fake = FakeEmbeddings()
+    _utiliser(monkeypatch, fake)
+    dm = DocumentManager(CollectionManager(tmp_path / "db"))
+    autre = tmp_path / "autre.txt"
+    autre.write_text("Un document complet.")
+    dm.ajouter_document("c", autre)
+
+    _utiliser(monkeypatch, CrashingEmbeddings(lots_avant_crash=1))
+    with pytest.raises(ConnectionError):
+        dm.ajouter_document("c", gros_fichier)
+
+    supprimes = dm.nettoyer_chunks_partiels("c")
+
+    assert supprimes > 0
+    assert dm.cm.get_collection("c")._collection.count() == 1
+    assert dm.cm.catalogue("c").chunks_orphelins() == []
+
+
+def test_run_journal_tracks_remaining_files(tmp_path):
+    """Files are checked off as processed; a run whose process died is interrupted."""
+    journal = JournalIngestion(tmp_path / "runs.sqlite3")
+    run_id = journal.creer_run("c", "./docs", False, 1, ["a.pdf", "b.pdf", "c.pdf"])
+    journal.marquer_fichier(run_id, "a.pdf", "indexed", 12, "a.pdf : 12 chunks")
+
+    assert journal.fichiers_restants(run_id) == ["b.pdf", "c.pdf"]
+    assert journal.run(run_id)["statut"] == "running"
+    assert journal.dernier_interrompu() is None
+
+    mort = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True)
+    journal._conn.execute("UPDATE runs SET pid = ? WHERE id = ?", (int(mort.stdout), run_id))
+    journal._conn.commit()
+
+    run = journal.dernier_interrompu()
+    assert run["id"] == run_id and run["fichiers"] == {"indexed": 1, "pending": 2}
+    assert journal.abandonner("c") == 1
+    assert journal.run(run_id)["statut"] == "abandoned"
@@ -0,0 +1,74 @@
+"""Tests for the OCR fallback of scanned PDF pages."""
+
+import sys
+import types
+
+import pymupdf
+
+from core import ocr
+from core.ocr import CacheOCR
+from core.parsers import iterer_pages
+
+
+def test_scanned_pages_are_ocred_once(tmp_path, monkeypatch):
+    """Only low-text pages go to OCR, and re-parsing hits the page-image cache."""
+    chemin = tmp_path / "brochure.pdf"
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Page texte : cellule de soudage robotisée COMPAQT XL " * 2)
+    doc.new_page().draw_rect(pymupdf.Rect(50, 50, 300, 300), color=(0, 0, 0), fill=(0.2, 0.4, 0.6))
+    doc.save(str(chemin))
+
+    appels = []
+    monkeypatch.setattr(ocr, "ocr_disponible", lambda: True)
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 1)
+    monkeypatch.setattr(ocr, "_cache_ocr", CacheOCR(tmp_path / "ocr.sqlite3"))
+    monkeypatch.setattr(ocr, "_ocr_image", lambda image, langue: appels.append(image) or "Texte reconnu")
+
+    pages = list(iterer_pages(chemin))
+    assert [(p.page, p.texte) for p in pages][1] == (2, "Texte reconnu")
+    assert "COMPAQT" in pages[0].texte
+    assert len(appels) == 1
+
+    assert [p.texte for p in iterer_pages(chemin)] == [p.texte for p in pages]
+    assert len(appels) == 1
+    assert ocr.get_cache_ocr().stats()["hits"] == 1
+
+
+def test_failed_page_ocr_keeps_the_extracted_text(tmp_path, monkeypatch):
+    """An OCR error on one page neither aborts the document nor gets cached."""
+    chemin = tmp_path / "scan.pdf"
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), "Légende courte")
+    doc.new_page().draw_rect(pymupdf.Rect(50, 50, 300, 300), color=(0, 0, 0), fill=(0.2, 0.4, 0.6))
+    doc.save(str(chemin))
+
+    def _ocr_image(image, langue):
+        raise RuntimeError("tesseract: langue fra introuvable")
+
+    monkeypatch.setattr(ocr, "ocr_disponible", lambda: True)
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 1)
+    monkeypatch.setattr(ocr, "_cache_ocr", CacheOCR(tmp_path / "ocr.sqlite3"))
+    monkeypatch.setattr(ocr, "_ocr_image", _ocr_image)
+
+    pages = list(iterer_pages(chemin))
+
+    assert [(p.page, p.texte) for p in pages] == [(1, "Légende courte"), (2, "")]
+    assert ocr.get_cache_ocr().stats()["entries"] == 0
+
+
+def test_ocr_requires_the_configured_languages(monkeypatch):
+    """OCR is disabled when a language of OCR_LANG has no traineddata."""
+    tesseract = types.SimpleNamespace(
+        get_tesseract_version=lambda: "5.3.0", get_languages=lambda config="": ["eng", "osd"]
+    )
+    monkeypatch.setitem(sys.modules, "pytesseract", tesseract)
+    monkeypatch.setitem(sys.modules, "PIL", types.ModuleType("PIL"))
+    monkeypatch.setattr(ocr, "OCR_LANGUE", "fra+eng")
+    ocr.ocr_disponible.cache_clear()
+    try:
+        assert not ocr.ocr_disponible()
+        ocr.ocr_disponible.cache_clear()
+        monkeypatch.setattr(ocr, "OCR_LANGUE", "eng")
+        assert ocr.ocr_disponible()
+    finally:
+        ocr.ocr_disponible.cache_clear()
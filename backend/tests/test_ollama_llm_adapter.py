@@ -0,0 +1,84 @@
+"""Tests for the async Ollama LLM adapter."""
+
+import json
+
+import httpx
+import pytest
+
+from backend.adapters import OllamaLlmAdapter
+from backend.domain.ports import LlmError
+
+
+def _adapter(handler) -> OllamaLlmAdapter:
+    client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+    return OllamaLlmAdapter("http://ollama", "test-model", options={"num_ctx": 4096}, client=client)
+
+
+@pytest.mark.asyncio
+async def test_generate_stream_yields_tokens():
+    """Test that /api/chat NDJSON lines are streamed as tokens until done."""
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["path"] = request.url.path
+        seen["payload"] = json.loads(request.content)
+        lines = [
+            {"message": {"role": "assistant", "content": "Bon"}, "done": False},
+            {"message": {"role": "assistant", "content": "jour"}, "done": False},
+            {"message": {"role": "assistant", "content": ""}, "done": True},
+        ]
+        return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines))
+
+    adapter = _adapter(handler)
+    tokens = [token async for token in adapter.generate_stream("prompt", system_prompt="sys")]
+
+    assert tokens == ["Bon", "jour"]
+    assert seen["path"] == "/api/chat"
+    assert seen["payload"]["model"] == "test-model"
+    assert seen["payload"]["messages"] == [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "prompt"},
+    ]
+    assert seen["payload"]["keep_alive"] == "30m"
+    assert seen["payload"]["options"] == {"num_ctx": 4096}
+
+    [_ async for _ in adapter.generate_stream("prompt", num_ctx=2048)]
+    assert seen["payload"]["options"] == {"num_ctx": 2048}
+
+
+@pytest.mark.asyncio
+async def test_warm_up_loads_the_model_without_messages():
+    """Test that warm-up sends an empty chat request with keep_alive."""
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["payload"] = json.loads(request.content)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": ""}, "done": True})
+
+    await _adapter(handler).warm_up()
+
+    assert seen["payload"] == {
+        "model": "test-model", "messages": [], "keep_alive": "30m", "options": {"num_ctx": 4096},
+    }
+    with pytest.raises(LlmError):
+        await _adapter(lambda request: httpx.Response(500)).warm_up()
+
+
+@pytest.mark.asyncio
+async def test_generate_stream_wraps_http_errors():
+    """Test that Ollama HTTP errors surface as LlmError."""
+    adapter = _adapter(lambda request: httpx.Response(500))
+
+    with pytest.raises(LlmError):
+        async for _ in adapter.generate_stream("prompt"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_list_models():
+    """Test model listing from /api/tags."""
+    adapter = _adapter(
+        lambda request: httpx.Response(200, json={"models": [{"name": "llama3.1:8b"}]})
+    )
+
+    assert await adapter.list_models() == ["llama3.1:8b"]
@@ -0,0 +1,38 @@
+"""Tests for bucketed num_ctx selection."""
+
+from core.paliers import PaliersContexte
+
+
+def _paliers(**kwargs) -> PaliersContexte:
+    return PaliersContexte([2048, 4096, 8192], marge=0.0, **kwargs)
+
+
+def test_requests_use_the_smallest_bucket_that_fits():
+    """Prompt plus num_predict picks the smallest sufficient bucket; a larger one is loaded once."""
+    paliers = _paliers()
+
+    assert paliers.choisir(1000, num_predict=512) == 2048
+    assert paliers.choisir(1536, num_predict=512) == 2048
+    assert paliers.choisir(3000, num_predict=512) == 4096
+    assert paliers.choisir(9000, num_predict=512) == 8192
+
+    stats = paliers.stats()
+    assert stats["loaded"] == 8192 and stats["loads"] == 3 and stats["oversized"] == 1
+    assert stats["buckets"]["2048"] == {"requests": 2, "loads": 1}
+
+
+def test_loaded_bucket_is_sticky_until_smaller_requests_persist():
+    """Small requests stay on the loaded bucket, then shrink to the largest size they needed."""
+    paliers = _paliers(descente_apres=3)
+    assert paliers.choisir(6000, num_predict=0) == 8192
+
+    assert paliers.choisir(500, num_predict=0) == 8192
+    assert paliers.choisir(3000, num_predict=0) == 8192
+    # Une requête au palier chargé remet le compteur à zéro
+    assert paliers.choisir(7000, num_predict=0) == 8192
+    assert [paliers.choisir(t, num_predict=0) for t in (500, 3000, 500)] == [8192, 8192, 4096]
+    assert paliers.choisir(500, num_predict=0) == 4096
+
+    stats = paliers.stats()
+    assert stats["buckets"]["8192"] == {"requests": 6, "loads": 1}
+    assert stats["buckets"]["4096"] == {"requests": 2, "loads": 1}
@@ -0,0 +1,27 @@
+"""Tests for document parsers."""
+
+import pymupdf
+
+from core import parsers
+from core.parsers import iterer_pages
+
+
+def _pdf(chemin, nb_pages):
+    doc = pymupdf.open()
+    for i in range(nb_pages):
+        doc.new_page().insert_text((72, 72), f"Contenu de la page {i + 1}")
+    doc.save(str(chemin))
+
+
+def test_parallel_pdf_parsing_keeps_page_order(tmp_path, monkeypatch):
+    """Page ranges converted in a process pool come back in page order."""
+    chemin = tmp_path / "manuel.pdf"
+    _pdf(chemin, 7)
+    monkeypatch.setattr(parsers, "PDF_PAGES_PAR_LOT", 2)
+    monkeypatch.setattr(parsers, "PDF_WORKERS", 2)
+    monkeypatch.setattr(parsers, "PDF_PARALLELE_MIN_PAGES", 4)
+
+    pages = list(iterer_pages(chemin))
+
+    assert [p.page for p in pages] == list(range(1, 8))
+    assert all(f"page {p.page}" in p.texte for p in pages)
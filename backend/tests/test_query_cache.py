@@ -0,0 +1,39 @@
+"""Tests for the query embedding cache."""
+
+from core.query_cache import CacheRequetes, normaliser_question
+
+
+def test_normalization_merges_equivalent_questions():
+    """Test that case, spacing and trailing punctuation are ignored."""
+    assert normaliser_question("  Dimensions du  GEMINI ? ") == "dimensions du gemini"
+
+
+def test_cache_hits_and_ttl():
+    """Test hits on repeated questions and recomputation after TTL expiry."""
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [0.5]
+
+    cache = CacheRequetes(taille_max=10, ttl=3600)
+    cache.obtenir("m", "Différence SOLO/COMPAQT ?", compute)
+    cache.obtenir("m", "différence solo/compaqt", compute)
+    assert len(calls) == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+    expired = CacheRequetes(taille_max=10, ttl=0)
+    expired.obtenir("m", "q", compute)
+    expired.obtenir("m", "q", compute)
+    assert len(calls) == 3
+
+
+def test_cache_persistence(tmp_path):
+    """Test that persisted vectors survive a new in-memory cache."""
+    from core.embedding_cache import CacheEmbeddings
+
+    disk = CacheEmbeddings(tmp_path / "cache.sqlite3", 1024 * 1024)
+    CacheRequetes(persistance=disk).obtenir("m", "q", lambda: [1.0, 2.0])
+
+    fresh = CacheRequetes(persistance=disk)
+    assert fresh.obtenir("m", "q", lambda: [9.9]) == [1.0, 2.0]
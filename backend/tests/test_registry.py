@@ -0,0 +1,55 @@
+"""Tests for the shared handle registry."""
+
+import pytest
+
+from core.registry import RegistreHandles
+
+
+def test_registry_reuses_and_evicts_lru():
+    """Test handle reuse and least-recently-used eviction."""
+    registre = RegistreHandles(capacite=2, ttl=3600)
+    opened = []
+
+    def factory(name):
+        def _open():
+            opened.append(name)
+            return object()
+        return _open
+
+    a = registre.obtenir(("chroma", "/db", "a"), factory("a"))
+    assert registre.obtenir(("chroma", "/db", "a"), factory("a")) is a
+
+    registre.obtenir(("chroma", "/db", "b"), factory("b"))
+    registre.obtenir(("chroma", "/db", "a"), factory("a"))
+    registre.obtenir(("chroma", "/db", "c"), factory("c"))
+    registre.obtenir(("chroma", "/db", "b"), factory("b"))
+
+    assert opened == ["a", "b", "c", "b"]
+    assert registre.stats()["evictions"] == 2
+
+
+def test_registry_invalidates_collection_handles():
+    """Test that invalidation drops every handle of a collection."""
+    registre = RegistreHandles(capacite=10, ttl=3600)
+    registre.obtenir(("chroma", "/db", "a"), object)
+    registre.obtenir(("engine", "/db", "a", "defaut"), object)
+    registre.obtenir(("chroma", "/db", "b"), object)
+
+    registre.invalider_collection("/db", "a")
+
+    assert registre.stats()["open"] == 1
+
+
+def test_failed_open_leaves_no_creation_lock():
+    """Test that a factory error does not leave a per-key creation lock behind."""
+    registre = RegistreHandles(capacite=10, ttl=3600)
+
+    def _missing():
+        raise LookupError("Collection 'absente' not found")
+
+    for i in range(3):
+        with pytest.raises(LookupError):
+            registre.obtenir(("chroma", "/db", f"absente{i}"), _missing)
+
+    assert registre._creations == {}
+    assert registre.stats()["open"] == 0
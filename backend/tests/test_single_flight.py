@@ -0,0 +1,123 @@
+"""Tests for single-flight sharing of identical chat streams."""
+
+import asyncio
+
+import pytest
+
+from backend.domain.services import SingleFlight
+
+
+class Producer:
+    """Emits queued events on demand, recording how many times it ran and whether it was closed."""
+
+    def __init__(self):
+        self.runs = 0
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def events(self):
+        self.runs += 1
+        try:
+            while (event := await self.queue.get()) is not None:
+                yield event
+        finally:
+            self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_gets_the_prefix_then_follows_the_shared_stream():
+    """One producer feeds every subscriber; a late joiner first replays what was produced."""
+    flights = SingleFlight()
+    producer = Producer()
+    first = flights.start("key", producer.events())
+
+    producer.queue.put_nowait({"queue_position": 1})
+    assert await anext(first) == {"queue_position": 1}
+    producer.queue.put_nowait({"token": "Bon"})
+    assert await anext(first) == {"token": "Bon"}
+
+    # The stale queue position is not replayed
+    late = flights.join("key")
+    assert await anext(late) == {"token": "Bon"}
+
+    producer.queue.put_nowait({"token": "jour"})
+    producer.queue.put_nowait({"done": True})
+    producer.queue.put_nowait(None)
+    assert [e async for e in first] == [{"token": "jour"}, {"done": True}]
+    assert [e async for e in late] == [{"token": "jour"}, {"done": True}]
+
+    assert producer.runs == 1
+    assert flights.join("key") is None
+    assert flights.stats() == {"in_flight": 0, "subscribers": 0, "started": 1, "joined": 1}
+
+
+@pytest.mark.asyncio
+async def test_producer_is_cancelled_when_every_subscriber_leaves():
+    """The upstream stream is closed once nobody reads it, and the key is free again."""
+    flights = SingleFlight()
+    producer = Producer()
+    first = flights.start("key", producer.events())
+    second = flights.join("key")
+    producer.queue.put_nowait({"token": "a"})
+    await anext(first)
+    await anext(second)
+
+    await first.aclose()
+    await asyncio.sleep(0)
+    assert not producer.closed
+
+    await second.aclose()
+    await asyncio.sleep(0.01)
+    assert producer.closed
+    assert flights.join("key") is None
+
+
+@pytest.mark.asyncio
+async def test_unread_subscription_still_cancels_the_producer():
+    """A response dropped before its first read leaves the flight, so nobody generates for nothing."""
+    flights = SingleFlight()
+    producer = Producer()
+    done = []
+    unread = flights.start("key", producer.events(), on_done=lambda: done.append(True))
+    await asyncio.sleep(0)
+    assert producer.runs == 1
+
+    await unread.aclose()
+    await asyncio.sleep(0.01)
+
+    assert producer.closed and done == [True]
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_producer_cancelled_before_starting_still_runs_on_done():
+    """Resources taken for a producer are released even if its task never ran a step."""
+    flights = SingleFlight()
+    producer = Producer()
+    done = []
+    subscription = flights.start("key", producer.events(), on_done=lambda: done.append(True))
+
+    await subscription.aclose()
+    await asyncio.sleep(0.01)
+
+    assert producer.runs == 0
+    assert done == [True]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flight_is_not_joined_and_ends_with_an_error():
+    """Nobody joins a flight cancelled by its last subscriber, and its events end in an error."""
+    flights = SingleFlight()
+    producer = Producer()
+    first = flights.start("key", producer.events())
+    producer.queue.put_nowait({"token": "a"})
+    await anext(first)
+    flight = next(iter(flights._flights.values()))
+
+    await first.aclose()
+    # Still registered at this point or not, a finished flight is never joined
+    flights._flights["key"] = flight
+    assert flights.join("key") is None
+    await asyncio.sleep(0.01)
+
+    assert flight.events == [{"token": "a"}, {"error": "Generation cancelled"}]
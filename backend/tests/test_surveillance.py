@@ -0,0 +1,72 @@
+"""Tests for recursive listing and watch-mode change detection."""
+
+import os
+import threading
+
+from core import surveillance
+from core.surveillance import Surveillance, lister_fichiers
+
+
+def _arborescence(racine):
+    (racine / "a" / "b").mkdir(parents=True)
+    (racine / ".cache").mkdir()
+    (racine / "racine.txt").write_text("racine")
+    (racine / "a" / "un.md").write_text("un")
+    (racine / "a" / "b" / "deux.txt").write_text("deux")
+    (racine / "a" / "b" / "image.png").write_bytes(b"png")
+    (racine / ".cache" / "cache.txt").write_text("caché")
+
+
+def test_recursive_listing_skips_hidden_and_unsupported(tmp_path):
+    """Only supported, non-hidden files are listed, recursively on demand."""
+    _arborescence(tmp_path)
+
+    assert [f.name for f in lister_fichiers(tmp_path)] == ["racine.txt"]
+    assert [f.relative_to(tmp_path).as_posix() for f in lister_fichiers(tmp_path, True)] == [
+        "a/b/deux.txt", "a/un.md", "racine.txt",
+    ]
+
+
+def test_changes_are_classified_into_document_operations(tmp_path):
+    """Added, deleted and moved files and folders become index/delete operations."""
+    _arborescence(tmp_path)
+    s = Surveillance(tmp_path, recursif=True, scrutation=True)
+    racine = s.dossier
+
+    (racine / "a" / "trois.txt").write_text("trois")
+    (racine / "a" / "b" / "deux.txt").unlink()
+    lot = s._classer({racine / "a" / "trois.txt", racine / "a" / "b" / "deux.txt"})
+    assert [f.name for f in lot.a_indexer] == ["trois.txt"]
+    assert lot.supprimes == ["deux.txt"]
+
+    # Homonyme : ignoré tant que le fichier d'origine existe, puis le remplace
+    (racine / "a" / "b" / "un.md").write_text("autre un")
+    lot = s._classer({racine / "a" / "b" / "un.md"})
+    assert lot.a_indexer == [] and [f.name for f in lot.homonymes] == ["un.md"]
+    (racine / "a" / "un.md").unlink()
+    lot = s._classer({racine / "a" / "un.md"})
+    assert lot.supprimes == [] and lot.a_indexer == [racine / "a" / "b" / "un.md"]
+
+    # Dossier déplacé hors de l'arborescence : tout son contenu disparaît
+    os.rename(racine / "a", tmp_path.parent / f"{tmp_path.name}-a")
+    lot = s._classer({racine / "a"})
+    assert sorted(lot.supprimes) == ["trois.txt", "un.md"]
+
+
+def test_polling_batches_debounced_changes(tmp_path, monkeypatch):
+    """The polling fallback reports a burst of changes as a single batch."""
+    monkeypatch.setattr(surveillance, "WATCH_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(surveillance, "WATCH_DEBOUNCE_MS", 100)
+    (tmp_path / "existant.txt").write_text("v1")
+    s = Surveillance(tmp_path, recursif=True, scrutation=True)
+    arret = threading.Event()
+
+    for i in range(3):
+        (tmp_path / f"nouveau{i}.txt").write_text("x")
+    (tmp_path / "existant.txt").write_text("v2 plus longue")
+
+    lot = next(s.changements(arret))
+    arret.set()
+    assert [f.name for f in lot.a_indexer] == [
+        "existant.txt", "nouveau0.txt", "nouveau1.txt", "nouveau2.txt",
+    ]
@@ -6,7 +6,7 @@ from core.embeddings import get_embeddings, verifier_ollama, OLLAMA_MODEL, OLLAM
 from core.parsers import parser_document, extensions_supportees
 from core.collection_manager import CollectionManager
 from core.document_manager import DocumentManager
-from core.search import RAGEngine
+from core.search import RAGEngine, get_engine
 
 __all__ = [
     "get_embeddings",
@@ -18,4 +18,5 @@ __all__ = [
     "CollectionManager",
     "DocumentManager",
     "RAGEngine",
+    "get_engine",
 ]
@@ -0,0 +1,146 @@
+"""
+core/answer_cache.py — Cache sémantique des réponses générées.
+
+Pour une question (sans historique) proche d'une question déjà traitée sur une
+collection inchangée, la réponse précédente est rejouée au lieu de relancer
+une génération complète.
+
+- Portée : (collection, prompt_name, modèle LLM, mmr_lambda, fetch_k) ; les
+  réglages de recherche propres à la requête (None : ceux de la collection)
+  en font partie, car ils changent le contexte de la réponse.
+- Correspondance : similarité cosinus des embeddings de question >= seuil.
+- Invalidation : chaque entrée retient la version de la collection au moment
+  de la génération (cf. CollectionManager.version_collection) ; toute
+  indexation ou suppression de document change la version.
+"""
+
+import os
+import re
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+ANSWER_CACHE_ACTIF = os.environ.get("ANSWER_CACHE", "1") != "0"
+ANSWER_CACHE_SEUIL = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TAILLE = int(os.environ.get("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "86400"))
+
+
+@dataclass
+class _Entree:
+    vecteur: np.ndarray
+    question: str
+    reponse: str
+    sources: list[dict]
+    version: int
+    date: float
+
+
+def rejouer_reponse(reponse: str) -> Iterator[str]:
+    """Découpe une réponse en cache en tokens (mot + espaces) pour la rejouer en streaming."""
+    yield from re.findall(r"\S+\s*|\s+", reponse)
+
+
+class CacheReponses:
+    """Cache sémantique (portée -> entrées), borné en taille par portée."""
+
+    def __init__(
+        self,
+        seuil: float = ANSWER_CACHE_SEUIL,
+        taille_max: int = ANSWER_CACHE_TAILLE,
+        ttl: float = ANSWER_CACHE_TTL,
+    ):
+        self.seuil = seuil
+        self.taille_max = max(1, taille_max)
+        self.ttl = ttl
+        self._portees: dict[tuple, list[_Entree]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normaliser(vecteur: list[float]) -> np.ndarray:
+        v = np.asarray(vecteur, dtype=np.float32)
+        norme = np.linalg.norm(v)
+        return v / norme if norme else v
+
+    def chercher(self, portee: tuple, vecteur: list[float], version: int) -> dict | None:
+        """
+        Cherche une réponse pour une question proche dans la portée.
+        Retourne {"reponse", "sources", "question", "similarite"} ou None.
+        """
+        requete = self._normaliser(vecteur)
+        limite = time.time() - self.ttl
+
+        with self._lock:
+            entrees = [
+                e for e in self._portees.get(portee, [])
+                if e.version == version and e.date >= limite
+            ]
+            self._portees[portee] = entrees
+            if not entrees:
+                self.misses += 1
+                return None
+
+            similarites = np.stack([e.vecteur for e in entrees]) @ requete
+            meilleur = int(np.argmax(similarites))
+            if similarites[meilleur] < self.seuil:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entree = entrees.pop(meilleur)
+            entrees.append(entree)  # la plus récemment utilisée en fin de liste
+            return {
+                "reponse": entree.reponse,
+                "sources": entree.sources,
+                "question": entree.question,
+                "similarite": round(float(similarites[meilleur]), 4),
+            }
+
+    def ajouter(
+        self,
+        portee: tuple,
+        vecteur: list[float],
+        question: str,
+        reponse: str,
+        sources: list[dict],
+        version: int,
+    ) -> None:
+        """Mémorise une réponse complète."""
+        if not reponse.strip():
+            return
+        entree = _Entree(self._normaliser(vecteur), question, reponse, sources, version, time.time())
+        with self._lock:
+            entrees = self._portees.setdefault(portee, [])
+            entrees.append(entree)
+            del entrees[:-self.taille_max]
+
+    def invalider_collection(self, nom_collection: str) -> None:
+        """Oublie toutes les réponses d'une collection."""
+        with self._lock:
+            for portee in [p for p in self._portees if p[0] == nom_collection]:
+                del self._portees[portee]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Compteurs : hits, misses, taux de hit, entrées, invalidations."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ACTIF,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": sum(len(e) for e in self._portees.values()),
+                "invalidations": self.invalidations,
+                "threshold": self.seuil,
+            }
+
+
+# Cache partagé par tous les RAGEngine du processus
+CACHE_REPONSES = CacheReponses()
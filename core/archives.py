@@ -0,0 +1,198 @@
+"""
+core/archives.py — Indexation d'archives (zip, tar) sans extraction sur disque.
+
+Les entrées sont lues une à une depuis l'archive (tar en lecture séquentielle),
+dédoublonnées par hash — dans l'archive et par rapport aux documents déjà
+indexés dans la collection — puis indexées en parallèle par un pool de
+threads partageant un même DocumentManager. Au plus 2 × workers entrées sont
+en mémoire à la fois. Les résultats sont regroupés dans un rapport unique.
+"""
+
+import hashlib
+import os
+import tarfile
+import zipfile
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
+
+from core.document_manager import DocumentManager
+from core.parsers import extensions_supportees
+
+ARCHIVE_WORKERS = int(os.environ.get("ARCHIVE_WORKERS", "4"))
+ARCHIVE_MAX_ENTREE_MB = float(os.environ.get("ARCHIVE_MAX_ENTRY_MB", "512"))
+
+_SUFFIXES_ARCHIVE = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+@dataclass
+class EntreeArchive:
+    """Fichier d'une archive : contenu en mémoire, ou motif d'exclusion."""
+
+    nom: str
+    contenu: bytes | None = None
+    ignoree: str | None = None
+
+
+def est_archive(nom: str | Path) -> bool:
+    """Vrai si le nom de fichier désigne une archive zip ou tar supportée."""
+    return str(nom).lower().endswith(_SUFFIXES_ARCHIVE)
+
+
+def _filtrer(nom: str, taille: int) -> str | None:
+    """Motif d'exclusion d'une entrée, None si elle est à indexer."""
+    chemin = PurePosixPath(nom)
+    if any(p.startswith(".") or p == "__MACOSX" for p in chemin.parts):
+        return "fichier caché ignoré"
+    if chemin.suffix.lower() not in extensions_supportees():
+        return "format non supporté"
+    if taille > ARCHIVE_MAX_ENTREE_MB * 1024 * 1024:
+        return f"entrée trop volumineuse (> {ARCHIVE_MAX_ENTREE_MB:.0f} Mo)"
+    return None
+
+
+def iterer_entrees(source: Path | BinaryIO, nom: str | None = None) -> Iterator[EntreeArchive]:
+    """
+    Produit les fichiers d'une archive sans l'extraire sur disque.
+    `nom` (nom de l'archive) détermine le format quand `source` est un flux.
+    """
+    nom = nom or str(source)
+    if nom.lower().endswith(".zip"):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                motif = _filtrer(info.filename, info.file_size)
+                yield EntreeArchive(
+                    nom=info.filename,
+                    contenu=None if motif else archive.read(info),
+                    ignoree=motif,
+                )
+        return
+
+    flux = open(source, "rb") if isinstance(source, Path) else source
+    try:
+        with tarfile.open(fileobj=flux, mode="r|*") as archive:
+            for membre in archive:
+                if not membre.isfile():
+                    continue
+                motif = _filtrer(membre.name, membre.size)
+                yield EntreeArchive(
+                    nom=membre.name,
+                    contenu=None if motif else archive.extractfile(membre).read(),
+                    ignoree=motif,
+                )
+    finally:
+        if flux is not source:
+            flux.close()
+
+
+def indexer_archive(
+    dm: DocumentManager,
+    nom_collection: str,
+    source: Path | BinaryIO,
+    force: bool = False,
+    workers: int = ARCHIVE_WORKERS,
+    nom: str | None = None,
+) -> Iterator[tuple[str, dict]]:
+    """
+    Indexe les fichiers d'une archive dans une collection. Produit
+    (nom d'entrée, resultat) dans l'ordre de l'archive ; les doublons ont
+    le statut "duplicate".
+    """
+    catalogue = dm.cm.catalogue(nom_collection)
+    vus: dict[str, str] = {}
+    noms: set[str] = set()
+    en_cours: deque = deque()
+
+    def _ignorer(entree: str, statut: str, message: str) -> tuple[str, dict]:
+        return entree, {"status": statut, "chunks": 0, "message": f"{entree} : {message}"}
+
+    def _resultat(entree: str, future) -> tuple[str, dict]:
+        try:
+            return entree, future.result()
+        except Exception as e:
+            return _ignorer(entree, "error", f"erreur ({e})")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for entree in iterer_entrees(source, nom):
+            if entree.ignoree:
+                yield _ignorer(entree.nom, "skipped", entree.ignoree)
+                continue
+
+            document = PurePosixPath(entree.nom).name
+            sha256 = hashlib.sha256(entree.contenu).hexdigest()
+            if sha256 in vus:
+                yield _ignorer(entree.nom, "duplicate", f"doublon de {vus[sha256]}")
+                continue
+            if document in noms:
+                yield _ignorer(entree.nom, "duplicate", f"nom {document} déjà présent dans l'archive")
+                continue
+            existants = [n for n in catalogue.documents_par_hash(sha256) if n != document]
+            if existants and not force:
+                yield _ignorer(entree.nom, "duplicate", f"doublon de {existants[0]} (déjà indexé)")
+                continue
+            vus[sha256] = entree.nom
+            noms.add(document)
+
+            future = pool.submit(
+                dm.ajouter_document, nom_collection, Path(document), force, None, entree.contenu
+            )
+            en_cours.append((entree.nom, future))
+            while len(en_cours) >= 2 * max(1, workers):
+                yield _resultat(*en_cours.popleft())
+
+        while en_cours:
+            yield _resultat(*en_cours.popleft())
+
+
+def rapport_archive(
+    resultats: Iterable[tuple[str, dict]],
+    progression: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    Regroupe les résultats d'indexer_archive en un rapport unique.
+    `progression` est appelé après chaque entrée avec les totaux courants.
+    """
+    rapport = {
+        "status": "indexed",
+        "entries": 0,
+        "indexed": 0,
+        "skipped": 0,
+        "duplicates": 0,
+        "errors": 0,
+        "pages": 0,
+        "chunks": 0,
+        "embedded": 0,
+        "documents": [],
+    }
+    compteurs = {"indexed": "indexed", "duplicate": "duplicates", "error": "errors"}
+    for entree, resultat in resultats:
+        rapport["entries"] += 1
+        rapport[compteurs.get(resultat["status"], "skipped")] += 1
+        rapport["chunks"] += resultat.get("chunks", 0) if resultat["status"] == "indexed" else 0
+        rapport["pages"] += resultat.get("pages", 0)
+        rapport["embedded"] += resultat.get("embedded", 0)
+        rapport["documents"].append({
+            "entry": entree,
+            "status": resultat["status"],
+            "chunks": resultat.get("chunks", 0),
+            "message": resultat["message"],
+        })
+        if progression:
+            progression({
+                "document": entree,
+                "pages": rapport["pages"],
+                "chunks": rapport["chunks"],
+                "embedded": rapport["embedded"],
+            })
+
+    rapport["message"] = (
+        f"{rapport['indexed']} document(s) indexé(s), {rapport['skipped']} ignoré(s), "
+        f"{rapport['duplicates']} doublon(s), {rapport['errors']} erreur(s) "
+        f"sur {rapport['entries']} entrée(s)"
+    )
+    return rapport
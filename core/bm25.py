@@ -0,0 +1,130 @@
+"""
+core/bm25.py — Index inversé BM25 persistant, un par collection.
+
+La recherche vectorielle rate souvent les noms de produits et références
+exactes (COMPAQT, CMT Fronius, références Siemens). L'index BM25 est maintenu
+par DocumentManager à l'indexation et fusionné avec les résultats vectoriels
+par RAGEngine (reciprocal rank fusion).
+
+Stockage SQLite (./chroma_db/{collection}/bm25.sqlite3) : une ligne par
+(terme, chunk), mise à jour incrémentale sans réécrire l'index complet.
+"""
+
+import math
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Mots vides fréquents (français + anglais) : bruit pour BM25
+_MOTS_VIDES = frozenset("""
+    au aux avec ce ces dans de des du elle en et eux il je la le les leur lui ma mais me
+    meme mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta
+    te tes toi ton tu un une vos votre vous est sont quel quelle quels quelles comment
+    the and for are with this that from what which
+""".split())
+
+
+def tokeniser(texte: str) -> list[str]:
+    """Minuscules, sans accents, alphanumérique ; garde les nombres (références)."""
+    texte = unicodedata.normalize("NFKD", texte.lower())
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return [
+        t for t in re.findall(r"[a-z0-9]+", texte)
+        if t not in _MOTS_VIDES and (len(t) > 1 or t.isdigit())
+    ]
+
+
+class IndexBM25:
+    """Index inversé BM25 d'une collection, persisté en SQLite."""
+
+    def __init__(self, chemin: Path):
+        self.chemin = Path(chemin)
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.chemin), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                longueur INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS postings (
+                terme TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (terme, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings (chunk_id);
+            """
+        )
+        self._conn.commit()
+
+    def nb_chunks(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def ajouter(self, ids: list[str], textes: list[str]) -> None:
+        """Indexe (ou ré-indexe) des chunks."""
+        if not ids:
+            return
+        lignes_chunks = []
+        lignes_postings = []
+        for cid, texte in zip(ids, textes):
+            termes = Counter(tokeniser(texte))
+            lignes_chunks.append((cid, sum(termes.values())))
+            lignes_postings.extend((t, cid, tf) for t, tf in termes.items())
+
+        with self._lock, self._conn:
+            self._supprimer(ids)
+            self._conn.executemany("INSERT INTO chunks VALUES (?, ?)", lignes_chunks)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", lignes_postings)
+
+    def supprimer(self, ids: list[str]) -> None:
+        """Retire des chunks de l'index."""
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._supprimer(ids)
+
+    def _supprimer(self, ids: list[str]) -> None:
+        lignes = [(cid,) for cid in ids]
+        self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", lignes)
+        self._conn.executemany("DELETE FROM chunks WHERE id = ?", lignes)
+
+    def rechercher(self, question: str, k: int) -> list[tuple[str, float]]:
+        """Retourne les k meilleurs (chunk_id, score BM25), score décroissant."""
+        termes = set(tokeniser(question))
+        if not termes:
+            return []
+
+        scores: dict[str, float] = {}
+        with self._lock:
+            n, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(longueur), 0) FROM chunks"
+            ).fetchone()
+            if not n:
+                return []
+            longueur_moy = total / n
+
+            for terme in termes:
+                lignes = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.longueur FROM postings p "
+                    "JOIN chunks c ON c.id = p.chunk_id WHERE p.terme = ?",
+                    (terme,),
+                ).fetchall()
+                if not lignes:
+                    continue
+                df = len(lignes)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for cid, tf, longueur in lignes:
+                    norme = tf + BM25_K1 * (1 - BM25_B + BM25_B * longueur / longueur_moy)
+                    scores[cid] = scores.get(cid, 0.0) + idf * tf * (BM25_K1 + 1) / norme
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
@@ -0,0 +1,226 @@
+"""
+core/catalog.py — Catalogue SQLite des documents d'une collection.
+
+Remplace metadata.json : une ligne par document (hash, date, compteurs) et une
+ligne par chunk, avec recherche indexée par nom et par hash. Chaque mise à
+jour d'un document est une transaction : des indexations concurrentes ne
+perdent plus de mises à jour, et indexer N fichiers ne relit plus N fois
+l'ensemble du catalogue.
+
+L'empreinte système de chaque fichier (taille, mtime, inode) est conservée :
+un fichier inchangé est reconnu sans être relu ni re-hashé.
+
+Les chunks écrits dans ChromaDB avant l'enregistrement de leur document sont
+notés dans `chunks_en_cours` : une indexation interrompue (crash, OOM) reprend
+après le dernier lot écrit, ou ses chunks partiels sont supprimés (nettoyage).
+
+Un metadata.json existant est migré automatiquement à la première ouverture
+(puis renommé en metadata.json.migrated).
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class Catalogue:
+    """Catalogue des documents indexés d'une collection (SQLite, mode WAL)."""
+
+    def __init__(self, chemin: Path):
+        self.chemin = Path(chemin)
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.chemin), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                nom TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                date TEXT NOT NULL,
+                nb_chunks INTEGER NOT NULL,
+                nb_pages INTEGER NOT NULL,
+                taille INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents (sha256);
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                document TEXT NOT NULL REFERENCES documents (nom) ON DELETE CASCADE,
+                position INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document, position);
+            CREATE TABLE IF NOT EXISTS chunks_en_cours (
+                id TEXT PRIMARY KEY,
+                document TEXT NOT NULL,
+                ecrit INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_chunks_en_cours_document ON chunks_en_cours (document);
+            """
+        )
+        colonnes = {ligne["name"] for ligne in self._conn.execute("PRAGMA table_info(documents)")}
+        for colonne in ("taille", "mtime_ns", "inode"):
+            if colonne not in colonnes:
+                self._conn.execute(f"ALTER TABLE documents ADD COLUMN {colonne} INTEGER")
+        self._conn.commit()
+        self._migrer_json(self.chemin.parent / "metadata.json")
+
+    def _migrer_json(self, chemin_json: Path) -> None:
+        """Importe un ancien metadata.json (une seule fois)."""
+        if not chemin_json.exists():
+            return
+        documents = json.loads(chemin_json.read_text(encoding="utf-8")).get("documents", {})
+        for nom, info in documents.items():
+            self.enregistrer_document(
+                nom,
+                sha256=info.get("sha256", ""),
+                nb_pages=info.get("nb_pages", 0),
+                chunk_ids=info.get("chunk_ids", []),
+                date=info.get("date"),
+            )
+        chemin_json.rename(chemin_json.with_name("metadata.json.migrated"))
+
+    def document(self, nom: str) -> dict | None:
+        """Informations d'un document (sans ses chunks), None s'il est absent."""
+        with self._lock:
+            ligne = self._conn.execute("SELECT * FROM documents WHERE nom = ?", (nom,)).fetchone()
+        return dict(ligne) if ligne else None
+
+    def documents_par_hash(self, sha256: str) -> list[str]:
+        """Noms des documents ayant ce hash."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT nom FROM documents WHERE sha256 = ?", (sha256,)
+            ).fetchall()
+        return [ligne["nom"] for ligne in lignes]
+
+    def chunk_ids(self, nom: str) -> list[str]:
+        """Identifiants des chunks d'un document, dans l'ordre."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT id FROM chunks WHERE document = ? ORDER BY position", (nom,)
+            ).fetchall()
+        return [ligne["id"] for ligne in lignes]
+
+    def enregistrer_document(
+        self,
+        nom: str,
+        sha256: str,
+        nb_pages: int,
+        chunk_ids: list[str],
+        date: str | None = None,
+        empreinte: tuple[int, int, int] | None = None,
+    ) -> None:
+        """
+        Crée ou remplace un document et ses chunks (transaction unique).
+        `empreinte` : (taille, mtime_ns, inode) du fichier indexé.
+        """
+        taille, mtime_ns, inode = empreinte or (None, None, None)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE document = ?", (nom,))
+            self._conn.execute("DELETE FROM chunks_en_cours WHERE document = ?", (nom,))
+            self._conn.execute(
+                "INSERT INTO documents (nom, sha256, date, nb_chunks, nb_pages, taille, mtime_ns, inode) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (nom) DO UPDATE SET sha256 = excluded.sha256, date = excluded.date, "
+                "nb_chunks = excluded.nb_chunks, nb_pages = excluded.nb_pages, "
+                "taille = excluded.taille, mtime_ns = excluded.mtime_ns, inode = excluded.inode",
+                (
+                    nom, sha256, date or datetime.now().isoformat(), len(chunk_ids), nb_pages,
+                    taille, mtime_ns, inode,
+                ),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, document, position) VALUES (?, ?, ?)",
+                [(cid, nom, i) for i, cid in enumerate(chunk_ids)],
+            )
+
+    def reserver_chunks(self, nom: str, ids: list[str]) -> None:
+        """Note des chunks sur le point d'être écrits dans ChromaDB (document non enregistré)."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO chunks_en_cours (id, document) VALUES (?, ?) ON CONFLICT (id) DO NOTHING",
+                [(cid, nom) for cid in ids],
+            )
+
+    def confirmer_chunks(self, ids: list[str]) -> None:
+        """Marque des chunks réservés comme écrits (lot validé)."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE chunks_en_cours SET ecrit = 1 WHERE id = ?", [(cid,) for cid in ids]
+            )
+
+    def chunks_en_cours(self, nom: str, ecrits: bool = False) -> list[str]:
+        """
+        Chunks d'un document écrits (ou en cours d'écriture) depuis son
+        dernier enregistrement. `ecrits=True` : uniquement les lots validés.
+        """
+        requete = "SELECT id FROM chunks_en_cours WHERE document = ?"
+        if ecrits:
+            requete += " AND ecrit = 1"
+        with self._lock:
+            lignes = self._conn.execute(requete, (nom,)).fetchall()
+        return [ligne["id"] for ligne in lignes]
+
+    def chunks_orphelins(self) -> list[str]:
+        """Chunks en cours qui n'appartiennent à aucun document enregistré."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT e.id FROM chunks_en_cours e LEFT JOIN chunks c ON c.id = e.id "
+                "WHERE c.id IS NULL"
+            ).fetchall()
+        return [ligne["id"] for ligne in lignes]
+
+    def oublier_chunks_en_cours(self) -> None:
+        """Vide la liste des chunks en cours (après nettoyage)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks_en_cours")
+
+    def modifier_empreinte(self, nom: str, empreinte: tuple[int, int, int]) -> None:
+        """Met à jour l'empreinte d'un document dont le contenu n'a pas changé (touch, copie)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE documents SET taille = ?, mtime_ns = ?, inode = ? WHERE nom = ?",
+                (*empreinte, nom),
+            )
+
+    def supprimer_document(self, nom: str) -> list[str] | None:
+        """Supprime un document ; retourne ses chunk_ids, ou None s'il était absent."""
+        with self._lock, self._conn:
+            if not self._conn.execute("SELECT 1 FROM documents WHERE nom = ?", (nom,)).fetchone():
+                return None
+            # Chunks du document, puis ceux d'une ré-indexation interrompue
+            ids = [
+                ligne["id"] for ligne in self._conn.execute(
+                    "SELECT id FROM chunks WHERE document = ? ORDER BY position", (nom,)
+                )
+            ]
+            ids += [
+                ligne["id"] for ligne in self._conn.execute(
+                    "SELECT id FROM chunks_en_cours WHERE document = ? AND id NOT IN "
+                    "(SELECT id FROM chunks WHERE document = ?)",
+                    (nom, nom),
+                )
+            ]
+            self._conn.execute("DELETE FROM documents WHERE nom = ?", (nom,))
+            self._conn.execute("DELETE FROM chunks_en_cours WHERE document = ?", (nom,))
+        return ids
+
+    def compter(self) -> int:
+        """Nombre de documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def lister(self, offset: int = 0, limit: int | None = None) -> list[dict]:
+        """Documents par ordre de nom, paginés."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT * FROM documents ORDER BY nom LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [dict(ligne) for ligne in lignes]
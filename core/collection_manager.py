@@ -3,14 +3,27 @@ core/collection_manager.py — Gestion multi-collections ChromaDB.
 
 Chaque collection est stockée dans un sous-dossier distinct :
     ./chroma_db/{nom_collection}/
+
+Les handles Chroma ouverts sont partagés via le registre du processus
+(core.registry) et invalidés à la création / suppression d'une collection.
+
+Chaque collection porte une version (fichier `version`), changée à chaque
+ajout / suppression de document ; les caches dérivés du contenu (réponses)
+s'invalident en la comparant.
 """
 
+import json
 import shutil
+import time
 from pathlib import Path
 
 from langchain_chroma import Chroma
 
+from core.answer_cache import CACHE_REPONSES
+from core.bm25 import IndexBM25
+from core.catalog import Catalogue
 from core.embeddings import get_embeddings
+from core.registry import REGISTRE
 
 CHROMA_BASE_DIR = Path("./chroma_db")
 
@@ -25,28 +38,56 @@ class CollectionManager:
     def _chemin_collection(self, nom: str) -> Path:
         return self.base_dir / nom
 
+    def cle_registre(self, type_handle: str, nom: str, *extra) -> tuple:
+        """Clé de registre d'un handle (`type_handle`) lié à la collection `nom`."""
+        return (type_handle, str(self.base_dir.resolve()), nom, *extra)
+
+    def invalider_handles(self, nom: str) -> None:
+        """Ferme les handles partagés (Chroma, RAGEngine) d'une collection."""
+        REGISTRE.invalider_collection(str(self.base_dir.resolve()), nom)
+
+    def _ouvrir(self, nom: str) -> Chroma:
+        return REGISTRE.obtenir(
+            self.cle_registre("chroma", nom),
+            lambda: Chroma(
+                persist_directory=str(self._chemin_collection(nom)),
+                embedding_function=get_embeddings(),
+            ),
+        )
+
     def collection_existe(self, nom: str) -> bool:
         """Vérifie si une collection existe."""
         chemin = self._chemin_collection(nom)
         return chemin.exists() and any(chemin.iterdir())
 
+    def index_bm25(self, nom: str) -> IndexBM25:
+        """Index BM25 (partagé) d'une collection."""
+        return REGISTRE.obtenir(
+            self.cle_registre("bm25", nom),
+            lambda: IndexBM25(self._chemin_collection(nom) / "bm25.sqlite3"),
+        )
+
+    def catalogue(self, nom: str) -> Catalogue:
+        """Catalogue des documents (partagé) d'une collection."""
+        return REGISTRE.obtenir(
+            self.cle_registre("catalogue", nom),
+            lambda: Catalogue(self._chemin_collection(nom) / "catalog.sqlite3"),
+        )
+
     def creer_collection(self, nom: str) -> Chroma:
         """Crée (ou ouvre) une collection ChromaDB."""
         chemin = self._chemin_collection(nom)
-        chemin.mkdir(parents=True, exist_ok=True)
-        return Chroma(
-            persist_directory=str(chemin),
-            embedding_function=get_embeddings(),
-        )
+        if not chemin.exists():
+            # Nouvelle collection : un handle vers un ancien dossier homonyme serait périmé
+            self.invalider_handles(nom)
+            chemin.mkdir(parents=True, exist_ok=True)
+        return self._ouvrir(nom)
 
     def get_collection(self, nom: str) -> Chroma:
         """Retourne une collection existante."""
         if not self.collection_existe(nom):
             raise ValueError(f"Collection '{nom}' introuvable.")
-        return Chroma(
-            persist_directory=str(self._chemin_collection(nom)),
-            embedding_function=get_embeddings(),
-        )
+        return self._ouvrir(nom)
 
     def lister_collections(self) -> list[str]:
         """Liste toutes les collections disponibles."""
@@ -58,8 +99,45 @@ class CollectionManager:
                 collections.append(d.name)
         return collections
 
+    def config_collection(self, nom: str) -> dict:
+        """Réglages de recherche propres à la collection (config.json), {} par défaut."""
+        try:
+            return json.loads((self._chemin_collection(nom) / "config.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def modifier_config_collection(self, nom: str, **reglages) -> dict:
+        """Met à jour les réglages de la collection (valeur None = retour au défaut)."""
+        config = self.config_collection(nom)
+        for cle, valeur in reglages.items():
+            if valeur is None:
+                config.pop(cle, None)
+            else:
+                config[cle] = valeur
+        chemin = self._chemin_collection(nom) / "config.json"
+        chemin.write_text(json.dumps(config, indent=2), encoding="utf-8")
+        return config
+
+    def version_collection(self, nom: str) -> int:
+        """Version du contenu d'une collection (0 si jamais modifiée)."""
+        try:
+            return int((self._chemin_collection(nom) / "version").read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def incrementer_version(self, nom: str) -> None:
+        """Marque le contenu d'une collection comme modifié."""
+        chemin = self._chemin_collection(nom) / "version"
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        # Horodatage plutôt que compteur : une collection recréée ne retombe
+        # jamais sur une version déjà vue
+        chemin.write_text(str(time.time_ns()))
+        CACHE_REPONSES.invalider_collection(nom)
+
     def supprimer_collection(self, nom: str) -> None:
         """Supprime une collection et tous ses fichiers."""
         chemin = self._chemin_collection(nom)
+        self.invalider_handles(nom)
+        CACHE_REPONSES.invalider_collection(nom)
         if chemin.exists():
             shutil.rmtree(chemin)
@@ -0,0 +1,231 @@
+"""
+core/contexte.py — Construction du prompt sous budget de tokens.
+
+Le prompt (message système, historique, contexte, question) est borné à
+CONTEXT_TOKEN_BUDGET tokens estimés :
+- les consignes et la question sont toujours incluses ;
+- l'historique garde ses messages les plus récents, dans la limite de
+  CONTEXT_HISTORY_SHARE du budget ;
+- les chunks remplissent le reste par ordre de pertinence : un chunk qui ne
+  tient pas est écarté au profit des suivants, plus courts.
+
+Deux chunks consécutifs d'une même page (chevauchement du découpage) sont
+fusionnés : le texte commun n'est envoyé qu'une fois.
+
+Les tokens sont estimés à partir du nombre de caractères
+(CONTEXT_CHARS_PER_TOKEN), sans tokenizer : l'estimation sert au budget, pas
+à la facturation.
+"""
+
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "3072"))
+CONTEXT_MAX_CHUNKS = int(os.environ.get("CONTEXT_MAX_CHUNKS", "8"))
+CONTEXT_HISTORY_SHARE = float(os.environ.get("CONTEXT_HISTORY_SHARE", "0.25"))
+CARACTERES_PAR_TOKEN = float(os.environ.get("CONTEXT_CHARS_PER_TOKEN", "3.5"))
+
+SEPARATEUR_CHUNKS = "\n\n---\n\n"
+# Chevauchement minimal (caractères) pour fusionner deux chunks d'une même page
+CHEVAUCHEMENT_MIN = 20
+
+
+def estimer_tokens(texte: str) -> int:
+    """Estimation du nombre de tokens d'un texte."""
+    return math.ceil(len(texte) / CARACTERES_PAR_TOKEN) if texte else 0
+
+
+def fusionner_chevauchement(premier: str, second: str) -> str | None:
+    """
+    Fusionne deux textes dont la fin du premier recouvre le début du second
+    (ou qui se contiennent). Retourne None s'ils ne se chevauchent pas.
+    """
+    if second in premier:
+        return premier
+    if premier in second:
+        return second
+    debut = second[:CHEVAUCHEMENT_MIN]
+    if len(debut) < CHEVAUCHEMENT_MIN:
+        return None
+    position = premier.find(debut)
+    while position != -1:
+        if second.startswith(premier[position:]):
+            return premier[:position] + second
+        position = premier.find(debut, position + 1)
+    return None
+
+
+def tronquer_historique(historique: str, budget: int) -> str:
+    """Garde les lignes les plus récentes de l'historique qui tiennent dans `budget` tokens."""
+    gardees: list[str] = []
+    tokens = 0
+    for ligne in reversed(historique.splitlines()):
+        cout = estimer_tokens(ligne) + 1
+        if tokens + cout > budget:
+            break
+        gardees.append(ligne)
+        tokens += cout
+    return "\n".join(reversed(gardees))
+
+
+@dataclass
+class _Groupe:
+    """Chunks fusionnés d'une même page."""
+
+    texte: str
+    metadata: dict
+    score: float
+    nb_chunks: int = 1
+
+
+@dataclass
+class PromptEmballe:
+    """Prompt construit (message utilisateur) et décompte de ses tokens estimés."""
+
+    prompt: str
+    sources: list[dict]
+    tokens: dict[str, int] = field(default_factory=dict)
+    chunks: dict[str, int] = field(default_factory=dict)
+
+
+class StatsEmballage:
+    """Compteurs cumulés de construction des prompts (API de métriques)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requetes = 0
+        self.tokens_total = 0
+        self.tokens_max = 0
+        self.historiques_tronques = 0
+        self.chunks_ecartes = 0
+        self.chunks_fusionnes = 0
+
+    def enregistrer(self, emballe: PromptEmballe, historique_tronque: bool) -> None:
+        with self._lock:
+            self.requetes += 1
+            self.tokens_total += emballe.tokens["total"]
+            self.tokens_max = max(self.tokens_max, emballe.tokens["total"])
+            self.historiques_tronques += historique_tronque
+            self.chunks_ecartes += emballe.chunks["dropped"]
+            self.chunks_fusionnes += emballe.chunks["merged"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget": CONTEXT_TOKEN_BUDGET,
+                "requests": self.requetes,
+                "avg_prompt_tokens": round(self.tokens_total / self.requetes) if self.requetes else 0,
+                "max_prompt_tokens": self.tokens_max,
+                "history_truncated": self.historiques_tronques,
+                "chunks_dropped": self.chunks_ecartes,
+                "chunks_merged": self.chunks_fusionnes,
+            }
+
+
+STATS_EMBALLAGE = StatsEmballage()
+
+
+def _section_historique(historique: str) -> str:
+    return f"\nHistorique de conversation:\n{historique}\n" if historique else ""
+
+
+def emballer(
+    template: str,
+    question: str,
+    chunks: list[tuple[str, dict, float]],
+    historique: str = "",
+    budget: int | None = None,
+    systeme: str = "",
+) -> PromptEmballe:
+    """
+    Construit le message utilisateur d'un template ({context},
+    {history_section}, {question}) sous `budget` tokens (défaut
+    CONTEXT_TOKEN_BUDGET), message système `systeme` compris.
+
+    `chunks` : [(texte, metadata, distance)] par pertinence décroissante.
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    tokens_consignes = estimer_tokens(systeme) + estimer_tokens(
+        template.format(context="", history_section="", question="")
+    )
+    tokens_question = estimer_tokens(question)
+    disponible = budget - tokens_consignes - tokens_question
+
+    # Historique : messages récents, dans la limite de sa part du budget
+    historique_complet = historique
+    historique = tronquer_historique(
+        historique, max(0, min(disponible, int(budget * CONTEXT_HISTORY_SHARE)))
+    )
+    tokens_historique = estimer_tokens(_section_historique(historique))
+    disponible -= tokens_historique
+
+    # Chunks par pertinence, fusionnés avec un chunk retenu de la même page
+    groupes: list[_Groupe] = []
+    tokens_contexte = 0
+    ecartes = 0
+    for texte, metadata, score in chunks:
+        page = (metadata.get("source"), metadata.get("page"))
+        fusion = None
+        for groupe in groupes:
+            if (groupe.metadata.get("source"), groupe.metadata.get("page")) != page:
+                continue
+            texte_fusionne = (
+                fusionner_chevauchement(groupe.texte, texte)
+                or fusionner_chevauchement(texte, groupe.texte)
+            )
+            if texte_fusionne is not None:
+                fusion = groupe, texte_fusionne
+                break
+
+        if fusion:
+            groupe, texte_fusionne = fusion
+            cout = estimer_tokens(texte_fusionne) - estimer_tokens(groupe.texte)
+        else:
+            cout = estimer_tokens(texte) + (estimer_tokens(SEPARATEUR_CHUNKS) if groupes else 0)
+        if tokens_contexte + cout > disponible:
+            ecartes += 1
+            continue
+
+        tokens_contexte += cout
+        if fusion:
+            groupe.texte = texte_fusionne
+            groupe.score = min(groupe.score, score)
+            groupe.nb_chunks += 1
+        else:
+            groupes.append(_Groupe(texte, metadata, score))
+
+    sources = []
+    pages_vues = set()
+    for groupe in groupes:
+        cle = (groupe.metadata.get("source", "Inconnu"), groupe.metadata.get("page", "?"))
+        if cle not in pages_vues:
+            pages_vues.add(cle)
+            sources.append({"fichier": cle[0], "page": cle[1], "score": round(groupe.score, 3)})
+
+    prompt = template.format(
+        context=SEPARATEUR_CHUNKS.join(groupe.texte for groupe in groupes),
+        question=question,
+        history_section=_section_historique(historique),
+    )
+    emballe = PromptEmballe(
+        prompt=prompt,
+        sources=sources,
+        tokens={
+            "system": tokens_consignes,
+            "history": tokens_historique,
+            "context": tokens_contexte,
+            "question": tokens_question,
+            "total": estimer_tokens(systeme) + estimer_tokens(prompt),
+            "budget": budget,
+        },
+        chunks={
+            "candidates": len(chunks),
+            "packed": sum(groupe.nb_chunks for groupe in groupes),
+            "merged": sum(groupe.nb_chunks - 1 for groupe in groupes),
+            "dropped": ecartes,
+        },
+    )
+    STATS_EMBALLAGE.enregistrer(emballe, historique != historique_complet)
+    return emballe
@@ -1,167 +1,503 @@
 """
 core/document_manager.py — Indexation incrémentale des documents.
 
-Tracking via metadata.json par collection (hash SHA256, date, chunk_ids).
+Tracking via le catalogue SQLite de la collection (core.catalog) : hash
+SHA256, date et chunk_ids de chaque document. Un fichier dont l'empreinte
+système (taille, mtime, inode) n'a pas changé est ignoré sans être lu ; sinon
+il est hashé une seule fois et le hash est réutilisé pour l'indexation.
+
+L'index BM25 de la collection (core.bm25) est tenu à jour en même temps
+que ChromaDB.
+
+Les identifiants de chunks sont déterministes (dérivés du document, de la page
+et du texte) : lors d'une ré-indexation, seuls les chunks ajoutés ou modifiés
+sont ré-embeddés, et seuls les chunks disparus sont supprimés.
+
+Chaque lot écrit avant l'enregistrement du document est noté dans le
+catalogue (chunks en cours) : après un crash, la ré-indexation du document
+reprend après le dernier lot écrit, et nettoyer_chunks_partiels supprime les
+chunks d'une indexation abandonnée.
+
+ajouter_document traite le document au fil de l'eau : les pages sont lues une
+à une, découpées, puis embeddées et écrites par lots dont la taille mémoire
+est bornée (INGEST_BATCH_MEMORY_MB). Un PDF de plusieurs milliers de pages
+n'est jamais chargé en entier.
+
+L'indexation est aussi découpée en trois étapes réutilisables séparément
+(cf. le mode ``--workers`` de ingest.py ; le texte des chunks du document est
+en mémoire, mais embeddings et écritures restent par lots bornés) :
+    1. preparer_document  — parsing + chunking (CPU, sérialisable pour un pool de processus)
+    2. lots_a_indexer + calculer_embeddings — appels Ollama, lot par lot
+       (chunks nouveaux uniquement)
+    3. ecrire_document    — écriture ChromaDB lot par lot, puis catalogue
 """
 
 import hashlib
-import json
-import uuid
-from datetime import datetime
+import os
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from core.collection_manager import CollectionManager
-from core.parsers import parser_document
+from core.embeddings import get_embeddings
+from core.parsers import ParsedPage, iterer_pages, parser_document
 
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Taille des lectures pour le hash des fichiers
+TAILLE_BLOC_HASH = 1024 * 1024
+
+# Budget mémoire d'un lot de chunks en cours d'indexation (textes + vecteurs)
+INGEST_BATCH_MEMORY_MB = float(os.environ.get("INGEST_BATCH_MEMORY_MB", "32"))
+# Estimation de la place d'un vecteur en mémoire (liste Python d'environ 1024 floats)
+OCTETS_PAR_VECTEUR = 1024 * 32
+
+
+@dataclass
+class DocumentPrepare:
+    """Résultat de l'étape parsing + chunking d'un document."""
+
+    nom: str
+    sha256: str
+    nb_pages: int
+    empreinte: tuple[int, int, int] | None = None
+    ids: list[str] = field(default_factory=list)
+    textes: list[str] = field(default_factory=list)
+    metadonnees: list[dict] = field(default_factory=list)
+
+
+def poids_chunk(texte: str) -> int:
+    """Place estimée d'un chunk dans un lot en cours d'indexation : texte + vecteur."""
+    return len(texte.encode("utf-8")) + OCTETS_PAR_VECTEUR
+
+
+def creer_splitter() -> RecursiveCharacterTextSplitter:
+    """Retourne le splitter utilisé pour découper les pages en chunks."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        length_function=len,
+    )
+
+
+def calculer_hash(chemin: Path) -> str:
+    """Calcule le hash SHA256 d'un fichier (lectures de 1 Mio dans un tampon réutilisé)."""
+    h = hashlib.sha256()
+    tampon = bytearray(TAILLE_BLOC_HASH)
+    vue = memoryview(tampon)
+    with open(chemin, "rb", buffering=0) as f:
+        while n := f.readinto(tampon):
+            h.update(vue[:n])
+    return h.hexdigest()
+
+
+def empreinte_fichier(chemin: Path) -> tuple[int, int, int]:
+    """Empreinte système d'un fichier : (taille, mtime_ns, inode)."""
+    st = os.stat(chemin)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def identifiant_chunk(nom: str, page: int, texte: str, occurrence: int = 0) -> str:
+    """
+    Identifiant déterministe d'un chunk : hash du document, de la page,
+    du texte et du rang d'occurrence de ce texte dans la page (doublons).
+    """
+    cle = f"{nom}\x1f{page}\x1f{occurrence}\x1f{texte}"
+    return hashlib.sha256(cle.encode("utf-8")).hexdigest()[:32]
+
+
+def iterer_chunks(
+    nom: str, pages: Iterable[ParsedPage], splitter: RecursiveCharacterTextSplitter
+) -> Iterator[tuple[str, str, dict]]:
+    """Découpe des pages en chunks (id, texte, metadata), au fil de la lecture."""
+    for page in pages:
+        occurrences: dict[str, int] = {}
+        for morceau in splitter.split_text(page.texte):
+            rang = occurrences.get(morceau, 0)
+            occurrences[morceau] = rang + 1
+            yield identifiant_chunk(nom, page.page, morceau, rang), morceau, {
+                "source": page.source,
+                "page": page.page,
+            }
+
+
+def preparer_document(
+    chemin: Path,
+    splitter: RecursiveCharacterTextSplitter | None = None,
+    sha256: str | None = None,
+) -> DocumentPrepare:
+    """
+    Parse et découpe un document en chunks, sans toucher à ChromaDB.
+    `sha256` : hash déjà calculé (cf. DocumentManager.analyser_fichier).
+
+    Fonction de module (et non méthode) pour pouvoir être exécutée
+    dans un ProcessPoolExecutor.
+    """
+    chemin = Path(chemin)
+    splitter = splitter or creer_splitter()
+    # Empreinte relevée avant la lecture : une modification pendant
+    # l'indexation sera détectée au prochain passage
+    empreinte = empreinte_fichier(chemin)
+    sha256 = sha256 or calculer_hash(chemin)
+    pages = parser_document(chemin)
+
+    prep = DocumentPrepare(
+        nom=chemin.name, sha256=sha256, nb_pages=len(pages), empreinte=empreinte
+    )
+    for cid, texte, metadonnees in iterer_chunks(prep.nom, pages, splitter):
+        prep.ids.append(cid)
+        prep.textes.append(texte)
+        prep.metadonnees.append(metadonnees)
+    return prep
+
 
 class DocumentManager:
     """Gère l'indexation incrémentale des documents dans les collections."""
 
     def __init__(self, collection_manager: CollectionManager | None = None):
         self.cm = collection_manager or CollectionManager()
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
+        self.splitter = creer_splitter()
 
-    def _metadata_path(self, nom_collection: str) -> Path:
-        return self.cm._chemin_collection(nom_collection) / "metadata.json"
+    def analyser_fichier(self, nom_collection: str, chemin: Path) -> tuple[bool, str | None]:
+        """
+        Vérifie si un document est déjà indexé à l'identique.
 
-    def _charger_metadata(self, nom_collection: str) -> dict:
-        chemin = self._metadata_path(nom_collection)
-        if chemin.exists():
-            return json.loads(chemin.read_text(encoding="utf-8"))
-        return {"documents": {}}
+        Retourne (indexe, sha256) : sha256 est le hash du fichier s'il a dû
+        être calculé (empreinte système différente), None sinon.
+        """
+        chemin = Path(chemin)
+        catalogue = self.cm.catalogue(nom_collection)
+        doc_info = catalogue.document(chemin.name)
+        if not doc_info:
+            return False, None
 
-    def _sauvegarder_metadata(self, nom_collection: str, metadata: dict) -> None:
-        chemin = self._metadata_path(nom_collection)
-        chemin.parent.mkdir(parents=True, exist_ok=True)
-        chemin.write_text(json.dumps(metadata, indent=2, ensure_ascii=False), encoding="utf-8")
+        empreinte = empreinte_fichier(chemin)
+        if (doc_info["taille"], doc_info["mtime_ns"], doc_info["inode"]) == empreinte:
+            return True, None
 
-    @staticmethod
-    def _calculer_hash(chemin: Path) -> str:
-        h = hashlib.sha256()
-        with open(chemin, "rb") as f:
-            for bloc in iter(lambda: f.read(8192), b""):
-                h.update(bloc)
-        return h.hexdigest()
+        sha256 = calculer_hash(chemin)
+        if sha256 != doc_info["sha256"]:
+            return False, sha256
+        # Contenu identique (touch, copie) : mémoriser la nouvelle empreinte
+        catalogue.modifier_empreinte(chemin.name, empreinte)
+        return True, sha256
 
     def document_est_indexe(self, nom_collection: str, chemin: Path) -> bool:
-        """Vérifie si un document est déjà indexé (même hash SHA256)."""
-        chemin = Path(chemin)
-        metadata = self._charger_metadata(nom_collection)
-        doc_info = metadata["documents"].get(chemin.name)
-        if not doc_info:
-            return False
-        return doc_info["sha256"] == self._calculer_hash(chemin)
+        """Vérifie si un document est déjà indexé (même empreinte ou même hash SHA256)."""
+        return self.analyser_fichier(nom_collection, chemin)[0]
 
-    def ajouter_document(self, nom_collection: str, chemin: Path, force: bool = False) -> dict:
+    def ajouter_document(
+        self,
+        nom_collection: str,
+        chemin: Path,
+        force: bool = False,
+        progression: Callable[[dict], None] | None = None,
+        contenu: bytes | None = None,
+    ) -> dict:
         """
-        Indexe un document dans une collection.
+        Indexe un document dans une collection, par lots de taille mémoire bornée.
+
+        `progression` est appelé après chaque lot écrit avec
+        {"document", "pages", "chunks", "embedded"}.
+        `contenu` : octets du document déjà en mémoire (entrée d'archive) ;
+        `chemin` ne sert alors qu'au nom et au format.
+
+        Une erreur de lecture en cours de document est propagée sans toucher
+        à l'index existant du document : les lots déjà écrits restent « en
+        cours » et seront repris par la prochaine tentative.
 
         Retourne un dict : {"status": "indexed"|"skipped", "chunks": int, "message": str}
         """
         chemin = Path(chemin)
 
-        if not force and self.document_est_indexe(nom_collection, chemin):
+        if contenu is not None:
+            empreinte = None
+            sha256 = hashlib.sha256(contenu).hexdigest()
+            doc_info = self.cm.catalogue(nom_collection).document(chemin.name)
+            indexe = doc_info is not None and doc_info["sha256"] == sha256
+        else:
+            indexe, sha256 = (False, None) if force else self.analyser_fichier(nom_collection, chemin)
+        if indexe and not force:
             return {
                 "status": "skipped",
                 "chunks": 0,
                 "message": f"{chemin.name} : déjà indexé (hash identique)",
             }
+        if contenu is None:
+            empreinte = empreinte_fichier(chemin)
+            sha256 = sha256 or calculer_hash(chemin)
+
+        catalogue = self.cm.catalogue(nom_collection)
+        anciens = set(catalogue.chunk_ids(chemin.name))
+        # Lots déjà écrits par une indexation interrompue de ce document
+        ecrits = set(catalogue.chunks_en_cours(chemin.name, ecrits=True))
+        en_cours = set(catalogue.chunks_en_cours(chemin.name))
+        budget = INGEST_BATCH_MEMORY_MB * 1024 * 1024
+
+        nb_pages = 0
+
+        def _pages() -> Iterator[ParsedPage]:
+            nonlocal nb_pages
+            for page in iterer_pages(chemin, contenu):
+                nb_pages += 1
+                yield page
 
-        # Parser le document
-        pages = parser_document(chemin)
-        if not pages:
+        chunk_ids: list[str] = []
+        nb_embeddes = 0
+        lot = DocumentPrepare(nom=chemin.name, sha256=sha256, nb_pages=0)
+        taille_lot = 0
+
+        def _ecrire_lot() -> None:
+            nonlocal lot, taille_lot, nb_embeddes
+            vecteurs = get_embeddings().embed_documents(lot.textes)
+            self._ecrire_chunks(
+                nom_collection, chemin.name, lot.ids, lot.textes, lot.metadonnees, vecteurs
+            )
+            nb_embeddes += len(lot.ids)
+            lot = DocumentPrepare(nom=chemin.name, sha256=sha256, nb_pages=0)
+            taille_lot = 0
+            if progression:
+                progression({
+                    "document": chemin.name,
+                    "pages": nb_pages,
+                    "chunks": len(chunk_ids),
+                    "embedded": nb_embeddes,
+                })
+
+        for cid, texte, metadonnees in iterer_chunks(chemin.name, _pages(), self.splitter):
+            chunk_ids.append(cid)
+            if (cid in anciens or cid in ecrits) and not force:
+                continue
+            lot.ids.append(cid)
+            lot.textes.append(texte)
+            lot.metadonnees.append(metadonnees)
+            taille_lot += poids_chunk(texte)
+            if taille_lot >= budget:
+                _ecrire_lot()
+        if lot.ids:
+            _ecrire_lot()
+
+        if not chunk_ids:
             return {
                 "status": "skipped",
                 "chunks": 0,
                 "message": f"{chemin.name} : aucun texte extrait",
             }
+        return self._finaliser_document(
+            nom_collection, chemin.name, sha256, nb_pages, chunk_ids, anciens | en_cours,
+            nb_embeddes, empreinte,
+        )
 
-        # Découper en chunks
-        textes = []
-        metadonnees = []
-        chunk_ids = []
-
-        for page in pages:
-            morceaux = self.splitter.split_text(page.texte)
-            for morceau in morceaux:
-                cid = str(uuid.uuid4())
-                chunk_ids.append(cid)
-                textes.append(morceau)
-                metadonnees.append({
-                    "source": page.source,
-                    "page": page.page,
+    def chunks_a_indexer(
+        self, nom_collection: str, prep: DocumentPrepare, force: bool = False
+    ) -> list[int]:
+        """
+        Indices des chunks de `prep` absents de l'index actuel du document.
+        Avec force=True, tous les chunks sont ré-indexés.
+        """
+        if force:
+            return list(range(len(prep.ids)))
+        catalogue = self.cm.catalogue(nom_collection)
+        existants = set(catalogue.chunk_ids(prep.nom))
+        existants.update(catalogue.chunks_en_cours(prep.nom, ecrits=True))
+        return [i for i, cid in enumerate(prep.ids) if cid not in existants]
+
+    @staticmethod
+    def lots_a_indexer(prep: DocumentPrepare, indices: list[int]) -> Iterator[list[int]]:
+        """Découpe les chunks `indices` en lots de taille mémoire bornée (INGEST_BATCH_MEMORY_MB)."""
+        budget = INGEST_BATCH_MEMORY_MB * 1024 * 1024
+        lot: list[int] = []
+        taille_lot = 0
+        for i in indices:
+            lot.append(i)
+            taille_lot += poids_chunk(prep.textes[i])
+            if taille_lot >= budget:
+                yield lot
+                lot, taille_lot = [], 0
+        if lot:
+            yield lot
+
+    @staticmethod
+    def calculer_embeddings(prep: DocumentPrepare, indices: list[int]) -> list[list[float]]:
+        """Calcule les embeddings des chunks `indices` d'un document préparé."""
+        if not indices:
+            return []
+        return get_embeddings().embed_documents([prep.textes[i] for i in indices])
+
+    def ecrire_document(
+        self,
+        nom_collection: str,
+        prep: DocumentPrepare,
+        lots: Iterable[tuple[list[int], list[list[float]]]],
+        progression: Callable[[dict], None] | None = None,
+    ) -> dict:
+        """
+        Applique le diff d'un document préparé dans la collection : upsert
+        des chunks de chaque lot (indices, embeddings) au fil de leur arrivée,
+        suppression des chunks disparus, puis mise à jour du catalogue.
+
+        Comme pour ajouter_document, chaque lot est noté « en cours » dans le
+        catalogue : une erreur (y compris levée par `lots`) laisse l'index
+        existant intact, et la reprise saute les lots déjà écrits.
+        """
+        if not prep.textes:
+            return {
+                "status": "skipped",
+                "chunks": 0,
+                "message": f"{prep.nom} : aucun texte extrait",
+            }
+
+        catalogue = self.cm.catalogue(nom_collection)
+        anciens = set(catalogue.chunk_ids(prep.nom)) | set(catalogue.chunks_en_cours(prep.nom))
+        nb_embeddes = 0
+        for indices, vecteurs in lots:
+            self._ecrire_chunks(
+                nom_collection,
+                prep.nom,
+                [prep.ids[i] for i in indices],
+                [prep.textes[i] for i in indices],
+                [prep.metadonnees[i] for i in indices],
+                vecteurs,
+            )
+            nb_embeddes += len(indices)
+            if progression:
+                progression({
+                    "document": prep.nom,
+                    "pages": prep.nb_pages,
+                    "chunks": len(prep.ids),
+                    "embedded": nb_embeddes,
                 })
+        return self._finaliser_document(
+            nom_collection, prep.nom, prep.sha256, prep.nb_pages, prep.ids, anciens,
+            nb_embeddes, prep.empreinte,
+        )
 
-        # Supprimer les anciens chunks de ce document si re-indexation
-        metadata = self._charger_metadata(nom_collection)
-        doc_info = metadata["documents"].get(chemin.name)
-        if doc_info and doc_info.get("chunk_ids"):
+    def _ecrire_chunks(
+        self,
+        nom_collection: str,
+        nom: str,
+        ids: list[str],
+        textes: list[str],
+        metadonnees: list[dict],
+        vecteurs: list[list[float]],
+    ) -> None:
+        """
+        Upsert de chunks (embeddings déjà calculés) dans ChromaDB et l'index BM25.
+        Les chunks sont notés « en cours » dans le catalogue jusqu'à
+        l'enregistrement du document `nom`.
+        """
+        catalogue = self.cm.catalogue(nom_collection)
+        catalogue.reserver_chunks(nom, ids)
+        db = self.cm.creer_collection(nom_collection)
+        db._collection.upsert(ids=ids, embeddings=vecteurs, documents=textes, metadatas=metadonnees)
+        self.cm.index_bm25(nom_collection).ajouter(ids, textes)
+        catalogue.confirmer_chunks(ids)
+
+    def _finaliser_document(
+        self,
+        nom_collection: str,
+        nom: str,
+        sha256: str,
+        nb_pages: int,
+        chunk_ids: list[str],
+        anciens: set[str],
+        nb_embeddes: int,
+        empreinte: tuple[int, int, int] | None,
+    ) -> dict:
+        """Supprime les chunks disparus, met à jour le catalogue et la version."""
+        # Supprimer uniquement les chunks qui n'existent plus dans la nouvelle version
+        supprimes = list(anciens - set(chunk_ids))
+        if supprimes:
             try:
                 db = self.cm.get_collection(nom_collection)
-                db.delete(ids=doc_info["chunk_ids"])
+                db.delete(ids=supprimes)
             except Exception:
                 pass
+            self.cm.index_bm25(nom_collection).supprimer(supprimes)
 
-        # Ajouter les nouveaux chunks
-        db = self.cm.creer_collection(nom_collection)
-        db.add_texts(texts=textes, metadatas=metadonnees, ids=chunk_ids)
-
-        # Mettre à jour le metadata.json
-        metadata["documents"][chemin.name] = {
-            "sha256": self._calculer_hash(chemin),
-            "date": datetime.now().isoformat(),
-            "chunk_ids": chunk_ids,
-            "nb_chunks": len(chunk_ids),
-            "nb_pages": len(pages),
-        }
-        self._sauvegarder_metadata(nom_collection, metadata)
+        self.cm.catalogue(nom_collection).enregistrer_document(
+            nom, sha256, nb_pages, chunk_ids, empreinte=empreinte
+        )
+        if nb_embeddes or supprimes:
+            self.cm.incrementer_version(nom_collection)
 
+        message = f"{nom} : {len(chunk_ids)} chunks indexés ({nb_pages} pages)"
+        if anciens:
+            message += f", {nb_embeddes} ré-embeddés, {len(supprimes)} supprimés"
         return {
             "status": "indexed",
             "chunks": len(chunk_ids),
-            "message": f"{chemin.name} : {len(chunk_ids)} chunks indexés ({len(pages)} pages)",
+            "pages": nb_pages,
+            "embedded": nb_embeddes,
+            "deleted": len(supprimes),
+            "message": message,
         }
 
     def supprimer_document(self, nom_collection: str, nom_fichier: str) -> bool:
-        """Supprime un document de la collection (chunks + metadata)."""
-        metadata = self._charger_metadata(nom_collection)
-        doc_info = metadata["documents"].get(nom_fichier)
-        if not doc_info:
+        """Supprime un document de la collection (chunks + catalogue)."""
+        chunk_ids = self.cm.catalogue(nom_collection).supprimer_document(nom_fichier)
+        if chunk_ids is None:
             return False
 
         # Supprimer les chunks de ChromaDB
-        if doc_info.get("chunk_ids"):
+        if chunk_ids:
             try:
                 db = self.cm.get_collection(nom_collection)
-                db.delete(ids=doc_info["chunk_ids"])
+                db.delete(ids=chunk_ids)
             except Exception:
                 pass
+            self.cm.index_bm25(nom_collection).supprimer(chunk_ids)
 
-        # Retirer du metadata
-        del metadata["documents"][nom_fichier]
-        self._sauvegarder_metadata(nom_collection, metadata)
+        self.cm.incrementer_version(nom_collection)
         return True
 
-    def lister_documents(self, nom_collection: str) -> list[dict]:
-        """Liste les documents indexés dans une collection."""
-        metadata = self._charger_metadata(nom_collection)
-        docs = []
-        for nom, info in metadata["documents"].items():
-            docs.append({
-                "nom": nom,
-                "date": info.get("date", ""),
-                "nb_chunks": info.get("nb_chunks", 0),
-                "nb_pages": info.get("nb_pages", 0),
-                "sha256": info.get("sha256", ""),
-            })
-        return docs
+    def nettoyer_chunks_partiels(self, nom_collection: str) -> int:
+        """
+        Supprime les chunks écrits par des indexations interrompues et jamais
+        enregistrés dans le catalogue. Retourne le nombre de chunks supprimés.
+
+        À n'appeler que lorsqu'aucune indexation n'est en cours sur la collection
+        (vérifié par `ingest.py --cleanup`).
+        """
+        catalogue = self.cm.catalogue(nom_collection)
+        orphelins = catalogue.chunks_orphelins()
+        if orphelins:
+            try:
+                db = self.cm.get_collection(nom_collection)
+                db.delete(ids=orphelins)
+            except Exception:
+                pass
+            self.cm.index_bm25(nom_collection).supprimer(orphelins)
+            self.cm.incrementer_version(nom_collection)
+        catalogue.oublier_chunks_en_cours()
+        return len(orphelins)
+
+    def lister_documents(
+        self, nom_collection: str, offset: int = 0, limit: int | None = None
+    ) -> list[dict]:
+        """Liste les documents indexés dans une collection (par nom, paginé)."""
+        return self.cm.catalogue(nom_collection).lister(offset, limit)
+
+    def compter_documents(self, nom_collection: str) -> int:
+        """Nombre de documents indexés dans une collection."""
+        return self.cm.catalogue(nom_collection).compter()
+
+    def reconstruire_index_bm25(self, nom_collection: str, taille_page: int = 1000) -> int:
+        """
+        Reconstruit l'index BM25 d'une collection à partir des chunks ChromaDB
+        (collections indexées avant l'index BM25). Retourne le nombre de chunks.
+        """
+        db = self.cm.get_collection(nom_collection)
+        index = self.cm.index_bm25(nom_collection)
+        total = 0
+        while True:
+            page = db._collection.get(include=["documents"], limit=taille_page, offset=total)
+            if not page["ids"]:
+                break
+            index.ajouter(page["ids"], page["documents"])
+            total += len(page["ids"])
+        return total
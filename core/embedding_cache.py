@@ -0,0 +1,179 @@
+"""
+core/embedding_cache.py — Cache disque des embeddings de chunks.
+
+Clé : (modèle d'embedding, SHA256 du texte du chunk). Le cache est partagé
+entre toutes les collections : ré-indexer un document (--force, changement
+de metadata) ou l'ajouter à une seconde collection ne rappelle pas Ollama
+pour les chunks dont le texte n'a pas changé.
+
+Stockage SQLite (mode WAL) ; éviction LRU dès que la taille cumulée des
+vecteurs dépasse la limite configurée.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+
+def hash_texte(texte: str) -> str:
+    """SHA256 hexadécimal d'un texte (UTF-8)."""
+    return hashlib.sha256(texte.encode("utf-8")).hexdigest()
+
+
+class CacheEmbeddings:
+    """Cache SQLite (modèle, hash texte) -> vecteur float32, avec éviction par taille."""
+
+    def __init__(self, chemin: Path, taille_max_octets: int):
+        self.chemin = Path(chemin)
+        self.taille_max_octets = taille_max_octets
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.chemin), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                modele TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vecteur BLOB NOT NULL,
+                taille INTEGER NOT NULL,
+                dernier_acces REAL NOT NULL,
+                PRIMARY KEY (modele, hash)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_acces ON embeddings (dernier_acces)"
+        )
+        self._conn.commit()
+        self._taille = self._conn.execute(
+            "SELECT COALESCE(SUM(taille), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def lire(self, modele: str, hashes: list[str]) -> dict[str, list[float]]:
+        """Retourne {hash: vecteur} pour les hashes présents dans le cache."""
+        trouves: dict[str, list[float]] = {}
+        if not hashes:
+            return trouves
+
+        uniques = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Requêtes par paquets pour rester sous la limite de paramètres SQLite
+            for i in range(0, len(uniques), 500):
+                paquet = uniques[i:i + 500]
+                marqueurs = ",".join("?" * len(paquet))
+                lignes = self._conn.execute(
+                    f"SELECT hash, vecteur FROM embeddings "
+                    f"WHERE modele = ? AND hash IN ({marqueurs})",
+                    [modele, *paquet],
+                ).fetchall()
+                for h, blob in lignes:
+                    trouves[h] = array("f", blob).tolist()
+
+            if trouves:
+                maintenant = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET dernier_acces = ? WHERE modele = ? AND hash = ?",
+                    [(maintenant, modele, h) for h in trouves],
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for h in hashes if h in trouves)
+            self.misses += sum(1 for h in hashes if h not in trouves)
+        return trouves
+
+    def ecrire(self, modele: str, hashes: list[str], vecteurs: list[list[float]]) -> None:
+        """Ajoute des vecteurs au cache puis évince si la limite est dépassée."""
+        if not hashes:
+            return
+
+        maintenant = time.time()
+        lignes = []
+        for h, vecteur in zip(hashes, vecteurs):
+            blob = array("f", vecteur).tobytes()
+            lignes.append((modele, h, blob, len(blob), maintenant))
+
+        with self._lock:
+            for modele_, h, blob, taille, acces in lignes:
+                curseur = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+                    (modele_, h, blob, taille, acces),
+                )
+                if curseur.rowcount:
+                    self._taille += taille
+            self._conn.commit()
+            if self._taille > self.taille_max_octets:
+                self._evincer()
+
+    def _evincer(self) -> None:
+        """Supprime les entrées les moins récemment utilisées (à appeler sous verrou)."""
+        cible = int(self.taille_max_octets * 0.9)
+        lignes = self._conn.execute(
+            "SELECT rowid, taille FROM embeddings ORDER BY dernier_acces"
+        )
+        a_supprimer = []
+        for rowid, taille in lignes:
+            if self._taille <= cible:
+                break
+            a_supprimer.append((rowid,))
+            self._taille -= taille
+        self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", a_supprimer)
+        self._conn.commit()
+        self.evictions += len(a_supprimer)
+
+    def stats(self) -> dict:
+        """Compteurs du cache (hits, misses, taux, taille)."""
+        with self._lock:
+            nb_entrees = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "entries": nb_entrees,
+                "size_bytes": self._taille,
+                "max_size_bytes": self.taille_max_octets,
+            }
+
+
+class EmbeddingsEnCache(Embeddings):
+    """
+    Enveloppe LangChain : consulte le cache disque avant d'appeler le modèle.
+
+    Seuls les textes de documents (chunks) sont mis en cache ;
+    embed_query est transmis tel quel au modèle.
+    """
+
+    def __init__(self, modele: Embeddings, nom_modele: str, cache: CacheEmbeddings):
+        self.modele = modele
+        self.nom_modele = nom_modele
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [hash_texte(t) for t in texts]
+        trouves = self.cache.lire(self.nom_modele, hashes)
+
+        manquants: dict[str, str] = {}
+        for h, texte in zip(hashes, texts):
+            if h not in trouves:
+                manquants.setdefault(h, texte)
+
+        if manquants:
+            vecteurs = self.modele.embed_documents(list(manquants.values()))
+            calcules = dict(zip(manquants.keys(), vecteurs))
+            self.cache.ecrire(self.nom_modele, list(calcules.keys()), list(calcules.values()))
+            trouves.update(calcules)
+
+        return [trouves[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.modele.embed_query(text)
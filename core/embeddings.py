@@ -4,16 +4,48 @@ core/embeddings.py — Configuration Ollama et embeddings.
 Source unique de vérité pour le modèle et l'URL du serveur Ollama.
 """
 
+import asyncio
 import os
+import threading
+import time
 import urllib.request
+from pathlib import Path
 
-from langchain_ollama import OllamaEmbeddings
+import httpx
+from langchain_core.embeddings import Embeddings
+
+from core.embedding_cache import CacheEmbeddings, EmbeddingsEnCache
 
 # --- Configuration centralisée (avec support des variables d'environnement) ---
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1:8b")
 EMBEDDING_MODEL = os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text")
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
-OLLAMA_API_GENERATE = f"{OLLAMA_BASE_URL}/api/generate"
+OLLAMA_API_CHAT = f"{OLLAMA_BASE_URL}/api/chat"
+# Durée de maintien du modèle en mémoire après une requête ("30m", "-1" = toujours)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# Appels /api/embed : taille de lot, requêtes simultanées, timeout (secondes)
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+EMBED_MAX_INFLIGHT = int(os.environ.get("EMBED_MAX_INFLIGHT", "2"))
+EMBED_TIMEOUT = float(os.environ.get("EMBED_TIMEOUT", "60"))
+# Requêtes réussies consécutives avant de redoubler une taille de lot réduite
+EMBED_BATCH_GROW_AFTER = int(os.environ.get("EMBED_BATCH_GROW_AFTER", "8"))
+
+# Cache disque des embeddings de chunks (partagé entre collections)
+EMBED_CACHE_ACTIF = os.environ.get("EMBED_CACHE", "1") != "0"
+EMBED_CACHE_PATH = Path(os.environ.get("EMBED_CACHE_PATH", "./chroma_db/embeddings_cache.sqlite3"))
+EMBED_CACHE_MAX_MB = int(os.environ.get("EMBED_CACHE_MAX_MB", "1024"))
+
+_cache_embeddings: CacheEmbeddings | None = None
+_client_embeddings: "OllamaBatchEmbeddings | None" = None
+
+
+def keep_alive_ollama(valeur: str = OLLAMA_KEEP_ALIVE) -> str | int:
+    """Valeur keep_alive pour l'API Ollama : durée ("30m") ou secondes (nombre, -1 = illimité)."""
+    try:
+        return int(valeur)
+    except ValueError:
+        return valeur
 
 
 def verifier_ollama() -> bool:
@@ -25,9 +57,183 @@ def verifier_ollama() -> bool:
         return False
 
 
-def get_embeddings() -> OllamaEmbeddings:
-    """Retourne une instance OllamaEmbeddings configurée avec le modèle dédié."""
-    return OllamaEmbeddings(
-        model=EMBEDDING_MODEL,
-        base_url=OLLAMA_BASE_URL,
-    )
+class OllamaBatchEmbeddings(Embeddings):
+    """
+    Client d'embeddings Ollama par lots (endpoint /api/embed).
+
+    - les textes sont envoyés par lots de `taille_lot` ;
+    - au plus `max_en_vol` requêtes sont en cours simultanément, tous
+      appelants confondus ;
+    - sur timeout, la taille de lot est divisée par deux (pour les appels
+      suivants aussi) et le lot fautif est redécoupé ; après `croissance_apres`
+      lots pleins réussis d'affilée, elle redouble, sans dépasser `taille_lot` ;
+    - des compteurs de débit sont tenus (cf. stats()).
+
+    Toutes les requêtes tournent dans une boucle asyncio dédiée (un thread
+    par instance), quel que soit l'appelant (méthodes synchrones, aembed_*
+    depuis une autre boucle) : un seul sémaphore et un seul client HTTP,
+    dont les connexions restent ouvertes d'un appel à l'autre.
+    """
+
+    def __init__(
+        self,
+        modele: str = EMBEDDING_MODEL,
+        base_url: str = OLLAMA_BASE_URL,
+        taille_lot: int = EMBED_BATCH_SIZE,
+        max_en_vol: int = EMBED_MAX_INFLIGHT,
+        timeout: float = EMBED_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+        croissance_apres: int = EMBED_BATCH_GROW_AFTER,
+    ):
+        self.modele = modele
+        self.base_url = base_url
+        self.taille_max = self.taille_lot = max(1, taille_lot)
+        self.max_en_vol = max(1, max_en_vol)
+        self.timeout = timeout
+        self.croissance_apres = max(1, croissance_apres)
+        self._transport = transport
+        self._lock = threading.Lock()
+        # Boucle dédiée, et ses sémaphore et client HTTP (créés à son premier appel)
+        self._boucle: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._succes_consecutifs = 0
+        self._compteurs = {"requests": 0, "texts": 0, "timeouts": 0, "batch_shrinks": 0, "batch_grows": 0}
+        self._duree_totale = 0.0
+
+    # --- API LangChain ---
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return asyncio.run_coroutine_threadsafe(self._embed(texts), self._boucle_dediee()).result()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._embed(texts), self._boucle_dediee())
+        )
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    # --- Interne ---
+
+    def _boucle_dediee(self) -> asyncio.AbstractEventLoop:
+        """Boucle asyncio de toutes les requêtes, démarrée au premier appel."""
+        with self._lock:
+            if self._boucle is None:
+                self._boucle = asyncio.new_event_loop()
+                threading.Thread(target=self._boucle.run_forever, name="embeddings", daemon=True).start()
+            return self._boucle
+
+    async def _embed(self, texts: list[str]) -> list[list[float]]:
+        """Embedde `texts` par lots ; s'exécute dans la boucle dédiée."""
+        if not texts:
+            return []
+        if self._client is None:
+            self._semaphore = asyncio.Semaphore(self.max_en_vol)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=self.max_en_vol),
+                transport=self._transport,
+            )
+        resultats: list[list[float] | None] = [None] * len(texts)
+        taille = self.taille_lot
+        await asyncio.gather(*(
+            self._embed_plage(texts, resultats, debut, min(debut + taille, len(texts)))
+            for debut in range(0, len(texts), taille)
+        ))
+        return resultats
+
+    def _ajuster_taille(self, taille_requete: int) -> None:
+        """Après un lot réussi : redouble la taille réduite au bout de `croissance_apres` lots pleins."""
+        if self.taille_lot >= self.taille_max or taille_requete < self.taille_lot:
+            return
+        self._succes_consecutifs += 1
+        if self._succes_consecutifs >= self.croissance_apres:
+            self.taille_lot = min(self.taille_max, 2 * self.taille_lot)
+            self._succes_consecutifs = 0
+            self._compteurs["batch_grows"] += 1
+
+    async def _embed_plage(
+        self,
+        textes: list[str],
+        resultats: list,
+        debut: int,
+        fin: int,
+    ) -> None:
+        """Embedde textes[debut:fin] ; redécoupe la plage en cas de timeout."""
+        try:
+            async with self._semaphore:
+                t0 = time.perf_counter()
+                reponse = await self._client.post(
+                    "/api/embed",
+                    json={"model": self.modele, "input": textes[debut:fin]},
+                )
+                reponse.raise_for_status()
+                vecteurs = reponse.json()["embeddings"]
+                duree = time.perf_counter() - t0
+        except httpx.TimeoutException:
+            if fin - debut <= 1:
+                raise
+            milieu = debut + (fin - debut) // 2
+            with self._lock:
+                self._compteurs["timeouts"] += 1
+                self._succes_consecutifs = 0
+                if self.taille_lot > milieu - debut:
+                    self.taille_lot = max(1, milieu - debut)
+                    self._compteurs["batch_shrinks"] += 1
+            await asyncio.gather(
+                self._embed_plage(textes, resultats, debut, milieu),
+                self._embed_plage(textes, resultats, milieu, fin),
+            )
+            return
+
+        resultats[debut:fin] = vecteurs
+        with self._lock:
+            self._compteurs["requests"] += 1
+            self._compteurs["texts"] += fin - debut
+            self._duree_totale += duree
+            self._ajuster_taille(fin - debut)
+
+    def stats(self) -> dict:
+        """Compteurs de débit : requêtes, textes, timeouts, textes/seconde."""
+        with self._lock:
+            return {
+                **self._compteurs,
+                "batch_size": self.taille_lot,
+                "max_in_flight": self.max_en_vol,
+                "texts_per_second": (
+                    round(self._compteurs["texts"] / self._duree_totale, 1)
+                    if self._duree_totale else 0.0
+                ),
+            }
+
+
+def get_client_embeddings() -> OllamaBatchEmbeddings:
+    """Retourne le client d'embeddings Ollama partagé du processus (sans cache)."""
+    global _client_embeddings
+    if _client_embeddings is None:
+        _client_embeddings = OllamaBatchEmbeddings()
+    return _client_embeddings
+
+
+def get_cache_embeddings() -> CacheEmbeddings | None:
+    """Retourne le cache disque des embeddings du processus (None si désactivé)."""
+    global _cache_embeddings
+    if not EMBED_CACHE_ACTIF:
+        return None
+    if _cache_embeddings is None:
+        _cache_embeddings = CacheEmbeddings(EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB * 1024 * 1024)
+    return _cache_embeddings
+
+
+def get_embeddings() -> Embeddings:
+    """Retourne les embeddings Ollama du modèle dédié, derrière le cache disque si actif."""
+    modele = get_client_embeddings()
+    cache = get_cache_embeddings()
+    if cache is None:
+        return modele
+    return EmbeddingsEnCache(modele, EMBEDDING_MODEL, cache)
@@ -0,0 +1,309 @@
+"""
+core/jobs.py — File d'attente persistante des indexations de documents.
+
+Les uploads (API, Streamlit) ne sont plus indexés pendant la requête : le
+fichier est déposé dans ./index_jobs/files/{id}/ et une tâche est inscrite en
+base SQLite. Un nombre borné de threads (INDEX_JOBS_WORKERS) traite les tâches
+dans l'ordre d'arrivée et publie leur avancement (pages lues, chunks
+embeddés, ETA).
+
+La file survit à un redémarrage : une tâche « running » dont le processus ne
+donne plus signe de vie (pas de battement depuis INDEX_JOBS_STALE secondes)
+repasse « queued » et est reprise ; l'indexation étant incrémentale, les
+chunks déjà écrits ne sont pas ré-embeddés.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import BinaryIO
+
+from core.archives import est_archive, indexer_archive, rapport_archive
+from core.collection_manager import CollectionManager
+from core.document_manager import DocumentManager
+from core.parsers import compter_pages
+
+JOBS_DIR = Path(os.environ.get("INDEX_JOBS_DIR", "./index_jobs"))
+JOBS_WORKERS = int(os.environ.get("INDEX_JOBS_WORKERS", "1"))
+JOBS_STALE = float(os.environ.get("INDEX_JOBS_STALE", "60"))
+JOBS_RETENTION = float(os.environ.get("INDEX_JOBS_RETENTION", "604800"))
+
+# Intervalle de scrutation de la file (tâches déposées par un autre processus)
+_INTERVALLE = 2.0
+
+_file_indexation = None
+
+
+def _indexer(collection: str, chemin: Path, force: bool, progression: Callable[[dict], None]) -> dict:
+    """
+    Indexation par défaut d'une tâche : DocumentManager.ajouter_document,
+    ou rapport d'indexation pour une archive (core.archives).
+    """
+    dm = DocumentManager(CollectionManager())
+    if est_archive(chemin):
+        return rapport_archive(indexer_archive(dm, collection, chemin, force), progression)
+    return dm.ajouter_document(collection, chemin, force=force, progression=progression)
+
+
+class FileIndexation:
+    """File d'indexation persistée en SQLite, traitée par un pool de threads borné."""
+
+    def __init__(
+        self,
+        dossier: Path = JOBS_DIR,
+        workers: int = JOBS_WORKERS,
+        indexer: Callable[..., dict] = _indexer,
+    ):
+        self.dossier = Path(dossier)
+        self.workers = max(1, workers)
+        self.indexer = indexer
+        (self.dossier / "files").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._en_cours: set[str] = set()
+
+        self._conn = sqlite3.connect(
+            str(self.dossier / "jobs.sqlite3"), timeout=30, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                nom TEXT NOT NULL,
+                fichier TEXT NOT NULL,
+                force INTEGER NOT NULL,
+                statut TEXT NOT NULL,
+                cree REAL NOT NULL,
+                debut REAL,
+                fin REAL,
+                battement REAL,
+                total_pages INTEGER,
+                pages INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                embedded INTEGER NOT NULL DEFAULT 0,
+                resultat TEXT,
+                erreur TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_statut ON jobs (statut, cree);
+            CREATE INDEX IF NOT EXISTS idx_jobs_collection ON jobs (collection, cree);
+            """
+        )
+        self._conn.commit()
+
+    # --- Soumission et consultation ---
+
+    def soumettre(
+        self, collection: str, nom: str, source: BinaryIO | bytes | Path, force: bool = False
+    ) -> str:
+        """Dépose un fichier et inscrit sa tâche d'indexation. Retourne l'identifiant."""
+        job_id = uuid.uuid4().hex
+        fichier = self.dossier / "files" / job_id / Path(nom).name
+        fichier.parent.mkdir(parents=True)
+        if isinstance(source, Path):
+            shutil.copyfile(source, fichier)
+        elif isinstance(source, bytes):
+            fichier.write_bytes(source)
+        else:
+            with open(fichier, "wb") as f:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, collection, nom, fichier, force, statut, cree) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, collection, fichier.name, str(fichier), int(force), time.time()),
+            )
+        self._reveil.set()
+        return job_id
+
+    def tache(self, job_id: str) -> dict | None:
+        """État d'une tâche (avancement, ETA en secondes), None si inconnue."""
+        with self._lock:
+            ligne = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decrire(ligne) if ligne else None
+
+    def lister(self, collection: str | None = None, limit: int = 50) -> list[dict]:
+        """Tâches les plus récentes (d'une collection ou de toutes)."""
+        with self._lock:
+            if collection:
+                lignes = self._conn.execute(
+                    "SELECT * FROM jobs WHERE collection = ? ORDER BY cree DESC LIMIT ?",
+                    (collection, limit),
+                ).fetchall()
+            else:
+                lignes = self._conn.execute(
+                    "SELECT * FROM jobs ORDER BY cree DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [self._decrire(ligne) for ligne in lignes]
+
+    def taches_actives(self, collection: str) -> int:
+        """Tâches d'une collection en cours dans un processus vivant (battement récent)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE collection = ? AND statut = 'running' "
+                "AND battement >= ?",
+                (collection, time.time() - JOBS_STALE),
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        """Nombre de tâches par statut."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT statut, COUNT(*) FROM jobs GROUP BY statut"
+            ).fetchall()
+        return {"workers": self.workers, **{statut: n for statut, n in lignes}}
+
+    @staticmethod
+    def _decrire(ligne: sqlite3.Row) -> dict:
+        tache = dict(ligne)
+        tache["force"] = bool(tache["force"])
+        tache["resultat"] = json.loads(tache["resultat"]) if tache["resultat"] else None
+        del tache["fichier"], tache["battement"]
+
+        tache["eta"] = None
+        if tache["statut"] == "running" and tache["total_pages"] and tache["pages"]:
+            ecoule = time.time() - tache["debut"]
+            restantes = max(0, tache["total_pages"] - tache["pages"])
+            tache["eta"] = round(ecoule / tache["pages"] * restantes, 1)
+        return tache
+
+    # --- Traitement ---
+
+    def demarrer(self) -> None:
+        """Lance les threads de traitement (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return
+            self._arret.clear()
+            self._threads = [
+                threading.Thread(target=self._boucle, name=f"indexation-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            self._threads.append(
+                threading.Thread(target=self._battre, name="indexation-battement", daemon=True)
+            )
+        self._purger()
+        for thread in self._threads:
+            thread.start()
+
+    def arreter(self, timeout: float | None = None) -> None:
+        """Arrête les threads après la tâche en cours ; les tâches en attente restent en file."""
+        self._arret.set()
+        self._reveil.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _boucle(self) -> None:
+        while not self._arret.is_set():
+            tache = self._prendre()
+            if tache is None:
+                self._reveil.wait(_INTERVALLE)
+                self._reveil.clear()
+                continue
+            self._executer(tache)
+
+    def _battre(self) -> None:
+        """Signale que les tâches de ce processus sont vivantes ; reprend les orphelines."""
+        while not self._arret.wait(min(_INTERVALLE * 5, JOBS_STALE / 3)):
+            maintenant = time.time()
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE jobs SET battement = ? WHERE id = ?",
+                    [(maintenant, job_id) for job_id in self._en_cours],
+                )
+            if self._reprendre_orphelines():
+                self._reveil.set()
+
+    def _reprendre_orphelines(self) -> int:
+        """Remet en file les tâches « running » abandonnées (processus arrêté)."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET statut = 'queued' WHERE statut = 'running' AND battement < ?",
+                (time.time() - JOBS_STALE,),
+            ).rowcount
+
+    def _purger(self) -> None:
+        """Oublie les tâches terminées depuis plus de JOBS_RETENTION secondes."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE statut IN ('done', 'error') AND fin < ?",
+                (time.time() - JOBS_RETENTION,),
+            )
+
+    def _prendre(self) -> sqlite3.Row | None:
+        """Réserve la plus ancienne tâche en attente (sûr entre processus)."""
+        self._reprendre_orphelines()
+        with self._lock, self._conn:
+            ligne = self._conn.execute(
+                "SELECT * FROM jobs WHERE statut = 'queued' ORDER BY cree LIMIT 1"
+            ).fetchone()
+            if ligne is None:
+                return None
+            maintenant = time.time()
+            reservee = self._conn.execute(
+                "UPDATE jobs SET statut = 'running', debut = COALESCE(debut, ?), battement = ? "
+                "WHERE id = ? AND statut = 'queued'",
+                (maintenant, maintenant, ligne["id"]),
+            ).rowcount
+            if not reservee:
+                return None
+            self._en_cours.add(ligne["id"])
+        return ligne
+
+    def _maj(self, job_id: str, **champs) -> None:
+        colonnes = ", ".join(f"{c} = ?" for c in champs)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {colonnes}, battement = ? WHERE id = ?",
+                (*champs.values(), time.time(), job_id),
+            )
+
+    def _executer(self, tache: sqlite3.Row) -> None:
+        job_id = tache["id"]
+        fichier = Path(tache["fichier"])
+        try:
+            if not est_archive(fichier):
+                self._maj(job_id, total_pages=compter_pages(fichier))
+
+            def _progression(etat: dict) -> None:
+                self._maj(
+                    job_id, pages=etat["pages"], chunks=etat["chunks"], embedded=etat["embedded"]
+                )
+
+            resultat = self.indexer(
+                tache["collection"], fichier, bool(tache["force"]), _progression
+            )
+            self._maj(
+                job_id,
+                statut="error" if resultat.get("status") == "error" else "done",
+                fin=time.time(),
+                chunks=resultat.get("chunks", 0),
+                resultat=json.dumps(resultat, ensure_ascii=False),
+            )
+        except Exception as e:
+            self._maj(job_id, statut="error", fin=time.time(), erreur=str(e))
+        finally:
+            with self._lock:
+                self._en_cours.discard(job_id)
+            shutil.rmtree(fichier.parent, ignore_errors=True)
+
+
+def get_file_indexation() -> FileIndexation:
+    """Retourne la file d'indexation partagée du processus (threads démarrés)."""
+    global _file_indexation
+    if _file_indexation is None:
+        _file_indexation = FileIndexation()
+    _file_indexation.demarrer()
+    return _file_indexation
@@ -0,0 +1,184 @@
+"""
+core/journal.py — Journal persistant des exécutions de ingest.py.
+
+Chaque exécution (« run ») est inscrite en base SQLite avec ses paramètres et
+la liste des fichiers à indexer ; le statut de chaque fichier est enregistré
+dès qu'il est traité. Après un crash (OOM, redémarrage d'Ollama, Ctrl-C),
+`python ingest.py --resume` reprend le run là où il s'est arrêté : les
+fichiers terminés ne sont pas relus, et le document interrompu reprend après
+son dernier lot écrit (cf. les chunks en cours de core.catalog).
+
+Un run « running » dont le processus n'existe plus est considéré interrompu.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_PATH = Path(os.environ.get("INGEST_JOURNAL_PATH", "./chroma_db/ingest_runs.sqlite3"))
+
+
+def _processus_actif(pid: int) -> bool:
+    """Vrai si le processus `pid` existe encore sur cette machine."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JournalIngestion:
+    """Journal des runs d'indexation (SQLite, mode WAL)."""
+
+    def __init__(self, chemin: Path = JOURNAL_PATH):
+        self.chemin = Path(chemin)
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.chemin), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                source TEXT NOT NULL,
+                force INTEGER NOT NULL,
+                workers INTEGER NOT NULL,
+                statut TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                debut REAL NOT NULL,
+                fin REAL
+            );
+            CREATE TABLE IF NOT EXISTS fichiers (
+                run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+                chemin TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                statut TEXT NOT NULL,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                PRIMARY KEY (run, chemin)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def creer_run(
+        self, collection: str, source: str, force: bool, workers: int, fichiers: list[str]
+    ) -> int:
+        """Inscrit un run et ses fichiers (« pending »). Retourne son numéro."""
+        with self._lock, self._conn:
+            run_id = self._conn.execute(
+                "INSERT INTO runs (collection, source, force, workers, statut, pid, debut) "
+                "VALUES (?, ?, ?, ?, 'running', ?, ?)",
+                (collection, source, int(force), workers, os.getpid(), time.time()),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO fichiers (run, chemin, position, statut) VALUES (?, ?, ?, 'pending')",
+                [(run_id, chemin, i) for i, chemin in enumerate(fichiers)],
+            )
+        return run_id
+
+    def run(self, run_id: int) -> dict | None:
+        """Description d'un run (statut, compteurs par statut de fichier), None si inconnu."""
+        with self._lock:
+            ligne = self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return self._decrire(ligne) if ligne else None
+
+    def lister(self, limit: int = 20) -> list[dict]:
+        """Runs les plus récents."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._decrire(ligne) for ligne in lignes]
+
+    def dernier_interrompu(self) -> dict | None:
+        """Run interrompu le plus récent, None s'il n'y en a pas."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT * FROM runs WHERE statut IN ('running', 'interrupted') ORDER BY id DESC"
+            ).fetchall()
+        for ligne in lignes:
+            run = self._decrire(ligne)
+            if run["statut"] == "interrupted":
+                return run
+        return None
+
+    def fichiers_restants(self, run_id: int) -> list[str]:
+        """Fichiers d'un run pas encore traités, dans l'ordre initial."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT chemin FROM fichiers WHERE run = ? AND statut = 'pending' ORDER BY position",
+                (run_id,),
+            ).fetchall()
+        return [ligne["chemin"] for ligne in lignes]
+
+    def marquer_fichier(
+        self, run_id: int, chemin: str, statut: str, chunks: int = 0, message: str = ""
+    ) -> None:
+        """Enregistre le résultat d'un fichier (ou d'une entrée d'archive, ajoutée au besoin)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO fichiers (run, chemin, position, statut, chunks, message) "
+                "VALUES (?, ?, (SELECT COUNT(*) FROM fichiers WHERE run = ?), ?, ?, ?) "
+                "ON CONFLICT (run, chemin) DO UPDATE SET statut = excluded.statut, "
+                "chunks = excluded.chunks, message = excluded.message",
+                (run_id, chemin, run_id, statut, chunks, message),
+            )
+
+    def reprendre(self, run_id: int) -> None:
+        """Rattache un run interrompu au processus courant."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET statut = 'running', pid = ?, fin = NULL WHERE id = ?",
+                (os.getpid(), run_id),
+            )
+
+    def terminer(self, run_id: int, statut: str = "done") -> None:
+        """Clôt un run (« done » ou « interrupted »)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET statut = ?, fin = ? WHERE id = ?", (statut, time.time(), run_id)
+            )
+
+    def runs_actifs(self, collection: str) -> list[dict]:
+        """Runs « running » d'une collection dont le processus est encore en vie."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT * FROM runs WHERE collection = ? AND statut = 'running'", (collection,)
+            ).fetchall()
+        return [run for run in map(self._decrire, lignes) if run["statut"] == "running"]
+
+    def abandonner(self, collection: str) -> int:
+        """Clôt les runs interrompus d'une collection (après nettoyage). Retourne leur nombre."""
+        with self._lock:
+            lignes = self._conn.execute(
+                "SELECT * FROM runs WHERE collection = ? AND statut IN ('running', 'interrupted')",
+                (collection,),
+            ).fetchall()
+        abandonnes = [
+            ligne["id"] for ligne in lignes if self._decrire(ligne)["statut"] == "interrupted"
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE runs SET statut = 'abandoned', fin = ? WHERE id = ?",
+                [(time.time(), run_id) for run_id in abandonnes],
+            )
+        return len(abandonnes)
+
+    def _decrire(self, ligne: sqlite3.Row) -> dict:
+        run = dict(ligne)
+        run["force"] = bool(run["force"])
+        if run["statut"] == "running" and not _processus_actif(run["pid"]):
+            run["statut"] = "interrupted"
+        with self._lock:
+            compteurs = self._conn.execute(
+                "SELECT statut, COUNT(*) FROM fichiers WHERE run = ? GROUP BY statut", (run["id"],)
+            ).fetchall()
+        run["fichiers"] = {statut: n for statut, n in compteurs}
+        return run
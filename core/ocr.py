@@ -0,0 +1,227 @@
+"""
+core/ocr.py — OCR des pages PDF scannées (Tesseract, local).
+
+Une page dont le texte extrait est trop pauvre (moins de OCR_MIN_CHARS
+caractères alphanumériques) est rastérisée avec PyMuPDF puis passée à
+Tesseract. L'OCR tourne dans un pool de processus (un par document, cf.
+PoolOCR) ; les résultats sont mis en cache sur disque avec pour clé le SHA256
+de l'image de la page : une ré-indexation ne relance jamais l'OCR d'une page
+déjà vue. Une page dont l'OCR échoue garde son texte extrait.
+
+Dépendances optionnelles : pytesseract, Pillow, le binaire tesseract et ses
+données pour les langues de OCR_LANG. En leur absence, les pages scannées
+restent sans texte (avertissement unique).
+"""
+
+import hashlib
+import io
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+
+OCR_ACTIF = os.environ.get("OCR", "1") != "0"
+OCR_MIN_CARACTERES = int(os.environ.get("OCR_MIN_CHARS", "50"))
+OCR_LANGUE = os.environ.get("OCR_LANG", "fra+eng")
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_CACHE_PATH = Path(os.environ.get("OCR_CACHE_PATH", "./chroma_db/ocr_cache.sqlite3"))
+
+_cache_ocr = None
+
+
+def texte_insuffisant(texte: str) -> bool:
+    """Vrai si le texte extrait d'une page est trop pauvre (page probablement scannée)."""
+    return sum(c.isalnum() for c in texte) < OCR_MIN_CARACTERES
+
+
+@lru_cache(maxsize=1)
+def ocr_disponible() -> bool:
+    """
+    Vérifie (une fois) que pytesseract, Pillow et le binaire tesseract sont
+    présents, avec les données de chaque langue de OCR_LANG.
+    """
+    try:
+        import PIL  # noqa: F401
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+        langues = set(pytesseract.get_languages(config=""))
+    except Exception:
+        print("  OCR indisponible (pytesseract, Pillow ou tesseract manquant) : pages scannées ignorées")
+        return False
+    manquantes = [langue for langue in OCR_LANGUE.split("+") if langue not in langues]
+    if manquantes:
+        print(
+            f"  OCR indisponible (langue(s) {', '.join(manquantes)} de OCR_LANG non installée(s)) : "
+            "pages scannées ignorées"
+        )
+        return False
+    return True
+
+
+class CacheOCR:
+    """Cache SQLite (hash image, langue) -> texte OCR."""
+
+    def __init__(self, chemin: Path):
+        self.chemin = Path(chemin)
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.pages_ocr = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.chemin), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS ocr (
+                hash TEXT NOT NULL,
+                langue TEXT NOT NULL,
+                texte TEXT NOT NULL,
+                date REAL NOT NULL,
+                PRIMARY KEY (hash, langue)
+            )"""
+        )
+        self._conn.commit()
+
+    def lire(self, hashes: list[str], langue: str) -> dict[str, str]:
+        """Retourne {hash: texte} pour les images déjà passées à l'OCR."""
+        trouves = {}
+        with self._lock:
+            for h in hashes:
+                ligne = self._conn.execute(
+                    "SELECT texte FROM ocr WHERE hash = ? AND langue = ?", (h, langue)
+                ).fetchone()
+                if ligne:
+                    trouves[h] = ligne[0]
+            self.hits += len(trouves)
+            self.misses += len(hashes) - len(trouves)
+        return trouves
+
+    def ecrire(self, textes: dict[str, str], langue: str) -> None:
+        """Mémorise des résultats d'OCR."""
+        maintenant = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)",
+                [(h, langue, texte, maintenant) for h, texte in textes.items()],
+            )
+            self.pages_ocr += len(textes)
+
+    def stats(self) -> dict:
+        """Compteurs du cache OCR."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "pages_ocr": self.pages_ocr,
+                "entries": self._conn.execute("SELECT COUNT(*) FROM ocr").fetchone()[0],
+            }
+
+
+def get_cache_ocr() -> CacheOCR:
+    """Retourne le cache OCR partagé du processus."""
+    global _cache_ocr
+    if _cache_ocr is None:
+        _cache_ocr = CacheOCR(OCR_CACHE_PATH)
+    return _cache_ocr
+
+
+def _ocr_image(image_png: bytes, langue: str) -> str:
+    """OCR d'une image PNG (exécuté dans un processus du pool)."""
+    import pytesseract
+    from PIL import Image
+
+    return pytesseract.image_to_string(Image.open(io.BytesIO(image_png)), lang=langue).strip()
+
+
+# Les pools de processus (OCR, conversion PDF) démarrent leurs processus par
+# « spawn » : un fork copierait les threads et les verrous du parent (serveur
+# API, étages du pipeline d'ingestion) dans un état incohérent.
+CONTEXTE_POOL = multiprocessing.get_context("spawn")
+
+
+class PoolOCR:
+    """
+    Pool de processus OCR d'un document, créé à sa première page à traiter
+    et réutilisé pour les suivantes. S'utilise comme context manager.
+    """
+
+    def __init__(self):
+        self._pool: ProcessPoolExecutor | None = None
+
+    def executeur(self) -> ProcessPoolExecutor | None:
+        """Le pool, ou None si l'OCR tourne dans le processus courant."""
+        # Pas de pool imbriqué dans un processus enfant (ingest.py --workers)
+        if OCR_WORKERS <= 1 or multiprocessing.parent_process() is not None:
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=CONTEXTE_POOL)
+        return self._pool
+
+    def fermer(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "PoolOCR":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fermer()
+
+
+def _resultat_ocr(page: int, calcul: Future | partial) -> str | None:
+    """Texte OCR d'une page, ou None (avec avertissement) si l'OCR a échoué."""
+    try:
+        return calcul.result() if isinstance(calcul, Future) else calcul()
+    except Exception as e:
+        print(f"  OCR impossible pour la page {page + 1} : {e}")
+        return None
+
+
+def ocr_pages(doc, numeros: list[int], pool: PoolOCR | None = None) -> dict[int, str]:
+    """
+    OCR de pages d'un document PyMuPDF ouvert (index 0-based), dans le pool
+    du document (`pool`, sinon un pool créé pour l'appel).
+    Retourne {numéro: texte} pour les pages reconnues ; {} si l'OCR est
+    désactivé ou indisponible. Une page en échec est absente du résultat.
+    """
+    if not numeros or not OCR_ACTIF or not ocr_disponible():
+        return {}
+    if pool is None:
+        with PoolOCR() as pool:
+            return ocr_pages(doc, numeros, pool)
+
+    images = {n: doc[n].get_pixmap(dpi=OCR_DPI).tobytes("png") for n in numeros}
+    hashes = {n: hashlib.sha256(image).hexdigest() for n, image in images.items()}
+    cache = get_cache_ocr()
+    textes = cache.lire(list(dict.fromkeys(hashes.values())), OCR_LANGUE)
+
+    # Un OCR par image distincte, rattaché à la première page qui la porte
+    a_traiter: dict[str, int] = {}
+    for n, h in hashes.items():
+        if h not in textes:
+            a_traiter.setdefault(h, n)
+    if a_traiter:
+        executeur = pool.executeur() if len(a_traiter) > 1 else None
+        if executeur is not None:
+            calculs = {
+                h: executeur.submit(_ocr_image, images[n], OCR_LANGUE) for h, n in a_traiter.items()
+            }
+        else:
+            calculs = {h: partial(_ocr_image, images[n], OCR_LANGUE) for h, n in a_traiter.items()}
+        nouveaux = {}
+        for h, calcul in calculs.items():
+            texte = _resultat_ocr(a_traiter[h], calcul)
+            if texte is not None:
+                nouveaux[h] = texte
+        cache.ecrire(nouveaux, OCR_LANGUE)
+        textes.update(nouveaux)
+
+    return {n: textes[h] for n, h in hashes.items() if h in textes}
@@ -0,0 +1,116 @@
+"""
+core/paliers.py — Fenêtre de contexte (num_ctx) par paliers.
+
+Le cache KV d'Ollama est dimensionné par num_ctx : une fenêtre de 4096 tokens
+pour un prompt de 300 gaspille la mémoire qui limite le nombre de sessions
+simultanées. Mais changer num_ctx recharge le modèle : il ne peut pas varier
+librement d'une requête à l'autre.
+
+Chaque requête est donc routée vers un palier parmi CONTEXT_BUCKETS, en
+restant sur le palier chargé tant que c'est possible :
+- une requête qui dépasse le palier chargé le fait monter au plus petit
+  palier suffisant ; les requêtes suivantes y sont groupées, même plus
+  petites (pas d'aller-retour) ;
+- le palier ne redescend qu'après CONTEXT_BUCKET_SHRINK_AFTER requêtes
+  consécutives qui tiennent dans un palier inférieur, vers le plus grand
+  palier dont elles ont eu besoin.
+
+Le besoin d'une requête est son prompt estimé (core.contexte), majoré de
+CONTEXT_BUCKET_MARGIN (l'estimation ne passe pas par le tokenizer), plus
+num_predict (LLM_NUM_PREDICT).
+
+Le palier chargé est suivi par processus : l'API et Streamlit, s'ils partagent
+un même serveur Ollama, ne se coordonnent pas.
+"""
+
+import math
+import os
+import threading
+
+CONTEXT_BUCKETS = sorted(
+    int(palier) for palier in os.environ.get("CONTEXT_BUCKETS", "2048,4096").split(",") if palier.strip()
+)
+CONTEXT_BUCKET_SHRINK_AFTER = int(os.environ.get("CONTEXT_BUCKET_SHRINK_AFTER", "8"))
+CONTEXT_BUCKET_MARGIN = float(os.environ.get("CONTEXT_BUCKET_MARGIN", "0.1"))
+# Tokens générés au plus par réponse (option num_predict d'Ollama)
+LLM_NUM_PREDICT = int(os.environ.get("LLM_NUM_PREDICT", "512"))
+
+
+class PaliersContexte:
+    """Choix du num_ctx de chaque requête parmi des paliers, avec le palier chargé collant."""
+
+    def __init__(
+        self,
+        paliers: list[int] | None = None,
+        descente_apres: int = CONTEXT_BUCKET_SHRINK_AFTER,
+        marge: float = CONTEXT_BUCKET_MARGIN,
+    ):
+        self.paliers = sorted(paliers or CONTEXT_BUCKETS)
+        self.descente_apres = descente_apres
+        self.marge = marge
+        self._lock = threading.Lock()
+        self.charge: int | None = None
+        # Requêtes consécutives qui tenaient dans un palier inférieur au palier chargé
+        self._sous_utilisation = 0
+        self._besoin_max = 0
+        self.requetes = {palier: 0 for palier in self.paliers}
+        self.chargements = {palier: 0 for palier in self.paliers}
+        self.depassements = 0
+
+    def besoin(self, tokens_prompt: int, num_predict: int = LLM_NUM_PREDICT) -> int:
+        """Tokens de contexte nécessaires : prompt estimé (avec marge) + réponse."""
+        return math.ceil(tokens_prompt * (1 + self.marge)) + num_predict
+
+    def palier_minimal(self, besoin: int) -> int:
+        """Plus petit palier qui contient `besoin` (le plus grand si aucun ne suffit)."""
+        return next((palier for palier in self.paliers if palier >= besoin), self.paliers[-1])
+
+    def initial(self) -> int:
+        """Palier à précharger : celui déjà chargé, sinon le plus petit."""
+        with self._lock:
+            if self.charge is None:
+                self._charger(self.paliers[0])
+            return self.charge
+
+    def choisir(self, tokens_prompt: int, num_predict: int = LLM_NUM_PREDICT) -> int:
+        """Retourne le num_ctx de la requête et met à jour le palier chargé."""
+        besoin = self.besoin(tokens_prompt, num_predict)
+        minimal = self.palier_minimal(besoin)
+        with self._lock:
+            if besoin > self.paliers[-1]:
+                self.depassements += 1
+            if self.charge is None or minimal > self.charge:
+                self._charger(minimal)
+            elif minimal < self.charge:
+                self._sous_utilisation += 1
+                self._besoin_max = max(self._besoin_max, minimal)
+                if self._sous_utilisation >= self.descente_apres:
+                    self._charger(self._besoin_max)
+            else:
+                self._sous_utilisation = 0
+                self._besoin_max = 0
+            self.requetes[self.charge] += 1
+            return self.charge
+
+    def _charger(self, palier: int) -> None:
+        """Bascule sur `palier` (Ollama rechargera le modèle à la prochaine requête)."""
+        self.charge = palier
+        self.chargements[palier] += 1
+        self._sous_utilisation = 0
+        self._besoin_max = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.charge,
+                "num_predict": LLM_NUM_PREDICT,
+                "buckets": {
+                    str(palier): {"requests": self.requetes[palier], "loads": self.chargements[palier]}
+                    for palier in self.paliers
+                },
+                "loads": sum(self.chargements.values()),
+                "oversized": self.depassements,
+            }
+
+
+PALIERS_CONTEXTE = PaliersContexte()
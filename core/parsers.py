@@ -1,12 +1,35 @@
 """
 core/parsers.py — Parsers multi-format : PDF, DOCX, TXT/MD, CSV.
 
-Chaque parser retourne une liste de dicts : {"texte": str, "source": str, "page": int}
+Chaque parser produit des ParsedPage au fil de la lecture (générateur) :
+un PDF de plusieurs milliers de pages n'est jamais chargé en entier.
+
+Les gros PDF sont convertis par plages de pages dans un pool de processus,
+puis restitués dans l'ordre des pages. Les pages scannées (texte trop pauvre)
+passent par l'OCR (core.ocr).
+
+Chaque parser accepte aussi le contenu du fichier en mémoire (`contenu`),
+pour indexer des entrées d'archive sans les extraire sur disque.
 """
 
+import io
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
 
+from core.ocr import CONTEXTE_POOL, PoolOCR, ocr_pages, texte_insuffisant
+
+# Nombre de pages PDF converties par appel à pymupdf4llm
+PDF_PAGES_PAR_LOT = int(os.environ.get("PDF_PAGES_PER_BATCH", "16"))
+# Conversion parallèle : nombre de processus et seuil de pages (1 worker = désactivée)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLELE_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "64"))
+
 
 @dataclass
 class ParsedPage:
@@ -30,10 +53,28 @@ def extensions_supportees() -> list[str]:
     return list(_EXTENSIONS.keys())
 
 
-def parser_document(chemin: Path) -> list[ParsedPage]:
+def parser_document(chemin: Path, contenu: bytes | None = None) -> list[ParsedPage]:
     """
     Factory : parse un document selon son extension.
-    Retourne une liste de ParsedPage.
+    Retourne une liste de ParsedPage (cf. iterer_pages pour une lecture paresseuse).
+    """
+    return list(iterer_pages(chemin, contenu))
+
+
+def compter_pages(chemin: Path, contenu: bytes | None = None) -> int:
+    """Nombre de pages d'un document (PDF : pages du fichier ; autres formats : 1)."""
+    chemin = Path(chemin)
+    if chemin.suffix.lower() != ".pdf":
+        return 1
+    with _ouvrir_pdf(chemin, contenu) as doc:
+        return doc.page_count
+
+
+def iterer_pages(chemin: Path, contenu: bytes | None = None) -> Iterator[ParsedPage]:
+    """
+    Parse un document selon son extension et produit ses pages une à une
+    (PDF : toutes les pages, celles sans texte avec un texte vide).
+    `contenu` : octets du fichier déjà en mémoire (`chemin` ne sert alors qu'au nom).
     """
     chemin = Path(chemin)
     ext = chemin.suffix.lower()
@@ -45,85 +86,174 @@ def parser_document(chemin: Path) -> list[ParsedPage]:
         )
 
     parser_fn = globals()[_EXTENSIONS[ext]]
-    return parser_fn(chemin)
+    return parser_fn(chemin, contenu)
 
 
 # --- Parsers spécifiques ---
 
 
-def _parser_pdf(chemin: Path) -> list[ParsedPage]:
+def _ouvrir_pdf(chemin: Path, contenu: bytes | None = None):
+    import pymupdf
+
+    if contenu is not None:
+        return pymupdf.open(stream=contenu, filetype="pdf")
+    return pymupdf.open(str(chemin))
+
+
+def _parser_pdf(chemin: Path, contenu: bytes | None = None) -> Iterator[ParsedPage]:
     """Extraction PDF via PyMuPDF4LLM — meilleure qualité que PyPDF2.
 
-    Retourne le texte en markdown (tableaux, titres, listes préservés).
-    """
-    import pymupdf4llm
+    Produit le texte en markdown (tableaux, titres, listes préservés),
+    converti par lots de PDF_PAGES_PAR_LOT pages, en parallèle au-delà de
+    PDF_PARALLELE_MIN_PAGES pages. Les pages sans texte exploitable sont
+    complétées par OCR. Un PDF en mémoire est toujours converti dans le
+    processus courant.
+
+    Chaque page du fichier est produite, même restée sans texte (texte
+    vide) : le nombre de pages lues suit page_count (cf. compter_pages).
 
-    pages = []
+    Un fichier illisible ne produit aucune page ; une erreur survenue après
+    l'ouverture (lot de pages en échec) est propagée : un document tronqué ne
+    doit pas être enregistré comme indexé.
+    """
     try:
-        pages_md = pymupdf4llm.to_markdown(str(chemin), page_chunks=True)
+        doc = _ouvrir_pdf(chemin, contenu)
     except Exception as e:
         print(f"  Impossible de lire {chemin.name} : {e}")
-        return pages
+        return
+
+    with doc, PoolOCR() as pool_ocr:
+        plages = [
+            list(range(debut, min(debut + PDF_PAGES_PAR_LOT, doc.page_count)))
+            for debut in range(0, doc.page_count, PDF_PAGES_PAR_LOT)
+        ]
+        if contenu is None and _conversion_parallele(doc.page_count):
+            lots = _convertir_en_parallele(chemin, plages)
+        else:
+            lots = (_convertir_pages(doc, numeros) for numeros in plages)
+
+        for lot in lots:
+            for num_page, texte in _completer_par_ocr(doc, lot, pool_ocr):
+                yield ParsedPage(texte=texte, source=chemin.name, page=num_page)
+
+
+def _completer_par_ocr(doc, lot: list[tuple[int, str]], pool_ocr: PoolOCR) -> list[tuple[int, str]]:
+    """Remplace le texte des pages trop pauvres par leur OCR, s'il est plus riche."""
+    textes_ocr = ocr_pages(
+        doc, [num_page - 1 for num_page, texte in lot if texte_insuffisant(texte)], pool_ocr
+    )
+    if not textes_ocr:
+        return lot
+    complete = []
+    for num_page, texte in lot:
+        texte_ocr = textes_ocr.get(num_page - 1, "")
+        if sum(c.isalnum() for c in texte_ocr) > sum(c.isalnum() for c in texte):
+            texte = texte_ocr
+        complete.append((num_page, texte))
+    return complete
+
+
+def _conversion_parallele(nb_pages: int) -> bool:
+    """
+    Conversion parallèle pour les gros PDF, sauf dans un processus enfant
+    (pool de `ingest.py --workers`) : pas de pool imbriqué.
+    """
+    return (
+        PDF_WORKERS > 1
+        and nb_pages >= PDF_PARALLELE_MIN_PAGES
+        and multiprocessing.parent_process() is None
+    )
+
+
+def _convertir_pages(doc, numeros: list[int]) -> list[tuple[int, str]]:
+    """Convertit des pages (index 0-based) en markdown : [(numéro de page, texte)]."""
+    import pymupdf4llm
 
-    for page_data in pages_md:
-        texte = page_data.get("text", "")
-        num_page = page_data.get("metadata", {}).get("page", 1)
-        # pymupdf4llm utilise un index 0-based pour les pages
-        num_page = num_page + 1 if isinstance(num_page, int) else 1
+    pages_md = pymupdf4llm.to_markdown(doc, pages=numeros, page_chunks=True)
+    resultat = []
+    for numero, page_data in zip(numeros, pages_md):
+        # page_number est 1-based ; à défaut, position dans le lot
+        num_page = page_data.get("metadata", {}).get("page_number") or numero + 1
+        resultat.append((num_page, page_data.get("text", "").strip()))
+    return resultat
 
-        if texte.strip():
-            pages.append(ParsedPage(
-                texte=texte.strip(),
-                source=chemin.name,
-                page=num_page,
-            ))
 
-    return pages
+def _convertir_plage(chemin: str, numeros: list[int]) -> list[tuple[int, str]]:
+    """Convertit une plage de pages d'un PDF (exécuté dans un processus du pool)."""
+    import pymupdf
+
+    with pymupdf.open(chemin) as doc:
+        return _convertir_pages(doc, numeros)
+
+
+def _convertir_en_parallele(chemin: Path, plages: list[list[int]]) -> Iterator[list[tuple[int, str]]]:
+    """
+    Convertit les plages dans un pool de PDF_WORKERS processus et les produit
+    dans l'ordre des pages. Au plus 2 × PDF_WORKERS plages sont en cours :
+    la mémoire reste bornée même si le consommateur est lent.
+    """
+    pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=CONTEXTE_POOL)
+    try:
+        restantes = iter(plages)
+        en_cours = deque(
+            pool.submit(_convertir_plage, str(chemin), numeros)
+            for numeros in islice(restantes, 2 * PDF_WORKERS)
+        )
+        while en_cours:
+            lot = en_cours.popleft().result()
+            for numeros in islice(restantes, 1):
+                en_cours.append(pool.submit(_convertir_plage, str(chemin), numeros))
+            yield lot
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
-def _parser_docx(chemin: Path) -> list[ParsedPage]:
+def _parser_docx(chemin: Path, contenu: bytes | None = None) -> Iterator[ParsedPage]:
     """Extraction DOCX via python-docx (paragraphes)."""
     from docx import Document
 
-    doc = Document(str(chemin))
+    doc = Document(io.BytesIO(contenu) if contenu is not None else str(chemin))
     texte_complet = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
 
     if not texte_complet.strip():
-        return []
+        return
 
-    return [ParsedPage(
+    yield ParsedPage(
         texte=texte_complet.strip(),
         source=chemin.name,
         page=1,
-    )]
+    )
 
 
-def _parser_texte(chemin: Path) -> list[ParsedPage]:
+def _parser_texte(chemin: Path, contenu: bytes | None = None) -> Iterator[ParsedPage]:
     """Lecture simple de fichiers TXT/MD."""
-    texte = chemin.read_text(encoding="utf-8", errors="ignore")
+    if contenu is not None:
+        texte = contenu.decode("utf-8", errors="ignore")
+    else:
+        texte = chemin.read_text(encoding="utf-8", errors="ignore")
 
     if not texte.strip():
-        return []
+        return
 
-    return [ParsedPage(
+    yield ParsedPage(
         texte=texte.strip(),
         source=chemin.name,
         page=1,
-    )]
+    )
 
 
-def _parser_csv(chemin: Path) -> list[ParsedPage]:
+def _parser_csv(chemin: Path, contenu: bytes | None = None) -> Iterator[ParsedPage]:
     """Conversion CSV en texte via pandas."""
     import pandas as pd
 
-    df = pd.read_csv(str(chemin))
+    df = pd.read_csv(io.BytesIO(contenu) if contenu is not None else str(chemin))
     texte = df.to_string(index=False)
 
     if not texte.strip():
-        return []
+        return
 
-    return [ParsedPage(
+    yield ParsedPage(
         texte=texte.strip(),
         source=chemin.name,
         page=1,
-    )]
+    )
@@ -0,0 +1,108 @@
+"""
+core/query_cache.py — Cache LRU des embeddings de questions.
+
+Les mêmes questions reviennent toute la journée ; le cache évite un aller-retour
+Ollama pour ré-embedder une question déjà vue. Clé : (modèle d'embedding,
+question normalisée). Entrées en mémoire avec TTL ; persistance optionnelle
+dans le cache disque des embeddings (core.embedding_cache) pour survivre
+aux redémarrages.
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Callable
+
+from core.embedding_cache import CacheEmbeddings, hash_texte
+
+QUERY_CACHE_TAILLE = int(os.environ.get("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "86400"))
+QUERY_CACHE_PERSIST = os.environ.get("QUERY_CACHE_PERSIST", "0") == "1"
+
+
+def normaliser_question(question: str) -> str:
+    """Normalise une question : casse, espaces, ponctuation finale, forme Unicode."""
+    texte = unicodedata.normalize("NFKC", question).lower()
+    texte = re.sub(r"\s+", " ", texte).strip()
+    return texte.rstrip(" ?!.")
+
+
+class CacheRequetes:
+    """Cache LRU (modèle, question normalisée) -> vecteur, avec TTL et statistiques."""
+
+    def __init__(
+        self,
+        taille_max: int = QUERY_CACHE_TAILLE,
+        ttl: float = QUERY_CACHE_TTL,
+        persistance: CacheEmbeddings | None = None,
+    ):
+        self.taille_max = max(1, taille_max)
+        self.ttl = ttl
+        self.persistance = persistance
+        self._entrees: OrderedDict[tuple[str, str], tuple[list[float], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtenir(
+        self, modele: str, question: str, calculer: Callable[[], list[float]]
+    ) -> list[float]:
+        """Retourne le vecteur de `question`, calculé via `calculer()` si absent ou expiré."""
+        cle = (modele, normaliser_question(question))
+        maintenant = time.monotonic()
+
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree and maintenant - entree[1] < self.ttl:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return entree[0]
+
+        vecteur = self._lire_persistance(cle)
+        if vecteur is None:
+            vecteur = calculer()
+            self._ecrire_persistance(cle, vecteur)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._entrees[cle] = (vecteur, maintenant)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+        return vecteur
+
+    def _lire_persistance(self, cle: tuple[str, str]) -> list[float] | None:
+        if self.persistance is None:
+            return None
+        h = hash_texte(cle[1])
+        return self.persistance.lire(f"query:{cle[0]}", [h]).get(h)
+
+    def _ecrire_persistance(self, cle: tuple[str, str], vecteur: list[float]) -> None:
+        if self.persistance is not None:
+            self.persistance.ecrire(f"query:{cle[0]}", [hash_texte(cle[1])], [vecteur])
+
+    def vider(self) -> None:
+        """Vide le cache mémoire."""
+        with self._lock:
+            self._entrees.clear()
+
+    def stats(self) -> dict:
+        """Compteurs : hits, misses, taux de hit, nombre d'entrées."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entrees),
+                "max_entries": self.taille_max,
+                "ttl_seconds": self.ttl,
+                "persisted": self.persistance is not None,
+            }
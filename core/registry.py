@@ -0,0 +1,104 @@
+"""
+core/registry.py — Registre process-wide des handles ouverts (Chroma, RAGEngine).
+
+Ouvrir un client Chroma persistant (et construire un RAGEngine) à chaque
+question coûte de la latence à chaque tour. Le registre garde ces handles
+chauds, en borne le nombre (éviction LRU), ferme ceux inactifs depuis trop
+longtemps et permet d'invalider tout ce qui concerne une collection
+(suppression / création).
+
+Les clés sont des tuples dont les deux premiers éléments après le type
+identifient la collection : (type, base_dir, nom_collection, ...).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+MAX_HANDLES_OUVERTS = int(os.environ.get("MAX_HANDLES_OUVERTS", "16"))
+HANDLE_TTL_INACTIVITE = float(os.environ.get("HANDLE_TTL_INACTIVITE", "1800"))
+
+
+class RegistreHandles:
+    """Cache LRU thread-safe de handles, avec expiration sur inactivité."""
+
+    def __init__(self, capacite: int = MAX_HANDLES_OUVERTS, ttl: float = HANDLE_TTL_INACTIVITE):
+        self.capacite = max(1, capacite)
+        self.ttl = ttl
+        self._handles: OrderedDict[tuple, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._creations: dict[tuple, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obtenir(self, cle: tuple, fabrique: Callable[[], Any]) -> Any:
+        """Retourne le handle de `cle`, en le créant via `fabrique()` si absent."""
+        with self._lock:
+            self._expirer()
+            if cle in self._handles:
+                handle, _ = self._handles.pop(cle)
+                self._handles[cle] = (handle, time.monotonic())
+                self.hits += 1
+                return handle
+            self.misses += 1
+            creation = self._creations.setdefault(cle, threading.Lock())
+
+        # Création hors verrou global (ouvrir un handle peut être lent), mais une
+        # seule à la fois par clé : deux clients Chroma ouverts en parallèle sur
+        # le même dossier neuf se gênent
+        with creation:
+            try:
+                with self._lock:
+                    if cle in self._handles:
+                        # Créé entre-temps par un autre thread
+                        return self._handles[cle][0]
+                handle = fabrique()
+
+                with self._lock:
+                    self._handles[cle] = (handle, time.monotonic())
+                    while len(self._handles) > self.capacite:
+                        self._handles.popitem(last=False)
+                        self.evictions += 1
+            finally:
+                # Y compris si fabrique() échoue (collection absente...) : pas de fuite
+                with self._lock:
+                    if self._creations.get(cle) is creation:
+                        del self._creations[cle]
+        return handle
+
+    def invalider_collection(self, base_dir: str, nom: str) -> None:
+        """Retire tous les handles d'une collection."""
+        with self._lock:
+            for cle in [c for c in self._handles if c[1:3] == (base_dir, nom)]:
+                del self._handles[cle]
+
+    def vider(self) -> None:
+        """Retire tous les handles."""
+        with self._lock:
+            self._handles.clear()
+
+    def _expirer(self) -> None:
+        """Retire les handles inactifs depuis plus de `ttl` secondes (sous verrou)."""
+        limite = time.monotonic() - self.ttl
+        for cle in [c for c, (_, acces) in self._handles.items() if acces < limite]:
+            del self._handles[cle]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Compteurs du registre."""
+        with self._lock:
+            return {
+                "open": len(self._handles),
+                "capacity": self.capacite,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Registre partagé par tout le processus
+REGISTRE = RegistreHandles()
@@ -1,27 +1,75 @@
 """
 core/search.py — RAGEngine : recherche similarité + génération Ollama streaming.
+
+La recherche est hybride : résultats vectoriels (ChromaDB) et lexicaux
+(index BM25 de la collection, core.bm25) fusionnés par reciprocal rank fusion.
+
+Les questions sans historique passent par le cache sémantique des réponses
+(core.answer_cache) : une question proche d'une question déjà traitée sur la
+même version de la collection rejoue la réponse précédente.
+
+Le prompt est construit sous budget de tokens (core.contexte) : historique
+borné, chunks retenus par pertinence, chunks voisins d'une même page fusionnés.
+La génération passe par /api/chat : les consignes fixes forment le message
+système, en tête de chaque requête, pour qu'Ollama réutilise leur prefill.
+Sa fenêtre num_ctx est choisie parmi des paliers (core.paliers).
 """
 
 import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
 import requests
 
-from core.embeddings import OLLAMA_MODEL, OLLAMA_API_GENERATE
+from core.answer_cache import ANSWER_CACHE_ACTIF, CACHE_REPONSES, rejouer_reponse
+from core.embeddings import (
+    EMBEDDING_MODEL,
+    OLLAMA_API_CHAT,
+    OLLAMA_MODEL,
+    get_cache_embeddings,
+    keep_alive_ollama,
+)
 from core.collection_manager import CollectionManager
+from core.contexte import CONTEXT_MAX_CHUNKS, emballer
+from core.paliers import CONTEXT_BUCKETS, LLM_NUM_PREDICT, PALIERS_CONTEXTE
+from core.query_cache import QUERY_CACHE_PERSIST, CacheRequetes
+from core.registry import REGISTRE
+from core.timings import MesuresEtapes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelePrompt:
+    """
+    Prompt en deux messages : consignes fixes (message système, préfixe
+    identique d'une question à l'autre, réutilisé par le cache de prompt
+    d'Ollama) et message utilisateur ({context}, {history_section}, {question}).
+    """
+
+    systeme: str
+    utilisateur: str
+
 
 # Prompt par défaut générique
-PROMPT_DEFAUT = """Tu es un assistant intelligent. Utilise le contexte ci-dessous pour répondre à la question.
+PROMPT_DEFAUT = ModelePrompt(
+    systeme="""Tu es un assistant intelligent. Utilise le contexte fourni pour répondre à la question.
 
-Contexte :
+Réponds de manière précise et concise. Si l'information n'est pas dans le contexte, dis-le clairement.""",
+    utilisateur="""Contexte :
 {context}
 {history_section}
-Question actuelle : {question}
-
-Réponds de manière précise et concise. Si l'information n'est pas dans le contexte, dis-le clairement."""
+Question actuelle : {question}""",
+)
 
 # Prompt spécialisé VLM Robotics
-PROMPT_VLM_ROBOTICS = """Tu es un assistant commercial expert pour VLM Robotics, constructeur de machines-outils robotisées pour la fabrication hybride XXL (Machine Tool Builder for XXL Hybrid Manufacturing).
+PROMPT_VLM_ROBOTICS = ModelePrompt(
+    systeme="""Tu es un assistant commercial expert pour VLM Robotics, constructeur de machines-outils robotisées pour la fabrication hybride XXL (Machine Tool Builder for XXL Hybrid Manufacturing).
 
 Ton expertise couvre :
 - La gamme complète : COMPAQT (XL, entrée de gamme), SOLO (XXL mono-robot), GEMINI (XXL bi-robot, la plus avancée), HYMANCO (unité mobile containerisée)
@@ -30,17 +78,17 @@ Ton expertise couvre :
 - Le positionnement hybride : les machines combinent plusieurs procédés sur une même plateforme (ex : fabrication additive + usinage + contrôle)
 - Les secteurs : ASD, Ferroviaire, Naval, Énergie, MRO, Fonderie, Outillage, Formation, Recherche, Offshore
 
-Contexte disponible :
-{context}
-{history_section}
-Question client : {question}
-
 Consignes de réponse :
 - Réponds en français, de manière professionnelle et structurée.
 - Cite toujours la source (nom de la machine, référence brochure, numéro de page).
 - Si le contexte permet de recommander une machine spécifique, explique pourquoi elle convient au besoin.
 - Si l'information n'est pas dans le contexte fourni, dis-le clairement : « Je n'ai pas trouvé cette information dans la documentation disponible. »
-- Ne jamais inventer de spécifications techniques."""
+- Ne jamais inventer de spécifications techniques.""",
+    utilisateur="""Contexte disponible :
+{context}
+{history_section}
+Question client : {question}""",
+)
 
 # Prompts nommés disponibles
 PROMPTS = {
@@ -50,6 +98,44 @@ PROMPTS = {
 
 NB_CHUNKS_RECHERCHE = 4
 
+# Recherche hybride : candidats par méthode, constante de la fusion RRF
+HYBRID_SEARCH = os.environ.get("HYBRID_SEARCH", "1") != "0"
+HYBRID_FETCH_K = int(os.environ.get("HYBRID_FETCH_K", "20"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+
+# Diversification MMR : 1.0 = pertinence seule (MMR désactivé), 0.0 = diversité seule
+MMR_LAMBDA = float(os.environ.get("MMR_LAMBDA", "0.7"))
+
+# Durées par étape de recherche, cumulées pour l'API de métriques
+MESURES_RECHERCHE = MesuresEtapes()
+
+
+class StatsAnnulations:
+    """Générations interrompues avant la fin (lecteur parti) et tokens générés pour rien."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.annulees = 0
+        self.tokens_perdus = 0
+
+    def enregistrer(self, tokens: int) -> None:
+        with self._lock:
+            self.annulees += 1
+            self.tokens_perdus += tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cancelled": self.annulees, "wasted_tokens": self.tokens_perdus}
+
+
+# Générations abandonnées par leur lecteur (API et Streamlit), pour l'API de métriques
+GENERATIONS_ANNULEES = StatsAnnulations()
+
+# Cache des embeddings de questions, partagé par tous les RAGEngine du processus
+CACHE_REQUETES = CacheRequetes(
+    persistance=get_cache_embeddings() if QUERY_CACHE_PERSIST else None,
+)
+
 
 def _charger_prompts_json() -> dict:
     """Charge les prompts supplémentaires depuis prompts.json s'il existe."""
@@ -62,13 +148,36 @@ def _charger_prompts_json() -> dict:
     return {}
 
 
-def get_prompt(nom: str) -> str:
-    """Retourne un prompt par son nom (built-in ou depuis prompts.json)."""
+def decouper_template(template: str) -> ModelePrompt:
+    """
+    Découpe un template d'un seul tenant (ancien format de prompts.json) :
+    les paragraphes qui précèdent celui du premier champ ({context},
+    {history_section}, {question}) deviennent le message système.
+    """
+    positions = [
+        template.find(champ) for champ in ("{context}", "{history_section}", "{question}")
+        if champ in template
+    ]
+    debut = min(positions, default=len(template))
+    # Le message utilisateur commence au paragraphe du premier champ (son intitulé compris)
+    debut = template.rfind("\n\n", 0, debut) + 1
+    return ModelePrompt(systeme=template[:debut].strip(), utilisateur=template[debut:].lstrip("\n"))
+
+
+def get_prompt(nom: str) -> ModelePrompt:
+    """
+    Retourne un prompt par son nom (built-in ou depuis prompts.json).
+    Dans prompts.json, un prompt est {"system": ..., "user": ...} ou un
+    template d'un seul tenant (découpé par decouper_template).
+    """
     if nom in PROMPTS:
         return PROMPTS[nom]
     customs = _charger_prompts_json()
     if nom in customs:
-        return customs[nom]
+        custom = customs[nom]
+        if isinstance(custom, dict):
+            return ModelePrompt(systeme=custom.get("system", ""), utilisateur=custom["user"])
+        return decouper_template(custom)
     return PROMPTS["defaut"]
 
 
@@ -79,76 +188,259 @@ class RAGEngine:
                  collection_manager: CollectionManager | None = None):
         self.cm = collection_manager or CollectionManager()
         self.nom_collection = nom_collection
-        self.prompt_template = get_prompt(prompt_name)
+        self.prompt_name = prompt_name
+        self.modele_prompt = get_prompt(prompt_name)
         self.db = self.cm.get_collection(nom_collection)
+        self.index_bm25 = self.cm.index_bm25(nom_collection)
+        if HYBRID_SEARCH and not self.index_bm25.nb_chunks() and self.db._collection.count():
+            # Collection indexée avant l'index BM25 : construction unique
+            from core.document_manager import DocumentManager
+            DocumentManager(self.cm).reconstruire_index_bm25(nom_collection)
+
+    def vecteur_question(self, question: str) -> list[float]:
+        """Embedding de la question (via le cache des questions)."""
+        return CACHE_REQUETES.obtenir(
+            EMBEDDING_MODEL, question, lambda: self.db.embeddings.embed_query(question)
+        )
 
-    def rechercher(self, question: str, k: int = NB_CHUNKS_RECHERCHE) -> tuple[str, list[dict]]:
+    def rechercher(self, question: str, k: int = NB_CHUNKS_RECHERCHE,
+                   mmr_lambda: float | None = None, fetch_k: int | None = None) -> tuple[str, list[dict]]:
         """
         Recherche les chunks les plus pertinents.
         Retourne (contexte_texte, liste_sources).
         """
-        resultats = self.db.similarity_search_with_score(question, k=k)
-
         contexte_parts = []
         sources = []
         sources_vues = set()
 
-        for doc, score in resultats:
-            contexte_parts.append(doc.page_content)
-            cle_source = f"{doc.metadata.get('source', 'Inconnu')} - p.{doc.metadata.get('page', '?')}"
+        for texte, metadata, score in self.rechercher_chunks(
+            question, k=k, mmr_lambda=mmr_lambda, fetch_k=fetch_k
+        ):
+            contexte_parts.append(texte)
+            cle_source = f"{metadata.get('source', 'Inconnu')} - p.{metadata.get('page', '?')}"
             if cle_source not in sources_vues:
                 sources_vues.add(cle_source)
                 sources.append({
-                    "fichier": doc.metadata.get("source", "Inconnu"),
-                    "page": doc.metadata.get("page", "?"),
+                    "fichier": metadata.get("source", "Inconnu"),
+                    "page": metadata.get("page", "?"),
                     "score": round(score, 3),
                 })
 
         contexte = "\n\n---\n\n".join(contexte_parts)
         return contexte, sources
 
-    def generer_avec_sources(self, question: str, stream: bool = True, history: str = "") -> dict:
+    def rechercher_chunks(
+        self,
+        question: str,
+        k: int = NB_CHUNKS_RECHERCHE,
+        mmr_lambda: float | None = None,
+        fetch_k: int | None = None,
+    ) -> list[tuple[str, dict, float]]:
         """
-        Recherche + génération LLM.
+        Recherche hybride vecteur + BM25 (fusion RRF), puis re-ranking MMR
+        pour diversifier les k chunks retenus.
 
-        Retourne {"reponse": generator|str, "sources": list[dict]}
+        `mmr_lambda` / `fetch_k` : surcharge par requête ; sinon la config
+        de la collection (config.json), sinon MMR_LAMBDA / HYBRID_FETCH_K.
+
+        Retourne [(texte, metadata, distance)] dans l'ordre de sélection.
         """
-        contexte, sources = self.rechercher(question)
+        config = self.cm.config_collection(self.nom_collection)
+        if mmr_lambda is None:
+            mmr_lambda = config.get("mmr_lambda", MMR_LAMBDA)
+        fetch_k = fetch_k or config.get("fetch_k") or HYBRID_FETCH_K
+        avec_mmr = mmr_lambda < 1.0
+        nb_candidats = max(k, fetch_k) if (HYBRID_SEARCH or avec_mmr) else k
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if avec_mmr else [])
+
+        durees = {}
+        t0 = time.perf_counter()
+        vecteur = self.vecteur_question(question)
+        t1 = time.perf_counter()
+        durees["embedding"] = t1 - t0
+
+        chunks: dict[str, tuple[str, dict, float]] = {}
+        vecteurs: dict[str, np.ndarray] = {}
+
+        def _collecter(resultats) -> list[str]:
+            ids = resultats["ids"][0]
+            for i, cid in enumerate(ids):
+                chunks[cid] = (
+                    resultats["documents"][0][i],
+                    resultats["metadatas"][0][i] or {},
+                    resultats["distances"][0][i],
+                )
+                if avec_mmr:
+                    vecteurs[cid] = resultats["embeddings"][0][i]
+            return ids
+
+        ids_vecteur = _collecter(self.db._collection.query(
+            query_embeddings=[vecteur], n_results=nb_candidats, include=include,
+        ))
+        t2 = time.perf_counter()
+        durees["vector"] = t2 - t1
+
+        classements = [ids_vecteur]
+        if HYBRID_SEARCH:
+            classements.append([cid for cid, _ in self.index_bm25.rechercher(question, nb_candidats)])
+            t3 = time.perf_counter()
+            durees["bm25"] = t3 - t2
+            t2 = t3
+
+        pertinence = scores_rrf(classements)
+        candidats = sorted(pertinence, key=pertinence.get, reverse=True)[:nb_candidats]
+        manquants = [cid for cid in candidats if cid not in chunks]
+        if manquants:
+            # Chunks trouvés par BM25 seul : distance (et vecteur) lus dans Chroma
+            _collecter(self.db._collection.query(
+                query_embeddings=[vecteur], ids=manquants, n_results=len(manquants), include=include,
+            ))
+            candidats = [cid for cid in candidats if cid in chunks]
+        t3 = time.perf_counter()
+        durees["fusion"] = t3 - t2
+
+        if avec_mmr and len(candidats) > k:
+            selection = selection_mmr(
+                np.asarray([pertinence[cid] for cid in candidats]),
+                np.asarray([vecteurs[cid] for cid in candidats], dtype=np.float32),
+                k,
+                mmr_lambda,
+            )
+            ids = [candidats[i] for i in selection]
+            durees["mmr"] = time.perf_counter() - t3
+        else:
+            ids = candidats[:k]
+
+        MESURES_RECHERCHE.enregistrer(durees)
+        logger.debug(
+            "Recherche %s : %s", self.nom_collection,
+            ", ".join(f"{nom}={d * 1000:.1f}ms" for nom, d in durees.items()),
+        )
+        return [chunks[cid] for cid in ids]
 
-        # Format history section if provided
-        history_section = ""
-        if history:
-            history_section = f"\nHistorique de conversation:\n{history}\n"
+    def preparer_prompt(self, question: str, history: str = "",
+                        mmr_lambda: float | None = None,
+                        fetch_k: int | None = None) -> tuple[str, list[dict], dict]:
+        """
+        Recherche + construction du message utilisateur sous budget de tokens,
+        sans appel au LLM. Le message système est `self.prompt_systeme`.
 
-        prompt = self.prompt_template.format(
-            context=contexte,
-            question=question,
-            history_section=history_section
+        Retourne (prompt, liste_sources, tokens) ; `tokens` décompte les tokens
+        estimés des deux messages ({"system", "history", "context", "question",
+        "total", "budget"}).
+        """
+        chunks = self.rechercher_chunks(
+            question, k=CONTEXT_MAX_CHUNKS, mmr_lambda=mmr_lambda, fetch_k=fetch_k
         )
+        emballe = emballer(
+            self.modele_prompt.utilisateur, question, chunks, historique=history,
+            systeme=self.prompt_systeme,
+        )
+        logger.debug(
+            "Prompt %s : %s tokens estimés (%s), chunks %s", self.nom_collection,
+            emballe.tokens["total"], emballe.tokens, emballe.chunks,
+        )
+        return emballe.prompt, emballe.sources, emballe.tokens
+
+    @property
+    def prompt_systeme(self) -> str:
+        """Message système (consignes fixes) du prompt de ce moteur."""
+        return self.modele_prompt.systeme
+
+    def _portee_cache(self, mmr_lambda: float | None, fetch_k: int | None) -> tuple:
+        return (self.nom_collection, self.prompt_name, OLLAMA_MODEL, mmr_lambda, fetch_k)
 
-        reponse = self._appeler_ollama(prompt, stream=stream)
-        return {"reponse": reponse, "sources": sources}
+    def reponse_en_cache(self, question: str, mmr_lambda: float | None = None,
+                         fetch_k: int | None = None) -> dict | None:
+        """
+        Cherche une réponse déjà générée pour une question proche, avec les
+        mêmes réglages de recherche (`mmr_lambda` / `fetch_k`, cf. preparer_prompt).
+        Retourne {"reponse": str, "sources": list[dict], ...} ou None.
+        """
+        if not ANSWER_CACHE_ACTIF:
+            return None
+        return CACHE_REPONSES.chercher(
+            self._portee_cache(mmr_lambda, fetch_k),
+            self.vecteur_question(question),
+            self.cm.version_collection(self.nom_collection),
+        )
+
+    def memoriser_reponse(self, question: str, reponse: str, sources: list[dict],
+                          version: int | None = None, mmr_lambda: float | None = None,
+                          fetch_k: int | None = None) -> None:
+        """
+        Mémorise une réponse complète dans le cache sémantique.
+        `version` : version de la collection lue avant la recherche ;
+        `mmr_lambda` / `fetch_k` : réglages de recherche de la requête.
+        """
+        if not ANSWER_CACHE_ACTIF:
+            return
+        if version is None:
+            version = self.cm.version_collection(self.nom_collection)
+        CACHE_REPONSES.ajouter(
+            self._portee_cache(mmr_lambda, fetch_k), self.vecteur_question(question),
+            question, reponse, sources, version,
+        )
+
+    def generer_avec_sources(self, question: str, stream: bool = True, history: str = "") -> dict:
+        """
+        Recherche + génération LLM.
+
+        Retourne {"reponse": generator|str, "sources": list[dict], "cache": bool,
+        "tokens": dict|None} (tokens estimés du prompt, None pour une réponse en cache)
+        """
+        version = self.cm.version_collection(self.nom_collection)
+        if not history:
+            en_cache = self.reponse_en_cache(question)
+            if en_cache:
+                reponse = rejouer_reponse(en_cache["reponse"]) if stream else en_cache["reponse"]
+                return {
+                    "reponse": reponse, "sources": en_cache["sources"], "cache": True, "tokens": None,
+                }
+
+        prompt, sources, tokens = self.preparer_prompt(question, history=history)
+
+        def _memoriser(texte: str) -> None:
+            if not history:
+                self.memoriser_reponse(question, texte, sources, version=version)
+
+        reponse = self._appeler_ollama(
+            prompt, stream=stream, on_complete=_memoriser, systeme=self.prompt_systeme,
+            num_ctx=PALIERS_CONTEXTE.choisir(tokens["total"]),
+        )
+        return {"reponse": reponse, "sources": sources, "cache": False, "tokens": tokens}
 
     @staticmethod
-    def _appeler_ollama(prompt: str, stream: bool = True):
+    def _appeler_ollama(prompt: str, stream: bool = True, on_complete=None, systeme: str = "",
+                        num_ctx: int | None = None):
         """
-        Appelle l'API Ollama.
-        Si stream=True, retourne un générateur de tokens.
+        Appelle l'API chat d'Ollama : message système `systeme` (préfixe
+        stable, réutilisé entre les questions) puis message utilisateur `prompt`,
+        avec une fenêtre de `num_ctx` tokens (défaut : le plus grand palier).
+        Si stream=True, retourne un générateur de tokens : le fermer avant la
+        fin (close()) coupe la connexion, et Ollama arrête de générer.
         Si stream=False, retourne la réponse complète (str).
+        `on_complete(texte)` est appelé avec la réponse complète, uniquement
+        si la génération a abouti (ni erreur, ni flux abandonné).
         """
+        messages = [{"role": "user", "content": prompt}]
+        if systeme:
+            messages.insert(0, {"role": "system", "content": systeme})
         payload = {
             "model": OLLAMA_MODEL,
-            "prompt": prompt,
+            "messages": messages,
             "stream": stream,
+            "keep_alive": keep_alive_ollama(),
             "options": {
                 "temperature": 0.3,
-                "num_ctx": 4096,
+                "num_ctx": num_ctx or CONTEXT_BUCKETS[-1],
+                "num_predict": LLM_NUM_PREDICT,
             },
         }
 
         try:
             reponse = requests.post(
-                OLLAMA_API_GENERATE,
+                OLLAMA_API_CHAT,
                 json=payload,
                 stream=stream,
                 timeout=120,
@@ -178,16 +470,107 @@ class RAGEngine:
 
         if not stream:
             data = reponse.json()
-            return data.get("response", "")
+            texte = data.get("message", {}).get("content", "")
+            if on_complete:
+                on_complete(texte)
+            return texte
 
         def _stream_tokens():
-            for ligne in reponse.iter_lines():
-                if ligne:
-                    donnees = json.loads(ligne)
-                    token = donnees.get("response", "")
-                    if token:
-                        yield token
-                    if donnees.get("done", False):
-                        break
+            morceaux = []
+            termine = False
+            try:
+                for ligne in reponse.iter_lines():
+                    if ligne:
+                        donnees = json.loads(ligne)
+                        token = donnees.get("message", {}).get("content", "")
+                        if token:
+                            morceaux.append(token)
+                            yield token
+                        if donnees.get("done", False):
+                            termine = True
+                            if on_complete:
+                                on_complete("".join(morceaux))
+                            break
+            except GeneratorExit:
+                # Lecteur parti (onglet fermé, nouvelle question) : génération perdue
+                GENERATIONS_ANNULEES.enregistrer(len(morceaux))
+                raise
+            finally:
+                if not termine:
+                    reponse.close()
 
         return _stream_tokens()
+
+
+def scores_rrf(classements: list[list[str]], k: int = RRF_K) -> dict[str, float]:
+    """Reciprocal rank fusion : score(id) = somme des 1 / (k + rang)."""
+    scores: dict[str, float] = {}
+    for classement in classements:
+        for rang, cid in enumerate(classement, start=1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rang)
+    return scores
+
+
+def selection_mmr(pertinence: np.ndarray, vecteurs: np.ndarray, k: int, lambda_: float) -> list[int]:
+    """
+    Maximal marginal relevance vectorisée.
+
+    `pertinence` : score de chaque candidat (ici RRF, normalisé sur [0, 1]) ;
+    `vecteurs` : embeddings stockés des candidats (une ligne par candidat).
+    Retourne les indices des k candidats retenus, dans l'ordre de sélection.
+    """
+    pertinence = pertinence / pertinence.max() if pertinence.max() > 0 else pertinence
+    normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+    unitaires = vecteurs / np.where(normes == 0, 1, normes)
+    similarites = unitaires @ unitaires.T
+
+    selection = [int(np.argmax(pertinence))]
+    sim_max = similarites[selection[0]].copy()
+    disponibles = np.ones(len(pertinence), dtype=bool)
+    disponibles[selection[0]] = False
+
+    while len(selection) < min(k, len(pertinence)):
+        scores = lambda_ * pertinence - (1 - lambda_) * sim_max
+        scores[~disponibles] = -np.inf
+        choix = int(np.argmax(scores))
+        selection.append(choix)
+        disponibles[choix] = False
+        sim_max = np.maximum(sim_max, similarites[choix])
+    return selection
+
+
+def prechauffer_modele(timeout: float = 300) -> bool:
+    """
+    Charge le modèle de génération dans Ollama (requête chat sans message),
+    au palier de contexte initial, pour que la première question n'attende
+    pas son chargement. Retourne False si Ollama n'a pas pu le charger.
+    """
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": [],
+        "keep_alive": keep_alive_ollama(),
+        "options": {"num_ctx": PALIERS_CONTEXTE.initial()},
+    }
+    try:
+        reponse = requests.post(OLLAMA_API_CHAT, json=payload, timeout=timeout)
+        reponse.raise_for_status()
+        return True
+    except requests.RequestException as e:
+        logger.warning("Préchargement du modèle %s impossible : %s", OLLAMA_MODEL, e)
+        return False
+
+
+def get_engine(nom_collection: str, prompt_name: str = "defaut",
+               collection_manager: CollectionManager | None = None) -> RAGEngine:
+    """
+    Retourne un RAGEngine partagé (registre du processus) pour la collection.
+
+    Lève ValueError si la collection n'existe pas.
+    """
+    cm = collection_manager or CollectionManager()
+    if not cm.collection_existe(nom_collection):
+        raise ValueError(f"Collection '{nom_collection}' introuvable.")
+    return REGISTRE.obtenir(
+        cm.cle_registre("engine", nom_collection, prompt_name),
+        lambda: RAGEngine(nom_collection, prompt_name=prompt_name, collection_manager=cm),
+    )
@@ -0,0 +1,211 @@
+"""
+core/surveillance.py — Parcours récursif et surveillance d'un dossier de documents.
+
+Surveillance suit les fichiers indexables d'une arborescence et produit leurs
+changements (ajouts, modifications, suppressions) par lots : les événements
+rapprochés sont regroupés pendant WATCH_DEBOUNCE_MS. Les événements viennent
+de watchfiles (inotify, FSEvents...) s'il est installé ; sinon, ou avec
+WATCH_POLLING=1 (partages réseau), l'arborescence est scrutée toutes les
+WATCH_POLL_INTERVAL secondes en ne relevant que l'empreinte système des
+fichiers (taille, mtime, inode), sans les lire.
+
+Les documents sont identifiés par leur nom de fichier : quand plusieurs
+fichiers de l'arborescence portent le même nom, le premier (ordre des
+chemins) est indexé et les autres sont signalés comme homonymes.
+
+Dépendance optionnelle : watchfiles (sinon scrutation, avertissement unique).
+"""
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from core.parsers import extensions_supportees
+
+WATCH_DEBOUNCE_MS = int(os.environ.get("WATCH_DEBOUNCE_MS", "1000"))
+WATCH_POLL_INTERVAL = float(os.environ.get("WATCH_POLL_INTERVAL", "2"))
+WATCH_POLLING = os.environ.get("WATCH_POLLING", "0") == "1"
+
+
+@dataclass
+class Changements:
+    """Lot de changements : fichiers à (ré)indexer, documents à supprimer, homonymes ignorés."""
+
+    a_indexer: list[Path] = field(default_factory=list)
+    supprimes: list[str] = field(default_factory=list)
+    homonymes: list[Path] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.a_indexer or self.supprimes or self.homonymes)
+
+
+@lru_cache(maxsize=1)
+def watchfiles_disponible() -> bool:
+    """Vérifie (une fois) que watchfiles est installé."""
+    try:
+        import watchfiles  # noqa: F401
+
+        return True
+    except ImportError:
+        print("  watchfiles indisponible : surveillance par scrutation périodique")
+        return False
+
+
+def _parcourir(dossier: Path, recursif: bool) -> Iterator[os.DirEntry]:
+    """Fichiers indexables d'un dossier (dossiers et fichiers cachés exclus)."""
+    extensions = set(extensions_supportees())
+    try:
+        entrees = list(os.scandir(dossier))
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return
+    for entree in entrees:
+        if entree.name.startswith("."):
+            continue
+        if entree.is_dir(follow_symlinks=False):
+            if recursif:
+                yield from _parcourir(Path(entree.path), recursif)
+        elif entree.is_file() and Path(entree.name).suffix.lower() in extensions:
+            yield entree
+
+
+def lister_fichiers(dossier: Path, recursif: bool = False) -> list[Path]:
+    """Fichiers indexables d'un dossier (et de ses sous-dossiers si `recursif`), triés."""
+    return sorted(Path(entree.path) for entree in _parcourir(Path(dossier), recursif))
+
+
+def ecarter_homonymes(fichiers: list[Path]) -> tuple[list[Path], list[Path]]:
+    """Sépare le premier fichier de chaque nom (retenus) de ses homonymes."""
+    retenus: dict[str, Path] = {}
+    homonymes = []
+    for fichier in sorted(fichiers):
+        if retenus.setdefault(fichier.name, fichier) != fichier:
+            homonymes.append(fichier)
+    return sorted(retenus.values()), homonymes
+
+
+class Surveillance:
+    """Suit les fichiers indexables d'un dossier et produit leurs changements par lots."""
+
+    def __init__(self, dossier: Path, recursif: bool = True, scrutation: bool = WATCH_POLLING):
+        self.dossier = Path(dossier).resolve()
+        self.recursif = recursif
+        self.scrutation = scrutation or not watchfiles_disponible()
+        # État relevé avant l'indexation initiale : les changements survenus
+        # pendant celle-ci sont rattrapés au démarrage de la surveillance
+        self._initial = self._instantane()
+        self.connus = set(self._initial)
+        retenus, _ = ecarter_homonymes(list(self.connus))
+        self.documents = {fichier.name: fichier for fichier in retenus}
+
+    def fichiers(self) -> tuple[list[Path], list[Path]]:
+        """Fichiers présents au démarrage : (à indexer, homonymes ignorés)."""
+        return ecarter_homonymes(list(self._initial))
+
+    def changements(self, arret: threading.Event | None = None) -> Iterator[Changements]:
+        """Produit les lots de changements jusqu'à `arret` (ou indéfiniment)."""
+        arret = arret or threading.Event()
+        source = self._scruter(arret) if self.scrutation else self._ecouter(arret)
+        for chemins in source:
+            lot = self._classer(chemins)
+            if lot:
+                yield lot
+
+    # --- Détection ---
+
+    def _instantane(self) -> dict[Path, tuple[int, int, int]]:
+        """Empreinte système (taille, mtime_ns, inode) de chaque fichier indexable."""
+        etat = {}
+        for entree in _parcourir(self.dossier, self.recursif):
+            try:
+                st = entree.stat()
+            except FileNotFoundError:
+                continue
+            etat[Path(entree.path)] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return etat
+
+    @staticmethod
+    def _differences(avant: dict, apres: dict) -> set[Path]:
+        return {c for c, e in apres.items() if avant.get(c) != e} | (avant.keys() - apres.keys())
+
+    def _ecouter(self, arret: threading.Event) -> Iterator[set[Path]]:
+        import watchfiles
+
+        rattrapage = self._differences(self._initial, self._instantane())
+        if rattrapage:
+            yield rattrapage
+        for evenements in watchfiles.watch(
+            self.dossier, recursive=self.recursif, debounce=WATCH_DEBOUNCE_MS, stop_event=arret
+        ):
+            yield {Path(chemin) for _, chemin in evenements}
+
+    def _scruter(self, arret: threading.Event) -> Iterator[set[Path]]:
+        precedent = self._initial
+        en_attente: set[Path] = set()
+        dernier = 0.0
+        while not arret.wait(WATCH_POLL_INTERVAL):
+            actuel = self._instantane()
+            modifies = self._differences(precedent, actuel)
+            precedent = actuel
+            if modifies:
+                en_attente |= modifies
+                dernier = time.monotonic()
+            elif en_attente and (time.monotonic() - dernier) * 1000 >= WATCH_DEBOUNCE_MS:
+                yield en_attente
+                en_attente = set()
+
+    # --- Classement ---
+
+    def _visible(self, chemin: Path) -> bool:
+        """Vrai si `chemin` est dans l'arborescence suivie et n'est pas caché."""
+        try:
+            relatif = chemin.relative_to(self.dossier)
+        except ValueError:
+            return False
+        if not self.recursif and len(relatif.parts) > 1:
+            return False
+        return not any(p.startswith(".") for p in relatif.parts)
+
+    def _indexable(self, chemin: Path) -> bool:
+        return self._visible(chemin) and chemin.suffix.lower() in extensions_supportees()
+
+    def _classer(self, chemins: set[Path]) -> Changements:
+        """Traduit des chemins modifiés (fichiers ou dossiers) en changements de documents."""
+        presents: set[Path] = set()
+        disparus: set[Path] = set()
+        for chemin in chemins:
+            if chemin.is_dir():
+                # Dossier créé ou déplacé dans l'arborescence
+                if self.recursif and self._visible(chemin):
+                    presents.update(lister_fichiers(chemin, recursif=True))
+            elif chemin.is_file():
+                if self._indexable(chemin):
+                    presents.add(chemin)
+            else:
+                # Fichier ou dossier supprimé (ou déplacé hors de l'arborescence)
+                disparus.update(f for f in self.connus if f == chemin or chemin in f.parents)
+        self.connus = (self.connus - disparus) | presents
+
+        lot = Changements()
+        a_indexer = set(presents)
+        for fichier in sorted(disparus):
+            if self.documents.get(fichier.name) != fichier:
+                continue
+            # Document supprimé, sauf si un homonyme prend le relais
+            remplacant = min((f for f in self.connus if f.name == fichier.name), default=None)
+            if remplacant is None:
+                del self.documents[fichier.name]
+                lot.supprimes.append(fichier.name)
+            else:
+                self.documents[fichier.name] = remplacant
+                a_indexer.add(remplacant)
+
+        for fichier in sorted(a_indexer):
+            if self.documents.setdefault(fichier.name, fichier) == fichier:
+                lot.a_indexer.append(fichier)
+            else:
+                lot.homonymes.append(fichier)
+        return lot
@@ -0,0 +1,37 @@
+"""
+core/timings.py — Agrégation des durées par étape (recherche, génération...).
+
+Les durées de chaque requête sont cumulées par étape pour être exposées
+(nombre, moyenne, max) par l'API de métriques.
+"""
+
+import threading
+
+
+class MesuresEtapes:
+    """Cumule des durées (secondes) par nom d'étape."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etapes: dict[str, list[float]] = {}  # nom -> [nombre, total, max]
+
+    def enregistrer(self, durees: dict[str, float]) -> None:
+        """Ajoute les durées d'une requête ({étape: secondes})."""
+        with self._lock:
+            for nom, duree in durees.items():
+                mesure = self._etapes.setdefault(nom, [0, 0.0, 0.0])
+                mesure[0] += 1
+                mesure[1] += duree
+                mesure[2] = max(mesure[2], duree)
+
+    def stats(self) -> dict:
+        """{étape: {"count", "avg_ms", "max_ms"}}."""
+        with self._lock:
+            return {
+                nom: {
+                    "count": nombre,
+                    "avg_ms": round(total / nombre * 1000, 2),
+                    "max_ms": round(maximum * 1000, 2),
+                }
+                for nom, (nombre, total, maximum) in self._etapes.items()
+            }
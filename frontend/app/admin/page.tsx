@@ -96,6 +96,25 @@ export default function AdminPage() {
     }
   };
 
+  // Poll an indexing job until it finishes, showing its progress
+  const waitForJob = async (jobId: string) => {
+    while (true) {
+      const res = await fetch(`${API_URL}/api/jobs/${jobId}`);
+      const job = await res.json();
+      if (!res.ok || job.status === "done" || job.status === "error") {
+        return job;
+      }
+      if (job.status === "running" && job.total_pages) {
+        const eta = job.eta_seconds != null ? ` — ~${Math.round(job.eta_seconds)} s restantes` : "";
+        setMessage({
+          type: "success",
+          text: `Indexation : ${job.pages_parsed}/${job.total_pages} pages, ${job.chunks_embedded} chunks${eta}`,
+        });
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
   // Upload document
   const handleUpload = async (e: React.ChangeEvent<HTMLInputElement>) => {
     if (!selectedCollection || !e.target.files?.length) return;
@@ -116,6 +135,12 @@ export default function AdminPage() {
       const data = await res.json();
       if (res.ok) {
         setMessage({ type: "success", text: data.message });
+        const job = await waitForJob(data.job_id);
+        if (job.status === "done") {
+          setMessage({ type: "success", text: job.result?.message || "Document indexé" });
+        } else {
+          setMessage({ type: "error", text: job.result?.message || job.error || "Erreur d'indexation" });
+        }
         fetchDocuments(selectedCollection);
       } else {
         setMessage({ type: "error", text: data.detail || "Erreur upload" });
@@ -150,6 +150,7 @@ export default function Chat() {
     setMessages((prev) => [...prev, userMessage, assistantMessage]);
     setIsStreaming(true);
 
+    let receivedToken = false;
     try {
       for await (const event of streamChat(content, collection, "defaut", history)) {
         if (event.error) {
@@ -164,10 +165,24 @@ export default function Chat() {
           break;
         }
 
+        if (event.queue_position) {
+          setMessages((prev) =>
+            prev.map((m) =>
+              m.id === assistantMessage.id
+                ? { ...m, content: `En file d'attente (position ${event.queue_position})...` }
+                : m
+            )
+          );
+        }
+
         if (event.token) {
+          const isFirstToken = !receivedToken;
+          receivedToken = true;
           setMessages((prev) =>
             prev.map((m) =>
-              m.id === assistantMessage.id ? { ...m, content: m.content + event.token } : m
+              m.id === assistantMessage.id
+                ? { ...m, content: (isFirstToken ? "" : m.content) + event.token }
+                : m
             )
           );
         }
@@ -24,6 +24,10 @@ export async function* streamChat(
     }),
   });
 
+  if (response.status === 429) {
+    const retryAfter = response.headers.get("Retry-After");
+    throw new Error(`Serveur saturé, réessayez dans ${retryAfter ?? "quelques"} s`);
+  }
   if (!response.ok) {
     throw new Error(`HTTP error: ${response.status}`);
   }
@@ -17,4 +17,5 @@ export interface SSEEvent {
   sources?: ChatSource[];
   done?: boolean;
   error?: string;
+  queue_position?: number;
 }
@@ -2,97 +2,487 @@
 ingest.py — CLI d'indexation multi-collections.
 
 Usage :
-    python ingest.py <collection> <chemin> [--force]
+    python ingest.py <collection> <chemin> [--force] [--workers N] [--recursive] [--watch]
+    python ingest.py --resume [RUN]
+    python ingest.py --runs
+    python ingest.py <collection> --cleanup
 
 Exemples :
     python ingest.py vlm_robotics ./documents/
     python ingest.py vlm_robotics ./documents/SOLO.pdf --force
+    python ingest.py vlm_robotics ./documents/ --workers 4
+    python ingest.py vlm_robotics ./livraison.zip --workers 8
+    python ingest.py vlm_robotics /mnt/partage/ --recursive --watch
+
+Un chemin vers une archive (.zip, .tar, .tar.gz...) est indexé sans
+extraction sur disque (cf. core.archives).
+
+Chaque exécution est inscrite dans un journal (core.journal) : après un
+crash, `--resume` reprend le dernier run interrompu (fichiers restants, et
+document en cours après son dernier lot écrit). `--cleanup` abandonne les
+runs interrompus d'une collection et supprime leurs chunks partiels.
+
+Avec `--watch`, le dossier reste surveillé après l'indexation initiale : les
+fichiers ajoutés, modifiés ou supprimés sont (dés)indexés par lots, sans
+nouveau parcours complet (cf. core.surveillance).
 """
 
 import argparse
+import queue
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
 
+from core.archives import ARCHIVE_WORKERS, est_archive, indexer_archive
 from core.embeddings import verifier_ollama
 from core.parsers import extensions_supportees
 from core.collection_manager import CollectionManager
-from core.document_manager import DocumentManager
+from core.document_manager import DocumentManager, preparer_document
+from core.jobs import FileIndexation
+from core.journal import JournalIngestion
+from core.surveillance import Surveillance, ecarter_homonymes, lister_fichiers
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Indexation de documents dans une collection ChromaDB."
+def afficher_progression(etat: dict) -> None:
+    """Affiche l'avancement d'un document volumineux (un lot écrit)."""
+    print(
+        f"      … {etat['document']} : {etat['pages']} page(s) lue(s), "
+        f"{etat['chunks']} chunks, {etat['embedded']} embeddés",
+        flush=True,
     )
-    parser.add_argument("collection", help="Nom de la collection cible")
-    parser.add_argument("chemin", help="Fichier ou dossier à indexer")
-    parser.add_argument("--force", action="store_true", help="Ré-indexer même si déjà présent")
-    args = parser.parse_args()
 
-    print("=" * 60)
-    print(f"   Indexation dans la collection : {args.collection}")
-    print("=" * 60)
-    print()
 
-    # Vérification Ollama
-    if not verifier_ollama():
-        print("Erreur : Ollama n'est pas accessible sur http://localhost:11434")
-        print("Lancez-le avec : ollama serve")
+def indexer_sequentiel(
+    dm: DocumentManager, collection: str, fichiers: list[Path], force: bool,
+    continuer_si_erreur: bool = False,
+):
+    """
+    Indexe les fichiers un par un, au fil de l'eau. Produit (fichier, resultat).
+    Une erreur interrompt l'indexation (run à reprendre), sauf avec
+    `continuer_si_erreur` (surveillance) où elle est signalée pour le fichier.
+    """
+    for fichier in fichiers:
+        try:
+            resultat = dm.ajouter_document(
+                collection, fichier, force=force, progression=afficher_progression
+            )
+        except Exception as e:
+            if not continuer_si_erreur:
+                raise
+            resultat = {"status": "error", "chunks": 0, "message": f"{fichier.name} : erreur ({e})"}
+        yield fichier, resultat
+
+
+def indexer_parallele(
+    dm: DocumentManager, collection: str, fichiers: list[Path], force: bool, workers: int
+):
+    """
+    Pipeline d'indexation en trois étages. Produit (fichier, resultat).
+
+    - parsing + chunking dans un pool de `workers` processus ;
+    - embeddings Ollama dans un thread dédié, par lots de taille mémoire
+      bornée (INGEST_BATCH_MEMORY_MB) ;
+    - écriture ChromaDB lot par lot, puis catalogue, dans le thread appelant
+      (seul écrivain).
+
+    Les files entre étages sont bornées : le pool ne prend pas plus de
+    2 × workers documents d'avance sur l'étage d'embedding, qui n'a pas plus
+    de 2 × workers lots d'avance sur l'écriture. Chaque lot écrit est noté
+    dans le catalogue : un document interrompu reprend après son dernier lot.
+
+    Chaque fichier produit exactement un résultat, même si un étage échoue
+    (pool cassé par un worker tué...) : les fichiers non traités sont alors
+    signalés en erreur et l'appelant n'attend jamais indéfiniment.
+    """
+    a_traiter = []
+    hashes: dict[Path, str | None] = {}
+    for fichier in fichiers:
+        indexe, hashes[fichier] = (False, None) if force else dm.analyser_fichier(collection, fichier)
+        if indexe:
+            yield fichier, {
+                "status": "skipped",
+                "chunks": 0,
+                "message": f"{fichier.name} : déjà indexé (hash identique)",
+            }
+        else:
+            a_traiter.append(fichier)
+
+    if not a_traiter:
+        return
+
+    capacite = 2 * workers
+    places = threading.BoundedSemaphore(capacite)
+    file_embedding: queue.Queue = queue.Queue()
+    file_ecriture: queue.Queue = queue.Queue(maxsize=capacite)
+
+    def _etage_parsing(pool: ProcessPoolExecutor) -> None:
+        # Chaque fichier part vers l'embedding avec son future, ou avec l'erreur de soumission
+        for i, fichier in enumerate(a_traiter):
+            places.acquire()
+            try:
+                future = pool.submit(preparer_document, fichier, None, hashes[fichier])
+            except Exception as e:
+                # Pool inutilisable (BrokenProcessPool...) : ce fichier et les suivants échouent
+                places.release()
+                for restant in a_traiter[i:]:
+                    file_embedding.put((restant, e))
+                return
+            future.add_done_callback(lambda f, fichier=fichier: file_embedding.put((fichier, f)))
+
+    def _etage_embedding() -> None:
+        # Par fichier : (fichier, prep, None) suivi de ses lots (indices, vecteurs)
+        # et de None, ou (fichier, None, erreur) seul si le parsing a échoué.
+        # Une erreur d'embedding en cours de document est publiée à la place
+        # des lots restants, avant le None.
+        publies: set[Path] = set()
+        try:
+            for _ in a_traiter:
+                fichier, future = file_embedding.get()
+                if isinstance(future, Exception):
+                    file_ecriture.put((fichier, None, future))
+                    publies.add(fichier)
+                    continue
+                places.release()
+                try:
+                    prep = future.result()
+                except Exception as e:
+                    file_ecriture.put((fichier, None, e))
+                    publies.add(fichier)
+                    continue
+                file_ecriture.put((fichier, prep, None))
+                publies.add(fichier)
+                try:
+                    indices = dm.chunks_a_indexer(collection, prep, force=force)
+                    for lot in dm.lots_a_indexer(prep, indices):
+                        file_ecriture.put((lot, dm.calculer_embeddings(prep, lot)))
+                except Exception as e:
+                    file_ecriture.put(e)
+                finally:
+                    file_ecriture.put(None)
+        except Exception as e:
+            for fichier in a_traiter:
+                if fichier not in publies:
+                    file_ecriture.put((fichier, None, e))
+
+    fin_lue = True
+
+    def _lots_recus():
+        """Lots du document en cours d'écriture, jusqu'à son None."""
+        nonlocal fin_lue
+        while (lot := file_ecriture.get()) is not None:
+            if isinstance(lot, Exception):
+                raise lot
+            yield lot
+        fin_lue = True
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        threading.Thread(target=_etage_parsing, args=(pool,), daemon=True).start()
+        threading.Thread(target=_etage_embedding, daemon=True).start()
+
+        for _ in a_traiter:
+            fichier, prep, erreur = file_ecriture.get()
+            if erreur is None:
+                fin_lue = False
+                try:
+                    resultat = dm.ecrire_document(
+                        collection, prep, _lots_recus(), progression=afficher_progression
+                    )
+                except Exception as e:
+                    erreur = e
+                finally:
+                    # Document abandonné ou sans lot : ses lots restants sont ignorés
+                    while not fin_lue:
+                        fin_lue = file_ecriture.get() is None
+                if erreur is None:
+                    yield fichier, resultat
+                    continue
+            yield fichier, {
+                "status": "error",
+                "chunks": 0,
+                "message": f"{fichier.name} : erreur ({erreur})",
+            }
+
+
+def afficher_runs(journal: JournalIngestion) -> None:
+    """Affiche les runs récents du journal."""
+    runs = journal.lister()
+    if not runs:
+        print("Aucun run enregistré.")
+        return
+    for run in runs:
+        compteurs = ", ".join(f"{n} {statut}" for statut, n in sorted(run["fichiers"].items()))
+        debut = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["debut"]))
+        print(
+            f"  #{run['id']:<4} {debut}  {run['statut']:<11} {run['collection']} "
+            f"<- {run['source']} ({compteurs or 'aucun fichier'})"
+        )
+
+
+def nettoyer(journal: JournalIngestion, collection: str) -> None:
+    """
+    Abandonne les runs interrompus d'une collection et supprime leurs chunks
+    partiels. Refuse tant qu'une indexation de la collection est en cours
+    (run d'un autre ingest.py, tâche de la file de l'API) : ses lots déjà
+    écrits seraient pris pour des restes et supprimés.
+    """
+    runs = journal.runs_actifs(collection)
+    taches = FileIndexation().taches_actives(collection)
+    if runs or taches:
+        en_cours = [f"run #{run['id']} (pid {run['pid']})" for run in runs]
+        en_cours += [f"{taches} tâche(s) de la file d'indexation"] if taches else []
+        print(f"Erreur : indexation en cours sur {collection} : {', '.join(en_cours)}.")
+        print("Relancez --cleanup une fois l'indexation terminée.")
         sys.exit(1)
-    print("Ollama est accessible.\n")
+    cm = CollectionManager()
+    if not cm.collection_existe(collection):
+        print(f"Erreur : la collection {collection} n'existe pas.")
+        sys.exit(1)
+    supprimes = DocumentManager(cm).nettoyer_chunks_partiels(collection)
+    abandonnes = journal.abandonner(collection)
+    print(f"{supprimes} chunk(s) partiel(s) supprimé(s), {abandonnes} run(s) abandonné(s).")
+
 
-    chemin = Path(args.chemin)
+def fichiers_a_indexer(chemin: Path, recursif: bool) -> tuple[list[Path], list[Path], bool]:
+    """
+    Fichiers supportés d'un chemin (fichier, dossier ou archive).
+    Retourne (fichiers, homonymes ignorés, vrai si archive).
+    """
     if not chemin.exists():
         print(f"Erreur : {chemin} n'existe pas.")
         sys.exit(1)
 
-    # Lister les fichiers à indexer
     ext_ok = set(extensions_supportees())
+    if chemin.is_file() and est_archive(chemin):
+        return [], [], True
     if chemin.is_file():
         if chemin.suffix.lower() not in ext_ok:
             print(f"Erreur : format {chemin.suffix} non supporté.")
             print(f"Formats acceptés : {', '.join(sorted(ext_ok))}")
             sys.exit(1)
-        fichiers = [chemin]
-    else:
-        fichiers = sorted(
-            f for f in chemin.iterdir()
-            if f.is_file() and f.suffix.lower() in ext_ok
-        )
+        return [chemin], [], False
 
+    fichiers, homonymes = ecarter_homonymes(lister_fichiers(chemin, recursif))
     if not fichiers:
         print(f"Aucun fichier supporté trouvé dans {chemin}")
         print(f"Formats acceptés : {', '.join(sorted(ext_ok))}")
         sys.exit(1)
+    return fichiers, homonymes, False
+
 
-    print(f"{len(fichiers)} fichier(s) trouvé(s)\n")
+def signaler_homonymes(homonymes: list[Path]):
+    """Produit (fichier, resultat) pour les fichiers écartés car homonymes d'un autre."""
+    for fichier in homonymes:
+        yield fichier, {
+            "status": "duplicate",
+            "chunks": 0,
+            "message": f"{fichier.name} : homonyme ignoré ({fichier})",
+        }
+
+
+def supprimer_documents(dm: DocumentManager, collection: str, noms: list[str]):
+    """Supprime de l'index les documents dont le fichier a disparu. Produit (nom, resultat)."""
+    for nom in noms:
+        supprime = dm.supprimer_document(collection, nom)
+        yield nom, {
+            "status": "deleted" if supprime else "skipped",
+            "chunks": 0,
+            "message": f"{nom} : supprimé de l'index" if supprime else f"{nom} : absent de l'index",
+        }
+
+
+def suivre(resultats, journal: JournalIngestion, run_id: int, compteurs: dict, total: str = ""):
+    """Affiche et journalise les résultats, en mettant à jour les compteurs par statut."""
+    for i, (fichier, resultat) in enumerate(resultats, start=1):
+        nom = fichier.name if isinstance(fichier, Path) else fichier
+        print(f"  [{i}{total}] {nom} -> {resultat['message']}", flush=True)
+        journal.marquer_fichier(
+            run_id, str(fichier), resultat["status"], resultat["chunks"], resultat["message"]
+        )
+        statut = resultat["status"] if resultat["status"] in compteurs else "skipped"
+        compteurs[statut] += 1
+        if statut == "indexed":
+            compteurs["chunks"] += resultat["chunks"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Indexation de documents dans une collection ChromaDB."
+    )
+    parser.add_argument("collection", nargs="?", help="Nom de la collection cible")
+    parser.add_argument(
+        "chemin", nargs="?", help="Fichier, dossier ou archive (.zip, .tar, .tar.gz) à indexer"
+    )
+    parser.add_argument("--force", action="store_true", help="Ré-indexer même si déjà présent")
+    parser.add_argument(
+        "--recursive", "-r", action="store_true", help="Inclure les sous-dossiers"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Après l'indexation, surveiller le dossier et indexer ses changements au fil de l'eau",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, metavar="N",
+        help="Nombre de processus de parsing/chunking (1 = indexation séquentielle) ; "
+        "pour une archive, nombre de documents indexés en parallèle",
+    )
+    parser.add_argument(
+        "--resume", type=int, nargs="?", const=0, metavar="RUN",
+        help="Reprendre un run interrompu (par défaut le plus récent)",
+    )
+    parser.add_argument("--runs", action="store_true", help="Lister les runs récents")
+    parser.add_argument(
+        "--cleanup", action="store_true",
+        help="Supprimer les chunks partiels des runs interrompus de la collection",
+    )
+    args = parser.parse_args()
+
+    journal = JournalIngestion()
+    if args.runs:
+        afficher_runs(journal)
+        return
+    if args.cleanup:
+        if not args.collection:
+            parser.error("--cleanup nécessite une collection")
+        nettoyer(journal, args.collection)
+        return
+
+    if args.watch and args.resume is not None:
+        parser.error("--watch ne s'utilise pas avec --resume")
+    if args.resume is not None:
+        run = journal.run(args.resume) if args.resume else journal.dernier_interrompu()
+        if run is None:
+            print("Aucun run interrompu à reprendre." if not args.resume else f"Run #{args.resume} inconnu.")
+            sys.exit(1)
+        if run["statut"] != "interrupted":
+            print(f"Le run #{run['id']} ne peut pas être repris (statut : {run['statut']}).")
+            sys.exit(1)
+        collection, chemin, force, workers = (
+            run["collection"], Path(run["source"]), run["force"], run["workers"]
+        )
+    elif not args.collection or not args.chemin:
+        parser.error("collection et chemin sont requis (ou --resume, --runs, --cleanup)")
+    else:
+        run = None
+        collection, chemin, force, workers = (
+            args.collection, Path(args.chemin), args.force, args.workers
+        )
+
+    print("=" * 60)
+    print(f"   Indexation dans la collection : {collection}")
+    print("=" * 60)
+    print()
+
+    # Vérification Ollama
+    if not verifier_ollama():
+        print("Erreur : Ollama n'est pas accessible sur http://localhost:11434")
+        print("Lancez-le avec : ollama serve")
+        sys.exit(1)
+    print("Ollama est accessible.\n")
+
+    # Lister les fichiers à indexer (reprise : fichiers restants du run)
+    surveillance = None
+    homonymes: list[Path] = []
+    if args.watch:
+        if not chemin.is_dir():
+            print(f"Erreur : --watch nécessite un dossier ({chemin}).")
+            sys.exit(1)
+        # Démarrée avant l'indexation initiale : rien n'est manqué pendant celle-ci
+        surveillance = Surveillance(chemin, recursif=args.recursive)
+        fichiers, homonymes = surveillance.fichiers()
+        archive = False
+    if run is None:
+        if surveillance is None:
+            fichiers, homonymes, archive = fichiers_a_indexer(chemin, args.recursive)
+        run_id = journal.creer_run(
+            collection, str(chemin), force, workers, [str(f) for f in fichiers]
+        )
+        print(f"Run #{run_id} (reprise après interruption : python ingest.py --resume {run_id})")
+    else:
+        run_id = run["id"]
+        archive = est_archive(chemin)
+        # Une archive est relue en entier : ses entrées déjà indexées sont ignorées
+        fichiers = [] if archive else [Path(f) for f in journal.fichiers_restants(run_id)]
+        journal.reprendre(run_id)
+        print(f"Reprise du run #{run_id} ({chemin})")
+
+    workers_archive = workers if workers > 1 else ARCHIVE_WORKERS
+    if archive:
+        print(f"Archive : {chemin.name} ({workers_archive} workers)")
+    else:
+        print(f"{len(fichiers)} fichier(s) à traiter")
+    if homonymes:
+        print(f"{len(homonymes)} fichier(s) homonyme(s) ignoré(s) (même nom qu'un autre fichier)")
+    if workers > 1 and not archive:
+        print(f"Mode parallèle : {workers} workers")
+    print()
 
     # Indexation
     cm = CollectionManager()
     dm = DocumentManager(cm)
     debut = time.time()
-    total_chunks = 0
-    nb_indexes = 0
-    nb_ignores = 0
-
-    for i, fichier in enumerate(fichiers, start=1):
-        print(f"  [{i}/{len(fichiers)}] {fichier.name}...", end=" ", flush=True)
-        resultat = dm.ajouter_document(args.collection, fichier, force=args.force)
-        print(f"-> {resultat['message']}")
-
-        if resultat["status"] == "indexed":
-            nb_indexes += 1
-            total_chunks += resultat["chunks"]
-        else:
-            nb_ignores += 1
+    compteurs = {"indexed": 0, "skipped": 0, "duplicate": 0, "error": 0, "deleted": 0, "chunks": 0}
+
+    def _indexer(fichiers: list[Path], continuer_si_erreur: bool = False):
+        if workers > 1:
+            return indexer_parallele(dm, collection, fichiers, force, workers)
+        return indexer_sequentiel(dm, collection, fichiers, force, continuer_si_erreur)
+
+    if archive:
+        resultats = indexer_archive(dm, collection, chemin, force, workers_archive)
+    else:
+        resultats = chain(signaler_homonymes(homonymes), _indexer(fichiers))
+
+    total = "" if archive else f"/{len(fichiers) + len(homonymes)}"
+    try:
+        suivre(resultats, journal, run_id, compteurs, total)
+        if surveillance is not None:
+            afficher_bilan(compteurs, time.time() - debut, collection)
+            print(f"\nSurveillance de {surveillance.dossier} (Ctrl-C pour arrêter)", flush=True)
+            for lot in surveillance.changements():
+                print(
+                    f"\n{time.strftime('%H:%M:%S')} : {len(lot.a_indexer)} fichier(s) à indexer, "
+                    f"{len(lot.supprimes)} supprimé(s)", flush=True,
+                )
+                suivre(
+                    chain(
+                        supprimer_documents(dm, collection, lot.supprimes),
+                        signaler_homonymes(lot.homonymes),
+                        _indexer(lot.a_indexer, continuer_si_erreur=True),
+                    ),
+                    journal, run_id, compteurs,
+                )
+    except KeyboardInterrupt:
+        if surveillance is None:
+            journal.terminer(run_id, "interrupted")
+            print(f"\nRun #{run_id} interrompu. Reprise : python ingest.py --resume {run_id}")
+            raise
+        # Arrêt normal de la surveillance
+        print("\nSurveillance arrêtée.")
+    except BaseException:
+        journal.terminer(run_id, "interrupted")
+        print(f"\nRun #{run_id} interrompu. Reprise : python ingest.py --resume {run_id}")
+        raise
+    journal.terminer(run_id)
+    afficher_bilan(compteurs, time.time() - debut, collection)
+
 
-    duree = time.time() - debut
+def afficher_bilan(compteurs: dict, duree: float, collection: str) -> None:
+    """Affiche le bilan d'une indexation."""
     print()
     print("=" * 60)
-    print(f"   {nb_indexes} document(s) indexé(s), {nb_ignores} ignoré(s)")
-    print(f"   {total_chunks} chunks créés au total")
+    print(f"   {compteurs['indexed']} document(s) indexé(s), {compteurs['skipped']} ignoré(s)")
+    if compteurs["duplicate"]:
+        print(f"   {compteurs['duplicate']} doublon(s) écarté(s)")
+    if compteurs["deleted"]:
+        print(f"   {compteurs['deleted']} document(s) supprimé(s) de l'index")
+    if compteurs["error"]:
+        print(f"   {compteurs['error']} document(s) en erreur")
+    print(f"   {compteurs['chunks']} chunks créés au total")
     print(f"   Durée : {duree:.1f} secondes")
-    print(f"   Collection : {args.collection}")
+    print(f"   Collection : {collection}")
     print("=" * 60)
 
 
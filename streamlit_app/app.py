@@ -5,7 +5,8 @@ Lance avec : streamlit run streamlit_app/app.py
 """
 
 import sys
-import tempfile
+import threading
+from contextlib import closing
 from pathlib import Path
 
 # Ajouter la racine du projet au path pour les imports core.*
@@ -16,9 +17,13 @@ import streamlit as st
 from core.embeddings import verifier_ollama, OLLAMA_MODEL
 from core.collection_manager import CollectionManager
 from core.document_manager import DocumentManager
-from core.search import RAGEngine
+from core.jobs import get_file_indexation
+from core.search import get_engine, prechauffer_modele
 from core.parsers import extensions_supportees
 
+# Nombre de documents listés dans la barre latérale
+NB_DOCUMENTS_AFFICHES = 50
+
 # --- Configuration page ---
 st.set_page_config(
     page_title="Assistant RAG Multi-Collections",
@@ -33,6 +38,45 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def prechargement_modele() -> threading.Thread:
+    """Charge le modèle de génération en arrière-plan, une fois par processus Streamlit."""
+    thread = threading.Thread(target=prechauffer_modele, name="prechauffage", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.fragment(run_every=2)
+def afficher_indexations(collection: str) -> None:
+    """Avancement des indexations récentes de la collection (rafraîchi toutes les 2 s)."""
+    taches = get_file_indexation().lister(collection, limit=5)
+    for tache in taches:
+        if tache["statut"] == "queued":
+            st.caption(f"⏳ {tache['nom']} : en attente")
+        elif tache["statut"] == "running":
+            total = tache["total_pages"] or 0
+            avancement = min(1.0, tache["pages"] / total) if total else 0.0
+            eta = f", reste ~{tache['eta']:.0f} s" if tache["eta"] is not None else ""
+            st.progress(
+                avancement,
+                text=f"{tache['nom']} : {tache['pages']}/{total} pages, "
+                f"{tache['embedded']} chunks embeddés{eta}",
+            )
+        elif tache["statut"] == "error":
+            message = (tache["resultat"] or {}).get("message") or tache["erreur"]
+            st.error(f"{tache['nom']} : {message}")
+        else:
+            st.success(tache["resultat"]["message"])
+
+    # Une indexation vient de se terminer : rafraîchir la liste des documents
+    termines = {t["id"] for t in taches if t["statut"] in ("done", "error")}
+    cle = f"indexations_terminees_{collection}"
+    vues = st.session_state.setdefault(cle, termines)
+    if termines - vues:
+        st.session_state[cle] = termines
+        st.rerun()
+
+
 # --- Instances partagées ---
 cm = CollectionManager()
 dm = DocumentManager(cm)
@@ -45,6 +89,7 @@ if not verifier_ollama():
         "Puis rechargez cette page."
     )
     st.stop()
+prechargement_modele()
 
 # --- Sidebar ---
 with st.sidebar:
@@ -92,35 +137,28 @@ with st.sidebar:
             key="file_uploader",
         )
         if fichiers_up and st.button("Indexer", use_container_width=True, key="btn_index"):
+            # Indexation en arrière-plan (même file que l'API)
             for fichier_up in fichiers_up:
-                with tempfile.NamedTemporaryFile(
-                    delete=False,
-                    suffix=Path(fichier_up.name).suffix,
-                ) as tmp:
-                    tmp.write(fichier_up.getbuffer())
-                    tmp_path = Path(tmp.name)
-
-                with st.spinner(f"Indexation de {fichier_up.name}..."):
-                    resultat = dm.ajouter_document(collection_active, tmp_path)
-
-                tmp_path.unlink(missing_ok=True)
-
-                if resultat["status"] == "indexed":
-                    st.success(resultat["message"])
-                else:
-                    st.info(resultat["message"])
+                get_file_indexation().soumettre(
+                    collection_active, fichier_up.name, fichier_up.getvalue()
+                )
             st.rerun()
 
+        afficher_indexations(collection_active)
+
         # Liste des documents indexés
         st.divider()
         st.subheader("Documents indexés")
-        docs = dm.lister_documents(collection_active)
+        nb_docs = dm.compter_documents(collection_active)
+        docs = dm.lister_documents(collection_active, limit=NB_DOCUMENTS_AFFICHES)
         if docs:
             for doc in docs:
                 st.markdown(
                     f"- **{doc['nom']}** — {doc['nb_chunks']} chunks, "
                     f"{doc['nb_pages']} page(s)"
                 )
+            if nb_docs > len(docs):
+                st.caption(f"… et {nb_docs - len(docs)} autre(s) document(s).")
         else:
             st.caption("Aucun document indexé.")
 
@@ -147,7 +185,7 @@ if not collection_active:
 st.caption(f"Collection active : **{collection_active}**")
 
 # Vérifier que la collection contient des documents
-if not dm.lister_documents(collection_active):
+if not dm.compter_documents(collection_active):
     st.warning(
         "Cette collection est vide. "
         "Ajoutez des documents via la barre latérale ou avec :\n\n"
@@ -184,7 +222,7 @@ if question:
     prompt_name = "vlm_robotics" if collection_active == "vlm_robotics" else "defaut"
 
     try:
-        engine = RAGEngine(collection_active, prompt_name=prompt_name, collection_manager=cm)
+        engine = get_engine(collection_active, prompt_name=prompt_name, collection_manager=cm)
     except ValueError:
         st.error("Collection introuvable ou vide. Indexez des documents d'abord.")
         st.stop()
@@ -203,9 +241,12 @@ if question:
         placeholder = st.empty()
         texte_complet = ""
 
-        for token in resultat["reponse"]:
-            texte_complet += token
-            placeholder.markdown(texte_complet + "▌")
+        # Fermé même si le script est interrompu (nouvelle question) : Ollama
+        # arrête alors de générer une réponse que personne ne lira
+        with closing(resultat["reponse"]):
+            for token in resultat["reponse"]:
+                texte_complet += token
+                placeholder.markdown(texte_complet + "▌")
 
         placeholder.markdown(texte_complet)
 